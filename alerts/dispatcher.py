@@ -0,0 +1,221 @@
+# dispatcher.py — part of alerts
+# alerts/dispatcher.py
+"""
+Non-blocking alert dispatch.
+
+    frame loop --submit()--> [bounded queue] --> dispatcher thread
+        (writes the snapshot via SnapshotStore, coalesces bursts) --> one worker per sink
+        (rate limit, retries with exponential backoff) --> Telegram / email / MQTT
+
+submit() never blocks: when the queue is full the alert is dropped and
+counted, so a dead network can never stall detection.
+"""
+import itertools
+import queue
+import random
+import threading
+import time
+
+from utils.storage import SnapshotStore
+
+
+class Alert:
+    def __init__(self, caption, image_path=None, meta=None):
+        self.caption = caption
+        self.image_path = image_path
+        self.meta = meta or {}
+        self.created = time.time()
+        self.count = 1          # > 1 when a burst was coalesced into this alert
+
+    def __repr__(self):
+        return f"Alert({self.caption!r}, image={self.image_path!r}, count={self.count})"
+
+
+class RateLimiter:
+    """Token bucket: ``rate`` sends per ``per`` seconds, bursts up to ``burst``."""
+
+    def __init__(self, rate=10, per=60.0, burst=None):
+        self.capacity = float(burst or rate)
+        self.tokens = self.capacity
+        self.fill_rate = rate / per
+        self.last = time.monotonic()
+
+    def wait_time(self):
+        """Takes a token and returns how long to wait before using it (0 = send now)."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.fill_rate)
+        self.last = now
+        # Taken even when the caller has to wait, so the debt (negative tokens) delays the next send too
+        self.tokens -= 1
+        return max(0.0, -self.tokens / self.fill_rate)
+
+
+class LocalSink:
+    """Stand-in sink for tests / dry runs: keeps alerts in memory, can be told to fail."""
+    name = "local"
+
+    def __init__(self, fail_times=0):
+        self.sent = []
+        self.fail_times = fail_times
+
+    def send(self, alert):
+        if self.fail_times > 0:
+            self.fail_times -= 1
+            raise ConnectionError("simulated sink failure")
+        self.sent.append(alert)
+
+
+class _SinkWorker:
+    def __init__(self, sink, queue_size, max_retries, backoff, max_backoff, rate, per):
+        self.sink = sink
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.limiter = RateLimiter(rate, per)
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.thread = threading.Thread(target=self._run, name=f"alert-{sink.name}", daemon=True)
+
+    def offer(self, alert):
+        try:
+            self.queue.put_nowait(alert)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            alert = self.queue.get()
+            if alert is None:
+                return
+            delay = self.limiter.wait_time()
+            if delay > 0:
+                time.sleep(delay)
+            for attempt in range(self.max_retries + 1):
+                try:
+                    self.sink.send(alert)
+                    self.sent += 1
+                    break
+                except Exception as e:
+                    if attempt == self.max_retries:
+                        self.failed += 1
+                        print(f"[ALERT] {self.sink.name} gave up after {attempt + 1} attempts: {e}")
+                        break
+                    wait = min(self.max_backoff, self.backoff * (2 ** attempt))
+                    time.sleep(wait * (0.5 + random.random() / 2))
+
+
+class AlertDispatcher:
+    """
+    :param sinks: objects with ``name`` and ``send(alert)`` (raise to trigger a retry)
+    :param coalesce_window: the first alert goes out at once; the ones arriving within
+                            this many seconds after it are merged into one follow-up
+    :param rate, per: per-sink limit of ``rate`` notifications per ``per`` seconds
+    :param store: SnapshotStore for the alert images (default: one rooted at ``capture_dir``)
+    """
+
+    def __init__(self, sinks, capture_dir="captures", queue_size=64, coalesce_window=5.0,
+                 max_retries=4, backoff=1.0, max_backoff=30.0, rate=10, per=60.0,
+                 jpeg_quality=90, store=None):
+        self.capture_dir = capture_dir
+        self.coalesce_window = coalesce_window
+        self.store = store or SnapshotStore(capture_dir, quality=jpeg_quality, kinds=("alert",))
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.workers = [_SinkWorker(s, queue_size, max_retries, backoff, max_backoff, rate, per)
+                        for s in sinks]
+        self._thread = threading.Thread(target=self._run, name="alert-dispatch", daemon=True)
+        self._started = False
+        self._lock = threading.Lock()
+        self._seq = itertools.count(1)
+
+    def start(self):
+        with self._lock:
+            if not self._started:
+                for w in self.workers:
+                    w.thread.start()
+                self._thread.start()
+                self._started = True
+        return self
+
+    def submit(self, caption, frame=None, meta=None):
+        """
+        Queues an alert without blocking. The snapshot (if any) is written by
+        the dispatcher thread. Returns the planned image path ("" if none),
+        or None if the alert was dropped because the queue is full.
+        """
+        self.start()
+        image_path = ""
+        if frame is not None:
+            image_path = self.store.plan("alert", name=f"alert_{int(time.time())}_{next(self._seq)}")
+        alert = Alert(caption, image_path or None, meta)
+        try:
+            self.queue.put_nowait((alert, frame))
+        except queue.Full:
+            self.dropped += 1
+            return None
+        return image_path
+
+    def pending(self):
+        return self.queue.qsize() + sum(w.queue.qsize() for w in self.workers)
+
+    def _save(self, alert, frame):
+        if frame is None or not alert.image_path:
+            return
+        # Synchronous on this thread: the sinks attach the file right after
+        try:
+            if not self.store.write(alert.image_path, frame):
+                print(f"[ALERT] Could not write {alert.image_path}")
+        except OSError as e:
+            print(f"[ALERT] Could not write {alert.image_path}: {e}")
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            head, frame = item
+            self._save(head, frame)
+            # The first alert is never delayed
+            for w in self.workers:
+                w.offer(head)
+            # The burst that follows it becomes one follow-up (newest snapshot) when the window closes
+            deadline = time.monotonic() + self.coalesce_window
+            latest, count, stop = None, 0, False
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    nxt = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    stop = True
+                    break
+                alert, frame = nxt
+                self._save(alert, frame)
+                latest, count = alert, count + 1
+            if latest is not None:
+                latest.count = count
+                if count > 1:
+                    latest.caption = f"{latest.caption} (x{count} within {self.coalesce_window:g}s)"
+                for w in self.workers:
+                    w.offer(latest)
+            if stop:
+                break
+        for w in self.workers:
+            w.queue.put(None)
+
+    def close(self, timeout=5.0):
+        if not self._started:
+            return
+        self.queue.put(None)
+        self._thread.join(timeout=timeout)
+        for w in self.workers:
+            w.thread.join(timeout=timeout)
+
+    def stats(self):
+        parts = [f"{w.sink.name}: sent={w.sent} failed={w.failed} dropped={w.dropped}" for w in self.workers]
+        return f"[ALERT] queue={self.pending()} dropped={self.dropped} | " + " | ".join(parts)
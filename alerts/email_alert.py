@@ -1 +1,78 @@
-# email_alert.py  part of alerts
+# email_alert.py — part of alerts
+# alerts/email_alert.py
+import mimetypes
+import os
+import smtplib
+import threading
+from email.message import EmailMessage
+
+SMTP_HOST = "smtp.gmail.com"
+SMTP_PORT = 587
+SMTP_USER = "YOUR_EMAIL"
+SMTP_PASSWORD = "YOUR_APP_PASSWORD"
+EMAIL_TO = "YOUR_EMAIL"
+TIMEOUT = 15  # seconds
+
+# Snapshots may be WebP (SNAPSHOT_FORMAT in main.py); older Pythons do not map it on every OS
+mimetypes.add_type("image/webp", ".webp")
+
+
+def build_message(caption, img_path=None, sender=SMTP_USER, to=EMAIL_TO):
+    msg = EmailMessage()
+    msg["Subject"] = caption
+    msg["From"] = sender
+    msg["To"] = to
+    msg.set_content(caption)
+    if img_path and os.path.exists(img_path):
+        mime = mimetypes.guess_type(img_path)[0] or "image/jpeg"
+        maintype, subtype = mime.split("/", 1)
+        with open(img_path, "rb") as f:
+            msg.add_attachment(f.read(), maintype=maintype, subtype=subtype,
+                               filename=os.path.basename(img_path))
+    return msg
+
+
+class EmailSink:
+    """Dispatcher sink; keeps one SMTP connection open and reconnects when it drops."""
+    name = "email"
+
+    def __init__(self, host=SMTP_HOST, port=SMTP_PORT, user=SMTP_USER, password=SMTP_PASSWORD, to=EMAIL_TO):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.to = to
+        self._smtp = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        smtp = smtplib.SMTP(self.host, self.port, timeout=TIMEOUT)
+        smtp.starttls()
+        smtp.login(self.user, self.password)
+        return smtp
+
+    def send(self, alert):
+        msg = build_message(alert.caption, alert.image_path, self.user, self.to)
+        with self._lock:
+            if self._smtp is None:
+                self._smtp = self._connect()
+            try:
+                self._smtp.send_message(msg)
+            except smtplib.SMTPServerDisconnected:
+                # Idle connection closed by the server; one fresh attempt, else let the dispatcher retry
+                self._smtp = self._connect()
+                self._smtp.send_message(msg)
+            except Exception:
+                self._smtp = None
+                raise
+
+
+def send_email_alert(img_path, caption="Alert!"):
+    """One-off synchronous send (opens and closes its own connection)."""
+    smtp = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=TIMEOUT)
+    try:
+        smtp.starttls()
+        smtp.login(SMTP_USER, SMTP_PASSWORD)
+        smtp.send_message(build_message(caption, img_path))
+    finally:
+        smtp.quit()
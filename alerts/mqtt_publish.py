@@ -1 +1,58 @@
-# mqtt_publish.py  part of alerts
+# mqtt_publish.py — part of alerts
+# alerts/mqtt_publish.py
+import json
+import os
+
+import paho.mqtt.client as mqtt
+
+MQTT_HOST = "localhost"
+MQTT_PORT = 1883
+MQTT_TOPIC = "theft_detection/alerts"
+MQTT_QOS = 1
+
+
+def _new_client(client_id=""):
+    # paho-mqtt 2.x requires the callback API version up front
+    if hasattr(mqtt, "CallbackAPIVersion"):
+        return mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=client_id)
+    return mqtt.Client(client_id=client_id)
+
+
+class MqttSink:
+    """Dispatcher sink; one persistent client with a background network loop (auto-reconnects)."""
+    name = "mqtt"
+
+    def __init__(self, host=MQTT_HOST, port=MQTT_PORT, topic=MQTT_TOPIC, qos=MQTT_QOS, client_id=""):
+        self.topic = topic
+        self.qos = qos
+        self.client = _new_client(client_id)
+        self.client.reconnect_delay_set(min_delay=1, max_delay=30)
+        self.client.connect_async(host, port)
+        self.client.loop_start()
+
+    def send(self, alert):
+        payload = json.dumps({
+            "caption": alert.caption,
+            "image": os.path.basename(alert.image_path) if alert.image_path else None,
+            "count": alert.count,
+            "ts": alert.created,
+            **alert.meta,
+        }, default=str)
+        info = self.client.publish(self.topic, payload, qos=self.qos)
+        if info.rc != mqtt.MQTT_ERR_SUCCESS:
+            raise ConnectionError(f"MQTT publish failed (rc={info.rc})")
+
+    def close(self):
+        self.client.loop_stop()
+        self.client.disconnect()
+
+
+def publish_alert(caption, img_path=None, host=MQTT_HOST, port=MQTT_PORT, topic=MQTT_TOPIC):
+    """One-off synchronous publish."""
+    client = _new_client()
+    client.connect(host, port)
+    client.loop_start()
+    info = client.publish(topic, json.dumps({"caption": caption, "image": img_path}), qos=MQTT_QOS)
+    info.wait_for_publish(timeout=5)
+    client.loop_stop()
+    client.disconnect()
@@ -1,9 +1,10 @@
-# telegram.py � part of alerts
+# telegram.py — part of alerts
 # alerts/telegram.py
 import requests
 
 BOT_TOKEN = "YOUR_BOT_TOKEN"
 CHAT_ID = "YOUR_CHAT_ID"
+TIMEOUT = 10  # seconds
 
 # def send_telegram_alert(img_path, caption="Alert!"):
 #     url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendPhoto"
@@ -14,3 +15,33 @@ CHAT_ID = "YOUR_CHAT_ID"
 
 def send_telegram_alert(img_path, caption="Alert!"):
     print(f"[DUMMY TELEGRAM] 📨 Would send alert with image: {img_path}, caption: '{caption}'")
+
+
+class TelegramSink:
+    """Dispatcher sink; reuses one HTTPS session. Falls back to the dummy print until a token is set."""
+    name = "telegram"
+
+    def __init__(self, bot_token=BOT_TOKEN, chat_id=CHAT_ID):
+        self.bot_token = bot_token
+        self.chat_id = chat_id
+        self.session = requests.Session()
+
+    @property
+    def configured(self):
+        return self.bot_token and not self.bot_token.startswith("YOUR_")
+
+    def send(self, alert):
+        if not self.configured:
+            send_telegram_alert(alert.image_path, alert.caption)
+            return
+        base = f"https://api.telegram.org/bot{self.bot_token}"
+        if alert.image_path:
+            with open(alert.image_path, "rb") as f:
+                r = self.session.post(f"{base}/sendPhoto", files={"photo": f},
+                                      data={"chat_id": self.chat_id, "caption": alert.caption},
+                                      timeout=TIMEOUT)
+        else:
+            r = self.session.post(f"{base}/sendMessage",
+                                  data={"chat_id": self.chat_id, "text": alert.caption},
+                                  timeout=TIMEOUT)
+        r.raise_for_status()
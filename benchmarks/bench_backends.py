@@ -0,0 +1,94 @@
+# bench_backends.py — part of benchmarks
+# benchmarks/bench_backends.py
+"""
+Compares inference backends on the same frames: load time, ms per call
+(p50/p95) for the pose and object models, and how closely each backend's
+boxes agree with the first one listed.
+
+    python -m benchmarks.bench_backends clip.mp4 --backends torch onnx onnx-int8 openvino --threads 4
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.bench_detection import load_frames
+from detection.backends import load_model
+from detection.engine import OBJECT_MODEL_PATH, POSE_MODEL_PATH
+from detection.tracker import iou_matrix
+from utils.timing import percentile
+
+
+def parse_spec(spec):
+    """"onnx-int8" -> ("onnx", True)"""
+    backend, _, flag = spec.partition("-")
+    return backend, flag == "int8"
+
+
+def run_model(model, frames, batch, conf, imgsz, warmup=3):
+    for frame in frames[:warmup]:
+        model([frame], conf=conf, imgsz=imgsz, verbose=False)
+    times, boxes = [], []
+    for i in range(0, len(frames), batch):
+        chunk = frames[i:i + batch]
+        t0 = time.perf_counter()
+        results = model(chunk, conf=conf, imgsz=imgsz, verbose=False)
+        times.append((time.perf_counter() - t0) * 1000 / len(chunk))
+        for r in results:
+            xyxy = r.boxes.xyxy
+            boxes.append(xyxy.cpu().numpy() if hasattr(xyxy, "cpu") else np.asarray(xyxy))
+    return sorted(times), boxes
+
+
+def agreement(ref, other):
+    """(mean IoU of best matches, mean |count difference|) against the reference boxes."""
+    ious, diffs = [], []
+    for a, b in zip(ref, other):
+        diffs.append(abs(len(a) - len(b)))
+        if len(a) and len(b):
+            ious.extend(iou_matrix(a, b).max(axis=1))
+        elif len(a) or len(b):
+            ious.append(0.0)
+    return (float(np.mean(ious)) if ious else 1.0), (float(np.mean(diffs)) if diffs else 0.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inference backend benchmark")
+    parser.add_argument("clips", nargs="+", help="recorded video clips")
+    parser.add_argument("--frames", type=int, default=200, help="max frames per clip")
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "onnx-int8"],
+                        help="torch, onnx, onnx-int8, openvino, openvino-int8")
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--batch", type=int, default=1)
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--conf", type=float, default=0.5)
+    args = parser.parse_args()
+
+    frames = [f for clip in args.clips for f in load_frames(clip, args.frames)]
+    if not frames:
+        print("no frames")
+        return
+    print(f"{len(frames)} frames, batch {args.batch}, imgsz {args.imgsz}, threads {args.threads or 'default'}")
+    print(f"{'backend':<14} {'model':<6} {'load':>8} {'p50':>9} {'p95':>9} {'IoU vs ref':>11} {'|dN|':>6}")
+    reference = {}
+    for spec in args.backends:
+        backend, int8 = parse_spec(spec)
+        for label, weights in (("pose", POSE_MODEL_PATH), ("object", OBJECT_MODEL_PATH)):
+            t0 = time.perf_counter()
+            try:
+                model = load_model(weights, backend, threads=args.threads, int8=int8, imgsz=args.imgsz)
+            except Exception as e:
+                print(f"{spec:<14} {label:<6} failed: {e}")
+                continue
+            load_ms = (time.perf_counter() - t0) * 1000
+            times, boxes = run_model(model, frames, args.batch, args.conf, args.imgsz)
+            iou, dn = agreement(reference.setdefault(label, boxes), boxes)
+            print(f"{spec:<14} {label:<6} {load_ms:>6.0f}ms {percentile(times, 50):>7.1f}ms "
+                  f"{percentile(times, 95):>7.1f}ms {iou:>11.3f} {dn:>6.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# bench_detection.py — part of benchmarks
+# benchmarks/bench_detection.py
+"""
+Compares ms/frame of the old two-model path (object model on every frame +
+pose model whenever a person is found) with the fused DetectionEngine.
+
+    python -m benchmarks.bench_detection clip1.mp4 clip2.mp4 --frames 300
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from detection.engine import DetectionEngine, OBJECT_MODEL_PATH, POSE_MODEL_PATH
+
+
+def load_frames(path, max_frames):
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def two_model_path(yolo, pose_model):
+    def run(frame):
+        persons = 0
+        for r in yolo(frame, conf=0.5, verbose=False):
+            for box in r.boxes:
+                if yolo.names[int(box.cls[0])] == "person":
+                    persons += 1
+        if persons:
+            pose_model(frame, verbose=False)
+    return run
+
+
+def time_path(run, frames, warmup=5):
+    for frame in frames[:warmup]:
+        run(frame)
+    start = time.perf_counter()
+    for frame in frames:
+        run(frame)
+    return (time.perf_counter() - start) * 1000 / max(len(frames), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Two-model vs fused detection benchmark")
+    parser.add_argument("clips", nargs="+", help="recorded video clips")
+    parser.add_argument("--frames", type=int, default=300, help="max frames per clip")
+    parser.add_argument("--object-every", type=int, default=5)
+    args = parser.parse_args()
+
+    from ultralytics import YOLO
+    yolo = YOLO(OBJECT_MODEL_PATH)
+    pose_model = YOLO(POSE_MODEL_PATH)
+    engine = DetectionEngine(OBJECT_MODEL_PATH, POSE_MODEL_PATH, object_every=args.object_every)
+
+    print(f"{'clip':<40} {'frames':>6} {'two-model':>12} {'fused':>12} {'speedup':>8}")
+    for clip in args.clips:
+        frames = load_frames(clip, args.frames)
+        if not frames:
+            print(f"{clip:<40} (no frames)")
+            continue
+        old_ms = time_path(two_model_path(yolo, pose_model), frames)
+        new_ms = time_path(engine, frames)
+        print(f"{os.path.basename(clip):<40} {len(frames):>6} {old_ms:>9.1f} ms {new_ms:>9.1f} ms "
+              f"{old_ms / new_ms if new_ms else 0:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
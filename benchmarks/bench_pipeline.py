@@ -0,0 +1,353 @@
+# bench_pipeline.py — part of benchmarks
+# benchmarks/bench_pipeline.py
+"""
+Replays image/video fixtures through every stage of the pipeline and writes
+p50/p95/p99 latency, FPS and peak RSS to a JSON file that later runs can be
+compared against.
+
+    python -m benchmarks.bench_pipeline                                  # reference.jpg + benchmarks/fixtures/*
+    python -m benchmarks.bench_pipeline clip.mp4 --frames 200 --backend onnx --out after.json
+    python -m benchmarks.bench_pipeline --compare before.json --fail-on-regression
+
+Stages, run in order on every frame like the live loop does:
+
+    detect    object model (non-person classes)        DetectionEngine.detect_objects
+    pose      pose model (persons + keypoints)         DetectionEngine.detect_people
+    faces     face search + encoding + index match     recognize_faces
+    roi       wrist-vs-item scoring (items.json)       ItemWatcher.update_people
+    zones     debounced restricted-area check          ZoneMonitor.update
+    log       detection log write (enqueue)            log_event
+    snapshot  JPEG encode + atomic write + thumbnail   SnapshotStore.write
+    events    one event insert into SQLite (WAL)       event_store.insert_events
+
+A stage whose dependency or model is missing is reported as skipped; the
+others still run. Logs, snapshots and the event DB go to a temp directory.
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import cv2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.bench_detection import load_frames
+from utils.timing import StageTimer, percentile
+
+STAGES = ("detect", "pose", "faces", "roi", "zones", "log", "snapshot", "events")
+DEFAULT_FIXTURES = ["reference.jpg"]
+FIXTURE_DIR = os.path.join("benchmarks", "fixtures")
+RESULTS_DIR = os.path.join("benchmarks", "results")
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+RESTRICTED_AREA = [(100, 200), (500, 200), (500, 400), (100, 400)]   # same default as main.py
+ITEMS_FILE = "items.json"
+
+
+# -----------------------------
+# Fixtures and process stats
+# -----------------------------
+def load_fixture(path, max_frames):
+    """Frames of a clip, or an image repeated max_frames times."""
+    if path.lower().endswith(IMAGE_EXTS):
+        img = cv2.imread(path)
+        return [img] * max_frames if img is not None else []
+    return load_frames(path, max_frames)
+
+
+def default_fixtures():
+    extra = sorted(glob.glob(os.path.join(FIXTURE_DIR, "*")))
+    return [p for p in DEFAULT_FIXTURES if os.path.exists(p)] + extra
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None if it cannot be read)."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # KB on Linux, bytes on macOS
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        mem = psutil.Process().memory_info()
+        return getattr(mem, "peak_wset", mem.rss) / (1024 * 1024)
+    except ImportError:
+        return None
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+# -----------------------------
+# Stages
+# -----------------------------
+class Bench:
+    """Sets up each requested stage (recording setup cost) and runs them frame by frame."""
+
+    def __init__(self, args, workdir):
+        self.args = args
+        self.workdir = workdir
+        self.timer = StageTimer("bench", setting=args.infer_size or "full", window=10 ** 6, enabled=True)
+        self.setup = {}
+        self.skipped = {}
+        self.runners = []
+        self._closers = []
+        for name in args.stages:
+            t0 = time.perf_counter()
+            try:
+                runner = getattr(self, f"_setup_{name}")()
+            except Exception as e:
+                self.skipped[name] = f"{type(e).__name__}: {e}"
+                print(f"[BENCH] {name}: skipped ({self.skipped[name]})")
+                continue
+            self.setup[name] = {"ms": (time.perf_counter() - t0) * 1000, "peak_rss_mb": peak_rss_mb()}
+            self.runners.append((name, runner))
+
+    # Every _setup_* returns run(frame, i, ctx); ctx carries results to later stages of the same frame
+    def _engine(self):
+        if getattr(self, "engine", None) is None:
+            from detection.engine import DetectionEngine
+            a = self.args
+            self.engine = DetectionEngine(conf=a.conf, infer_size=a.infer_size or None, backend=a.backend,
+                                          threads=a.threads, int8=a.int8)
+        return self.engine
+
+    def _warm(self, weights):
+        # registry.warmup() only prints a failure; warm() raises it, so a missing model skips the stage
+        from detection.backends import EXPORT_IMGSZ
+        from detection.model_registry import registry
+        engine = self._engine()
+        registry.warm(weights, imgsz=engine.scaler.infer_size or EXPORT_IMGSZ, **engine.model_opts)
+        return engine
+
+    def _setup_detect(self):
+        engine = self._warm(self._engine().object_model_path)
+
+        def run(frame, i, ctx):
+            ctx["objects"] = engine.detect_objects(frame)
+        return run
+
+    def _setup_pose(self):
+        engine = self._warm(self._engine().pose_model_path)
+
+        def run(frame, i, ctx):
+            ctx["persons"] = engine.detect_people(frame)
+        return run
+
+    def _setup_faces(self):
+        from detection.face_recognize import load_known_faces, recognize_faces
+        load_known_faces()
+
+        def run(frame, i, ctx):
+            ctx["faces"] = recognize_faces(frame)
+        return run
+
+    def _wrists(self, frame, i, ctx):
+        """Pose wrists when the pose stage ran, else --people synthetic pairs of wrists sweeping the frame."""
+        from detection.item_watch import yolo_wrists
+        if "persons" in ctx:
+            return [(p.get("track_id", n), yolo_wrists(p)) for n, p in enumerate(ctx["persons"])]
+        h, w = frame.shape[:2]
+        people = []
+        for n in range(self.args.people):
+            x = int((i * 37 + n * w / self.args.people) % w)
+            y = int(h * (n + 1) / (self.args.people + 1))
+            people.append((n, [("R", (x, y), 0.9), ("L", (min(x + 40, w - 1), y), 0.8)]))
+        return people
+
+    def _setup_roi(self):
+        from detection.item_watch import ItemWatcher
+        with open(ITEMS_FILE, "r") as f:
+            watcher = ItemWatcher(json.load(f))
+
+        def run(frame, i, ctx):
+            ctx["item_event"] = watcher.update_people((frame.shape[1], frame.shape[0]),
+                                                      self._wrists(frame, i, ctx), i / 30.0)
+        return run
+
+    def _setup_zones(self):
+        from detection.zones import ZoneMonitor
+        monitor = ZoneMonitor([RESTRICTED_AREA])
+
+        def run(frame, i, ctx):
+            ctx["zone_events"], _ = monitor.update(self._wrists(frame, i, ctx), i / 30.0)
+        return run
+
+    def _setup_log(self):
+        # Must be set before utils.logger is imported anywhere
+        os.environ["THEFT_LOG_DIR"] = os.path.join(self.workdir, "logs")
+        from utils import logger
+        from utils.logger import log_event
+        # Flush the writer thread before the temp directory goes away
+        self._closers.append(logger._writer.close)
+
+        def run(frame, i, ctx):
+            log_event(face=None, objects=[o["class"] for o in ctx.get("objects", [])], alerts=False)
+        return run
+
+    def _setup_snapshot(self):
+        from utils.storage import SnapshotStore
+        self.store = SnapshotStore(os.path.join(self.workdir, "captures"), quality=self.args.jpeg_quality)
+
+        def run(frame, i, ctx):
+            self.store.write(self.store.plan("bench", name=f"frame_{i}"), frame)
+        return run
+
+    def _setup_events(self):
+        from utils import event_store
+        conn = event_store.connect(os.path.join(self.workdir, "events.db"))
+        self._closers.append(conn.close)
+
+        def run(frame, i, ctx):
+            event_store.insert_events(conn, [{"ts": time.time(), "img_path": f"frame_{i}.jpg", "score": 0.7,
+                                              "dist_px": 10.0, "vel": 0.0, "hand": "R", "item_name": "bench"}])
+        return run
+
+    def run(self, frames, warmup):
+        for i, frame in enumerate(frames[:warmup]):
+            ctx = {}
+            for _, runner in self.runners:
+                runner(frame, -1 - i, ctx)
+        totals = []
+        for i, frame in enumerate(frames):
+            ctx = {}
+            t0 = time.perf_counter()
+            for name, runner in self.runners:
+                with self.timer.stage(name):
+                    runner(frame, i, ctx)
+            totals.append((time.perf_counter() - t0) * 1000)
+        return sorted(totals)
+
+    def close(self):
+        for close in self._closers:
+            close()
+
+
+def stage_entry(s):
+    return {"p50": s["p50"], "p95": s["p95"], "p99": s["p99"], "mean": s["mean"], "n": s["n"],
+            "fps": 1000.0 / s["mean"] if s["mean"] > 0 else None}
+
+
+# -----------------------------
+# Comparison
+# -----------------------------
+def compare(baseline, current, tolerance):
+    """Prints per-stage deltas; returns the stages whose p95 got worse by more than tolerance (%)."""
+    regressions = []
+    print(f"{'stage':<10} {'p50 base':>10} {'p50 now':>10} {'p95 base':>10} {'p95 now':>10} {'p95 delta':>10}")
+    rows = dict(current["stages"], total=current["total"])
+    base_rows = dict(baseline.get("stages", {}), total=baseline.get("total"))
+    for name, now in rows.items():
+        base = base_rows.get(name)
+        if not base:
+            print(f"{name:<10} {'-':>10} {now['p50']:>8.2f}ms {'-':>10} {now['p95']:>8.2f}ms {'new':>10}")
+            continue
+        delta = (now["p95"] - base["p95"]) / base["p95"] * 100 if base["p95"] else 0.0
+        flag = ""
+        if delta > tolerance:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:<10} {base['p50']:>8.2f}ms {now['p50']:>8.2f}ms {base['p95']:>8.2f}ms {now['p95']:>8.2f}ms "
+              f"{delta:>+9.1f}%{flag}")
+    base_rss, rss = baseline.get("peak_rss_mb"), current.get("peak_rss_mb")
+    if base_rss and rss:
+        print(f"peak RSS {base_rss:.0f}MB -> {rss:.0f}MB ({(rss - base_rss) / base_rss * 100:+.1f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage pipeline benchmark")
+    parser.add_argument("fixtures", nargs="*", help=f"images / clips (default: reference.jpg + {FIXTURE_DIR}/*)")
+    parser.add_argument("--frames", type=int, default=100, help="max frames per clip (repeats per image)")
+    parser.add_argument("--warmup", type=int, default=3, help="frames run before timing starts")
+    parser.add_argument("--stages", nargs="+", default=list(STAGES), choices=STAGES)
+    parser.add_argument("--backend", choices=["torch", "onnx", "openvino"], default="torch")
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--int8", action="store_true")
+    parser.add_argument("--infer-size", type=int, default=640, help="long side the models see (0 = full frame)")
+    parser.add_argument("--conf", type=float, default=0.5)
+    parser.add_argument("--jpeg-quality", type=int, default=85)
+    parser.add_argument("--people", type=int, default=1, help="synthetic people for roi/zones without the pose stage")
+    parser.add_argument("--out", default=None, help=f"results JSON (default: {RESULTS_DIR}/bench-<time>.json)")
+    parser.add_argument("--compare", default=None, help="earlier results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=10.0, help="allowed p95 increase in %% before flagging")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit 1 when a stage regressed")
+    args = parser.parse_args()
+
+    fixtures = args.fixtures or default_fixtures()
+    frames = [f for path in fixtures for f in load_fixture(path, args.frames)]
+    if not frames:
+        print("no frames")
+        return 1
+    print(f"[BENCH] {len(frames)} frames from {len(fixtures)} fixture(s), stages: {' '.join(args.stages)}")
+
+    with tempfile.TemporaryDirectory(prefix="theft-bench-") as workdir:
+        bench = Bench(args, workdir)
+        if not bench.runners:
+            print("[BENCH] nothing to run")
+            return 1
+        t0 = time.perf_counter()
+        try:
+            totals = bench.run(frames, args.warmup)
+        finally:
+            bench.close()
+        wall = time.perf_counter() - t0
+        stages = {name: stage_entry(s) for name, s in bench.timer.summary().items()}
+
+    total_mean = sum(totals) / len(totals)
+    results = {
+        "meta": {
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "fixtures": fixtures,
+            "frames": len(frames),
+            "args": {k: v for k, v in vars(args).items() if k not in ("fixtures", "out", "compare")},
+        },
+        "setup": bench.setup,
+        "skipped": bench.skipped,
+        "stages": stages,
+        "total": {"p50": percentile(totals, 50), "p95": percentile(totals, 95), "p99": percentile(totals, 99),
+                  "mean": total_mean, "n": len(totals), "fps": len(frames) / wall if wall > 0 else None},
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+    print(f"{'stage':<10} {'p50':>9} {'p95':>9} {'p99':>9} {'fps':>9}")
+    for name, s in dict(stages, total=results["total"]).items():
+        fps = f"{s['fps']:.1f}" if s["fps"] else "-"
+        print(f"{name:<10} {s['p50']:>7.2f}ms {s['p95']:>7.2f}ms {s['p99']:>7.2f}ms {fps:>9}")
+    if results["peak_rss_mb"] is not None:
+        print(f"peak RSS {results['peak_rss_mb']:.0f}MB")
+
+    out = args.out or os.path.join(RESULTS_DIR, f"bench-{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"[BENCH] results written to {out}")
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, results, args.tolerance)
+        if regressions and args.fail_on_regression:
+            print(f"[BENCH] regressions: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
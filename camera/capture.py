@@ -1,9 +1,113 @@
-# capture.py � part of camera
+# capture.py — part of camera
 # camera/capture.py
+import threading
+import time
+
 import cv2
 
-cap = cv2.VideoCapture(0)
+
+class LatestFrameReader:
+    """
+    Reads a camera in a background thread and keeps only the newest frame.
+    Slow consumers always get a fresh frame instead of draining a backlog
+    of stale ones from the driver buffer.
+    """
+
+    def __init__(self, source=0, reconnect_delay=1.0):
+        self.source = source
+        self.reconnect_delay = reconnect_delay
+        self.frames_read = 0
+        self._cap = None
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._latest = None          # (frame_id, timestamp, frame)
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, name="capture", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+        if self._cap is not None:
+            self._cap.release()
+
+    def _open(self):
+        cap = cv2.VideoCapture(self.source)
+        # Keep the driver-side queue as short as the backend allows
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        return cap
+
+    def _loop(self):
+        last_warn = 0
+        while self._running:
+            if self._cap is None or not self._cap.isOpened():
+                self._cap = self._open()
+                if not self._cap.isOpened():
+                    time.sleep(self.reconnect_delay)
+                    continue
+            ret, frame = self._cap.read()
+            if not ret:
+                if time.time() - last_warn >= 3:
+                    print("[WARN] ⚠️ No frame captured.")
+                    last_warn = time.time()
+                # Video files end; cameras may just hiccup
+                if isinstance(self.source, str) and not self.source.startswith(("rtsp://", "http")):
+                    self._running = False
+                    break
+                time.sleep(0.01)
+                continue
+            with self._cond:
+                self.frames_read += 1
+                self._latest = (self.frames_read, time.monotonic(), frame)
+                self._cond.notify_all()
+        with self._cond:
+            self._cond.notify_all()
+
+    @property
+    def running(self):
+        return self._running
+
+    def read(self, last_id=0, timeout=1.0):
+        """
+        Block until a frame newer than ``last_id`` is available.
+        Returns (frame_id, timestamp, frame) or None on timeout / stop.
+        """
+        with self._cond:
+            deadline = time.monotonic() + timeout
+            while self._running and (self._latest is None or self._latest[0] <= last_id):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+            if self._latest is None or self._latest[0] <= last_id:
+                return None
+            return self._latest
+
+
+def parse_source(source):
+    """Device index ("0" -> 0), RTSP/HTTP URL or video file path."""
+    if isinstance(source, int):
+        return source
+    source = str(source)
+    return int(source) if source.isdigit() else source
+
+
+# -----------------------------
+# Legacy single-frame helper
+# -----------------------------
+cap = None
 
 def get_frame():
+    global cap
+    if cap is None:
+        cap = cv2.VideoCapture(0)
     ret, frame = cap.read()
     return frame
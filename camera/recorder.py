@@ -1 +1,312 @@
-# recorder.py  part of camera
+# recorder.py — part of camera
+# camera/recorder.py
+"""
+Pre-event clip recorder.
+
+The detection loop copies every raw frame into a preallocated ring that
+lives in shared memory (one memcpy, no allocation). When an event fires,
+trigger() sends a tiny job (clip path, first frame, end time) to a separate
+encoder process, which reads the pre-roll straight out of the ring, follows
+the post-roll as it is written and encodes an MP4. The frame loop never
+waits: jobs are dropped when the encoder is too far behind, and frames the
+encoder could not read before they were overwritten are counted as lost.
+
+    frame loop --push()--> [shared ring: seq | ts | frame] <--reads-- encoder process
+               --trigger()--> stdin (JSON lines)            --stdout--> finished clips
+
+The encoder is started with ``python -m camera.recorder`` rather than
+multiprocessing, so it never re-imports the calling script.
+"""
+import json
+import math
+import os
+import subprocess
+import sys
+import threading
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+CLIP_DIR = "clips"
+CODEC = "mp4v"
+HEADER_BYTES = 64            # head sequence number (int64) + padding
+
+
+def _ring_views(buf, capacity, shape):
+    """numpy views over the shared block: head, per-slot seq, per-slot ts, frames."""
+    head = np.ndarray((1,), np.int64, buf, 0)
+    seqs = np.ndarray((capacity,), np.int64, buf, HEADER_BYTES)
+    stamps = np.ndarray((capacity,), np.float64, buf, HEADER_BYTES + 8 * capacity)
+    frames = np.ndarray((capacity,) + tuple(shape), np.uint8, buf, HEADER_BYTES + 16 * capacity)
+    return head, seqs, stamps, frames
+
+
+def _ring_bytes(capacity, shape):
+    return HEADER_BYTES + 16 * capacity + capacity * int(np.prod(shape))
+
+
+class ClipRecorder:
+    """
+    :param pre_seconds: seconds of video kept before an event
+    :param post_seconds: seconds recorded after the (last) event
+    :param fps: recording rate; faster pushes are thinned out, and the ring
+                holds (pre + post) seconds at this rate
+    :param max_pending: clip jobs allowed in flight before new ones are dropped
+    :param on_saved: called with the path of each finished clip (e.g. SnapshotStore.add for the disk quota)
+    """
+
+    def __init__(self, pre_seconds=5.0, post_seconds=5.0, fps=15, out_dir=CLIP_DIR, max_pending=4, on_saved=None):
+        self.pre_seconds = pre_seconds
+        self.post_seconds = post_seconds
+        self.fps = fps
+        self.out_dir = out_dir
+        self.max_pending = max_pending
+        self.on_saved = on_saved
+        self.capacity = int(math.ceil((pre_seconds + post_seconds) * fps)) + 1
+        self.shape = None
+        self.frames_pushed = 0
+        self.frames_thinned = 0
+        self.dropped_jobs = 0
+        self.finished = []            # [(path, frames written, frames lost)]
+        self._shm = None
+        self._views = None
+        self._proc = None
+        self._reader = None
+        self._seq = 0
+        self._last_ts = None
+        self._pending = 0
+        self._clip_end = None         # (path, end_ts) of the clip still recording
+        self._lock = threading.Lock()
+
+    # -----------------------------
+    # Ring / encoder lifecycle
+    # -----------------------------
+    def _open(self, shape):
+        self._close_ring()
+        self.shape = tuple(shape)
+        self._shm = shared_memory.SharedMemory(create=True, size=_ring_bytes(self.capacity, self.shape))
+        self._views = _ring_views(self._shm.buf, self.capacity, self.shape)
+        head, seqs, _, _ = self._views
+        head[0] = 0
+        seqs[:] = -1
+        self._seq = 0
+        os.makedirs(self.out_dir, exist_ok=True)
+        cmd = [sys.executable, "-m", "camera.recorder", self._shm.name, str(self.capacity),
+               ",".join(map(str, self.shape)), str(self.fps)]
+        self._proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, bufsize=1,
+                                      cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        self._reader = threading.Thread(target=self._read_results, args=(self._proc,), name="clip-results",
+                                        daemon=True)
+        self._reader.start()
+
+    def _read_results(self, proc):
+        for line in proc.stdout:
+            try:
+                msg = json.loads(line)
+            except ValueError:
+                continue
+            with self._lock:
+                self._pending = max(0, self._pending - 1)
+                self.finished.append((msg["path"], msg["frames"], msg["lost"]))
+            print(f"[CLIP] saved {msg['path']} ({msg['frames']} frames, {msg['lost']} lost)")
+            if self.on_saved is not None and msg["frames"]:
+                try:
+                    self.on_saved(msg["path"])
+                except Exception as e:
+                    print(f"[CLIP] on_saved failed for {msg['path']}: {e}")
+
+    def _send(self, msg):
+        try:
+            self._proc.stdin.write(json.dumps(msg) + "\n")
+            self._proc.stdin.flush()
+            return True
+        except (OSError, ValueError):
+            return False
+
+    def _close_ring(self):
+        if self._proc is not None:
+            self._send({"op": "quit"})
+            try:
+                self._proc.stdin.close()
+            except OSError:
+                pass
+            try:
+                self._proc.wait(timeout=self.post_seconds + 5)
+            except subprocess.TimeoutExpired:
+                self._proc.kill()
+            self._proc = None
+        if self._shm is not None:
+            self._views = None
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def close(self):
+        self._close_ring()
+
+    # -----------------------------
+    # Frame loop side
+    # -----------------------------
+    def push(self, frame, ts=None):
+        """Copies one raw frame into the ring. ``ts`` is time.monotonic() of capture."""
+        ts = time.monotonic() if ts is None else ts
+        if self._last_ts is not None and ts - self._last_ts < 0.5 / self.fps:
+            self.frames_thinned += 1
+            return
+        if self._shm is None or frame.shape != self.shape:
+            self._open(frame.shape)
+        head, seqs, stamps, frames = self._views
+        self._seq += 1
+        slot = self._seq % self.capacity
+        # seq -1 while the slot is being rewritten, so the encoder can spot torn reads
+        seqs[slot] = -1
+        np.copyto(frames[slot], frame)
+        stamps[slot] = ts
+        seqs[slot] = self._seq
+        head[0] = self._seq
+        self._last_ts = ts
+        self.frames_pushed += 1
+
+    def trigger(self, name="event", ts=None):
+        """
+        Requests a clip around ``ts`` (monotonic, default now). A trigger while
+        a clip is still recording extends that clip instead of starting a new one.
+        Returns the clip path, or None if the job was dropped.
+        """
+        if self._shm is None:
+            return None
+        ts = time.monotonic() if ts is None else ts
+        end_ts = ts + self.post_seconds
+        if self._clip_end is not None and ts <= self._clip_end[1]:
+            path = self._clip_end[0]
+            self._clip_end = (path, end_ts)
+            self._send({"op": "extend", "path": os.path.abspath(path), "end_ts": end_ts})
+            return path
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.dropped_jobs += 1
+                return None
+            self._pending += 1
+        _, seqs, stamps, _ = self._views
+        # Oldest frame of the pre-roll still in the ring
+        valid = seqs >= 0
+        in_window = valid & (stamps >= ts - self.pre_seconds)
+        start_seq = int(seqs[in_window].min()) if in_window.any() else self._seq
+        stamp = time.strftime("%Y%m%d_%H%M%S")
+        path = os.path.join(self.out_dir, f"{name}_{stamp}_{start_seq}.mp4")
+        if not self._send({"op": "clip", "path": os.path.abspath(path), "start_seq": start_seq, "end_ts": end_ts}):
+            with self._lock:
+                self._pending -= 1
+            self.dropped_jobs += 1
+            return None
+        self._clip_end = (path, end_ts)
+        return path
+
+    def stats(self):
+        return (f"[CLIP] ring={self.capacity} frames pushed={self.frames_pushed} thinned={self.frames_thinned} "
+                f"pending={self._pending} dropped_jobs={self.dropped_jobs} saved={len(self.finished)}")
+
+
+# -----------------------------
+# Encoder process
+# -----------------------------
+def _encode_clip(job, views, capacity, fps, control):
+    """Streams frames start_seq.. from the ring into an MP4 until end_ts has passed."""
+    head, seqs, stamps, frames = views
+    tmp_path = job["path"] + ".part.mp4"
+    h, w = frames.shape[1:3]
+    writer = None
+    seq, written, lost = job["start_seq"], 0, 0
+    end_ts = job["end_ts"]
+    idle_since = time.monotonic()
+    buf = np.empty(frames.shape[1:], np.uint8)
+    while True:
+        # Extensions of this clip arrive while it is recording
+        while control:
+            msg = control[0]
+            if msg["op"] == "extend" and msg["path"] == job["path"]:
+                end_ts = max(end_ts, msg["end_ts"])
+                control.pop(0)
+            else:
+                break
+        newest = int(head[0])
+        if seq > newest:
+            # Camera stopped before the post-roll ended
+            if time.monotonic() - idle_since > 2.0 and time.monotonic() > end_ts:
+                break
+            time.sleep(0.005)
+            continue
+        idle_since = time.monotonic()
+        if newest - seq >= capacity:
+            lost += newest - seq - capacity + 1
+            seq = newest - capacity + 1
+        slot = seq % capacity
+        np.copyto(buf, frames[slot])
+        ts = float(stamps[slot])
+        if int(seqs[slot]) != seq:
+            lost += 1
+            seq += 1
+            continue
+        if ts > end_ts:
+            break
+        if writer is None:
+            # Rate from the pre-roll timestamps, so playback runs at real speed
+            span = [float(stamps[s % capacity]) for s in range(seq, newest + 1) if int(seqs[s % capacity]) == s]
+            rate = (len(span) - 1) / (span[-1] - span[0]) if len(span) > 1 and span[-1] > span[0] else fps
+            writer = cv2.VideoWriter(tmp_path, cv2.VideoWriter_fourcc(*CODEC), min(rate, fps), (w, h))
+        writer.write(buf)
+        written += 1
+        seq += 1
+    if writer is not None:
+        writer.release()
+        os.replace(tmp_path, job["path"])
+    return written, lost
+
+
+def _encoder_main(shm_name, capacity, shape, fps):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    if os.name == "posix":
+        # The parent owns the block; stop this process's tracker from unlinking it at exit
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    views = _ring_views(shm.buf, capacity, shape)
+    control = []
+    cond = threading.Condition()
+
+    def read_stdin():
+        for line in sys.stdin:
+            try:
+                msg = json.loads(line)
+            except ValueError:
+                continue
+            with cond:
+                control.append(msg)
+                cond.notify()
+        with cond:
+            control.append({"op": "quit"})
+            cond.notify()
+
+    threading.Thread(target=read_stdin, daemon=True).start()
+    while True:
+        with cond:
+            while not control:
+                cond.wait()
+            msg = control.pop(0)
+        if msg["op"] == "quit":
+            break
+        if msg["op"] != "clip":
+            continue
+        try:
+            written, lost = _encode_clip(msg, views, capacity, fps, control)
+        except Exception as e:
+            print(f"[CLIP] encoding {msg['path']} failed: {e}", file=sys.stderr)
+            written, lost = 0, 0
+        print(json.dumps({"path": msg["path"], "frames": written, "lost": lost}), flush=True)
+    del views
+    shm.close()
+
+
+if __name__ == "__main__":
+    _encoder_main(sys.argv[1], int(sys.argv[2]), tuple(int(v) for v in sys.argv[3].split(",")), float(sys.argv[4]))
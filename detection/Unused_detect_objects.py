@@ -5,10 +5,17 @@ import cv2
 
 proto = "models/MobileNetSSD_deploy.prototxt"
 model = "models/MobileNetSSD_deploy.caffemodel"
-net = cv2.dnn.readNetFromCaffe(proto, model)
+net = None   # loaded on first use, not at import
 CLASSES = ["background","aeroplane","bicycle","bird","boat","bottle","bus","car","cat","chair","cow","diningtable","dog","horse","motorbike","person",
            "pottedplant","sheep","sofa","train","tvmonitor"]
 
+
+def get_net():
+    global net
+    if net is None:
+        net = cv2.dnn.readNetFromCaffe(proto, model)
+    return net
+
 # def detect_person(frame, conf_thresh=0.5):
 #     (h, w) = frame.shape[:2]
 #     blob = cv2.dnn.blobFromImage(cv2.resize(frame,(300,300)),0.007843,(300,300),127.5)
@@ -25,6 +32,7 @@ CLASSES = ["background","aeroplane","bicycle","bird","boat","bottle","bus","car"
 def detect_objects(frame, conf_thresh=0.5):
     (h, w) = frame.shape[:2]
     blob = cv2.dnn.blobFromImage(cv2.resize(frame,(300,300)),0.007843,(300,300),127.5)
+    net = get_net()
     net.setInput(blob)
     detections = net.forward()
     objects = []
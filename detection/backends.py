@@ -0,0 +1,237 @@
+# backends.py — part of detection
+# detection/backends.py
+"""
+Pluggable inference backends for the YOLO object and pose models.
+
+    load_model("models/yolov8n-pose.pt", backend="onnx", threads=4, int8=True)
+
+"torch"     the ultralytics YOLO wrapper (default, what the code used before)
+"onnx"      exported once to ONNX, cached under models/cache/onnx/ (keyed by the
+            hash of the .pt), run by ONNX Runtime
+"openvino"  the same ONNX file on ONNX Runtime's OpenVINO execution provider
+
+Every backend is called like ``YOLO``: ``model(frames, conf=, classes=, imgsz=)``
+returns one result per frame with ``.boxes`` (``xyxy``/``conf``/``cls`` arrays,
+iterable as boxes with ``box.cls[0]``, ``box.conf[0]``, ``box.xyxy[0]``) and
+``.keypoints.data`` (N, 17, 3) for pose models, so the engine code is unchanged.
+"""
+import ast
+import os
+
+import cv2
+import numpy as np
+
+from utils.artifacts import CACHE_DIR, artifact_path
+
+BACKENDS = ("torch", "onnx", "openvino")
+EXPORT_IMGSZ = 640
+IOU_THRESHOLD = 0.7          # ultralytics default
+MAX_DET = 300
+LETTERBOX_COLOR = 114
+
+
+# -----------------------------
+# Result objects (the subset of the ultralytics API the loop uses)
+# -----------------------------
+class _Box:
+    __slots__ = ("xyxy", "conf", "cls")
+
+    def __init__(self, xyxy, conf, cls):
+        self.xyxy = xyxy[None]
+        self.conf = np.array([conf], np.float32)
+        self.cls = np.array([cls], np.float32)
+
+
+class Boxes:
+    def __init__(self, xyxy, conf, cls):
+        self.xyxy = xyxy
+        self.conf = conf
+        self.cls = cls
+
+    def __len__(self):
+        return len(self.xyxy)
+
+    def __iter__(self):
+        for i in range(len(self.xyxy)):
+            yield _Box(self.xyxy[i], self.conf[i], self.cls[i])
+
+
+class Keypoints:
+    def __init__(self, data):
+        self.data = data
+
+
+class Result:
+    def __init__(self, boxes, keypoints, names):
+        self.boxes = boxes
+        self.keypoints = keypoints
+        self.names = names
+
+
+# -----------------------------
+# Export / cache
+# -----------------------------
+def cached_onnx_path(weights, imgsz=EXPORT_IMGSZ, int8=False, cache_dir=CACHE_DIR):
+    return artifact_path("onnx", weights, ".onnx", imgsz, "int8" if int8 else None, cache_dir=cache_dir)
+
+
+def export_onnx(weights, imgsz=EXPORT_IMGSZ, int8=False, cache_dir=CACHE_DIR):
+    """
+    Exports ``weights`` (.pt) to ONNX with a dynamic batch/size axis, optionally
+    with INT8 dynamic quantization of the weights. The cached file is named
+    after the hash of the weights, so it is rebuilt only when they change.
+    """
+    out = cached_onnx_path(weights, imgsz, int8, cache_dir)
+    if os.path.exists(out):
+        return out
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    fp32 = cached_onnx_path(weights, imgsz, False, cache_dir)
+    if not os.path.exists(fp32):
+        from ultralytics import YOLO
+        print(f"[BACKEND] Exporting {weights} to ONNX ({imgsz}px)...")
+        exported = YOLO(weights).export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True)
+        os.replace(exported, fp32)
+    if int8:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        print(f"[BACKEND] Quantizing {fp32} to INT8...")
+        tmp = out + ".tmp"
+        quantize_dynamic(fp32, tmp, weight_type=QuantType.QUInt8)
+        os.replace(tmp, out)
+    return out
+
+
+# -----------------------------
+# ONNX Runtime runner
+# -----------------------------
+def letterbox(frame, size):
+    """Resize keeping aspect ratio and pad to size x size like ultralytics. -> (image, ratio, (pad_x, pad_y))"""
+    h, w = frame.shape[:2]
+    r = min(size / h, size / w)
+    nw, nh = int(round(w * r)), int(round(h * r))
+    pad_x, pad_y = (size - nw) / 2, (size - nh) / 2
+    if (nw, nh) != (w, h):
+        frame = cv2.resize(frame, (nw, nh), interpolation=cv2.INTER_LINEAR)
+    top, left = int(round(pad_y - 0.1)), int(round(pad_x - 0.1))
+    out = cv2.copyMakeBorder(frame, top, size - nh - top, left, size - nw - left, cv2.BORDER_CONSTANT,
+                             value=(LETTERBOX_COLOR,) * 3)
+    return out, r, (left, top)
+
+
+def _nms(xyxy, scores, cls, iou):
+    """Class-aware NMS via the usual per-class coordinate offset."""
+    offset = cls[:, None] * 7680.0
+    b = xyxy + offset
+    rects = np.column_stack([b[:, 0], b[:, 1], b[:, 2] - b[:, 0], b[:, 3] - b[:, 1]]).tolist()
+    keep = cv2.dnn.NMSBoxes(rects, scores.tolist(), 0.0, iou, top_k=MAX_DET)
+    return np.array(keep, dtype=np.int64).reshape(-1)
+
+
+class OnnxModel:
+    """
+    :param path: .onnx file exported by ultralytics (names/task/kpt_shape come from its metadata)
+    :param threads: ONNX Runtime intra-op threads (None = library default)
+    :param provider: "onnx" (CPU EP) or "openvino" (OpenVINO EP, falls back to CPU)
+    """
+
+    def __init__(self, path, threads=None, provider="onnx"):
+        import onnxruntime as ort
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        opts.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        opts.inter_op_num_threads = 1
+        if threads:
+            opts.intra_op_num_threads = int(threads)
+        providers = ["CPUExecutionProvider"]
+        if provider == "openvino":
+            if "OpenVINOExecutionProvider" in ort.get_available_providers():
+                ov = {"device_type": "CPU"}
+                if threads:
+                    ov["num_of_threads"] = str(int(threads))
+                providers = [("OpenVINOExecutionProvider", ov), "CPUExecutionProvider"]
+            else:
+                print("[BACKEND] OpenVINO execution provider not installed (pip install onnxruntime-openvino); using CPU")
+        self.session = ort.InferenceSession(path, sess_options=opts, providers=providers)
+        self.input_name = self.session.get_inputs()[0].name
+        meta = self.session.get_modelmeta().custom_metadata_map
+        self.names = ast.literal_eval(meta["names"]) if "names" in meta else {}
+        self.task = meta.get("task", "detect")
+        self.kpt_shape = tuple(ast.literal_eval(meta["kpt_shape"])) if "kpt_shape" in meta else None
+        imgsz = ast.literal_eval(meta["imgsz"]) if "imgsz" in meta else [EXPORT_IMGSZ]
+        self.imgsz = int(max(imgsz) if isinstance(imgsz, (list, tuple)) else imgsz)
+        shape = self.session.get_inputs()[0].shape
+        self.dynamic = not all(isinstance(d, int) for d in shape)
+
+    def __call__(self, frames, conf=0.25, classes=None, imgsz=None, verbose=False, **_):
+        if isinstance(frames, np.ndarray):
+            frames = [frames]
+        size = self.imgsz if (imgsz is None or not self.dynamic) else int(-(-int(imgsz) // 32) * 32)
+        results = []
+        # Fixed-shape exports take one frame per call
+        step = len(frames) if self.dynamic else 1
+        for i in range(0, len(frames), max(step, 1)):
+            chunk = frames[i:i + step]
+            batch = np.empty((len(chunk), 3, size, size), np.float32)
+            meta = []
+            for j, frame in enumerate(chunk):
+                img, r, pad = letterbox(frame, size)
+                batch[j] = img[:, :, ::-1].transpose(2, 0, 1)
+                meta.append((r, pad, frame.shape[:2]))
+            batch *= 1.0 / 255.0
+            out = self.session.run(None, {self.input_name: batch})[0]
+            for pred, m in zip(out, meta):
+                results.append(self._postprocess(pred, m, conf, classes))
+        return results
+
+    def _postprocess(self, pred, meta, conf, classes):
+        r, (pad_x, pad_y), (h, w) = meta
+        pred = pred.T                                   # (anchors, 4 + nc [+ nk*3])
+        nc = len(self.names) if self.names else (pred.shape[1] - 4)
+        scores_all = pred[:, 4:4 + nc]
+        cls = scores_all.argmax(1)
+        scores = scores_all[np.arange(len(cls)), cls]
+        mask = scores > conf
+        if classes is not None:
+            mask &= np.isin(cls, classes)
+        pred, cls, scores = pred[mask], cls[mask], scores[mask]
+
+        xyxy = np.empty((len(pred), 4), np.float32)
+        xyxy[:, 0] = pred[:, 0] - pred[:, 2] / 2
+        xyxy[:, 1] = pred[:, 1] - pred[:, 3] / 2
+        xyxy[:, 2] = pred[:, 0] + pred[:, 2] / 2
+        xyxy[:, 3] = pred[:, 1] + pred[:, 3] / 2
+        keep = _nms(xyxy, scores, cls.astype(np.float32), IOU_THRESHOLD) if len(pred) else np.empty(0, np.int64)
+        keep = keep[np.argsort(-scores[keep])] if len(keep) else keep
+        xyxy, scores, cls, pred = xyxy[keep], scores[keep], cls[keep], pred[keep]
+
+        # Undo the letterbox
+        xyxy[:, [0, 2]] = ((xyxy[:, [0, 2]] - pad_x) / r).clip(0, w)
+        xyxy[:, [1, 3]] = ((xyxy[:, [1, 3]] - pad_y) / r).clip(0, h)
+        keypoints = None
+        if self.task == "pose" and self.kpt_shape:
+            nk, dims = self.kpt_shape
+            kpts = pred[:, 4 + nc:4 + nc + nk * dims].reshape(-1, nk, dims).astype(np.float32)
+            kpts[..., 0] = (kpts[..., 0] - pad_x) / r
+            kpts[..., 1] = (kpts[..., 1] - pad_y) / r
+            keypoints = Keypoints(kpts)
+        return Result(Boxes(xyxy, scores.astype(np.float32), cls.astype(np.float32)), keypoints, self.names)
+
+
+# -----------------------------
+# Entry point
+# -----------------------------
+def load_model(weights, backend="torch", threads=None, int8=False, imgsz=EXPORT_IMGSZ):
+    """
+    :param weights: .pt path (or an .onnx file for the onnx/openvino backends)
+    :param threads: intra-op threads for ONNX Runtime / torch
+    :param int8: use a dynamically INT8-quantized copy (onnx/openvino only)
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown backend {backend!r}, expected one of {BACKENDS}")
+    if backend == "torch":
+        from ultralytics import YOLO
+        if threads:
+            import torch
+            torch.set_num_threads(int(threads))
+        return YOLO(weights)
+    path = weights if weights.endswith(".onnx") else export_onnx(weights, imgsz=imgsz, int8=int8)
+    return OnnxModel(path, threads=threads, provider=backend)
@@ -0,0 +1,198 @@
+# engine.py — part of detection
+# detection/engine.py
+"""
+Fused detection: person boxes and keypoints come from a single pose pass,
+the object model only runs for the non-person classes and only on a schedule.
+"""
+import contextlib
+import threading
+
+import numpy as np
+
+from detection.backends import EXPORT_IMGSZ
+from detection.model_registry import registry
+from detection.scaling import FrameScaler, detections_to_source
+
+OBJECT_MODEL_PATH = "models/Training_model/yolov8n.pt"
+POSE_MODEL_PATH = "models/yolov8n-pose.pt"
+
+LEFT_WRIST, RIGHT_WRIST = 9, 10
+
+
+def _to_numpy(t):
+    return t.cpu().numpy() if hasattr(t, "cpu") else np.asarray(t)
+
+
+class DetectionEngine:
+    """
+    :param object_every: run the object model every Nth frame (0 = only on motion)
+    :param conf: confidence threshold for both models
+    :param infer_size: long side (px) the models see; frames are downscaled and
+                       results mapped back to source coordinates (None = full frame)
+    :param timer: optional utils.timing.StageTimer; records "pose" and "objects"
+    :param backend: "torch", "onnx" or "openvino" (see detection/backends.py)
+    :param threads: intra-op threads for the backend; int8: quantized ONNX weights
+    :param replica: engines with different replica numbers get separate model copies
+    Models come from the shared registry and are only loaded on first use
+    (or by warmup()), so constructing an engine is cheap.
+    Call with ``engine(frame, motion=True)`` to force an object pass when the
+    scene changed; between object passes the last object list is reused.
+    """
+
+    def __init__(self, object_model_path=OBJECT_MODEL_PATH, pose_model_path=POSE_MODEL_PATH,
+                 object_every=5, conf=0.5, infer_size=None, timer=None, backend="torch", threads=None,
+                 int8=False, replica=0):
+        self.backend = backend
+        self.pose_model_path = pose_model_path
+        self.object_model_path = object_model_path
+        self.model_opts = {"backend": backend, "threads": threads, "int8": int8, "replica": replica}
+        self.object_every = object_every
+        self.conf = conf
+        self.scaler = FrameScaler(infer_size)
+        self.timer = timer
+        self._object_classes = None
+        self._frame_idx = 0
+        self._objects = []
+        self._lock = threading.Lock()
+
+    # -----------------------------
+    # Models (lazy)
+    # -----------------------------
+    @property
+    def pose_model(self):
+        return registry.get(self.pose_model_path, **self.model_opts)
+
+    @property
+    def object_model(self):
+        return registry.get(self.object_model_path, **self.model_opts)
+
+    @property
+    def names(self):
+        return self.object_model.names
+
+    @property
+    def object_classes(self):
+        if self._object_classes is None:
+            self._object_classes = [i for i, n in self.names.items() if n != "person"]
+        return self._object_classes
+
+    def warmup(self, background=True):
+        """Loads both models and runs a dummy inference (on a thread unless background=False)."""
+        specs = [(self.pose_model_path, self.model_opts), (self.object_model_path, self.model_opts)]
+        return registry.warmup(specs, imgsz=self.scaler.infer_size or EXPORT_IMGSZ, background=background)
+
+    def detect_people(self, frame):
+        """One pose pass -> list of person dicts with box, confidence and keypoints (17, 3)."""
+        return self.detect_people_batch([frame])[0]
+
+    def _stage(self, name):
+        return self.timer.stage(name) if self.timer is not None else contextlib.nullcontext()
+
+    def _model_kwargs(self, imgsz=None):
+        kwargs = {"conf": self.conf, "verbose": False}
+        imgsz = imgsz or self.scaler.infer_size
+        if imgsz:
+            kwargs["imgsz"] = imgsz
+        return kwargs
+
+    def detect_people_batch(self, frames, imgsz=None):
+        """
+        Pose pass over several frames in one model call -> one person list per frame.
+        :param imgsz: model input size for frames the caller already downscaled
+        """
+        with self._stage("pose"):
+            prepared = [self.scaler.prepare(f) for f in frames]
+            results = self.pose_model([p[0] for p in prepared], **self._model_kwargs(imgsz))
+            return [detections_to_source(_persons_from_result(r), scale)
+                    for r, (_, scale) in zip(results, prepared)]
+
+    def detect_objects(self, frame):
+        """Object pass restricted to the non-person classes."""
+        return self.detect_objects_batch([frame])[0]
+
+    def detect_objects_batch(self, frames, imgsz=None):
+        out = []
+        with self._stage("objects"):
+            prepared = [self.scaler.prepare(f) for f in frames]
+            results = self.object_model([p[0] for p in prepared], classes=self.object_classes,
+                                        **self._model_kwargs(imgsz))
+            for r, (_, scale) in zip(results, prepared):
+                objects = []
+                for box in r.boxes:
+                    cls_id = int(box.cls[0])
+                    x1, y1, x2, y2 = map(int, box.xyxy[0])
+                    objects.append({"class": self.names[cls_id], "confidence": float(box.conf[0]),
+                                    "box": (x1, y1, x2, y2)})
+                out.append(detections_to_source(objects, scale))
+        return out
+
+    def _object_pass_due(self, motion):
+        if motion:
+            return True
+        return self.object_every > 0 and self._frame_idx % self.object_every == 0
+
+    def __call__(self, frame, motion=False, roi=None):
+        """
+        :param motion: force an object pass (e.g. motion just started)
+        :param roi: optional (x1, y1, x2, y2); the pose model only sees this
+                    crop and results are mapped back to full-frame coordinates.
+                    Scheduled object passes still use the full frame.
+        """
+        crop, dx, dy = frame, 0, 0
+        if roi is not None:
+            x1, y1, x2, y2 = roi
+            crop, dx, dy = frame[y1:y2, x1:x2], x1, y1
+        persons = _offset(self.detect_people(crop), dx, dy)
+        with self._lock:
+            run_objects = self._object_pass_due(motion)
+            self._frame_idx += 1
+        if run_objects:
+            objects = self.detect_objects(frame)
+            with self._lock:
+                self._objects = objects
+        else:
+            with self._lock:
+                objects = list(self._objects)
+        return {"persons": persons, "objects": persons + objects}
+
+
+def _persons_from_result(r):
+    persons = []
+    if r.boxes is None or len(r.boxes) == 0:
+        return persons
+    boxes = _to_numpy(r.boxes.xyxy).astype(int)
+    confs = _to_numpy(r.boxes.conf)
+    kpts = _to_numpy(r.keypoints.data) if r.keypoints is not None else None
+    for i in range(len(boxes)):
+        persons.append({
+            "class": "person",
+            "confidence": float(confs[i]),
+            "box": tuple(int(v) for v in boxes[i]),
+            "keypoints": kpts[i] if kpts is not None else np.zeros((17, 3), np.float32),
+        })
+    return persons
+
+
+def _offset(detections, dx, dy):
+    if not (dx or dy):
+        return detections
+    for det in detections:
+        x1, y1, x2, y2 = det["box"]
+        det["box"] = (x1 + dx, y1 + dy, x2 + dx, y2 + dy)
+        if "keypoints" in det:
+            kp = det["keypoints"].copy()
+            kp[:, 0] += dx
+            kp[:, 1] += dy
+            det["keypoints"] = kp
+    return detections
+
+
+def wrists(person, min_conf=0.3):
+    """Yields (index, (x, y), conf) for the visible wrists of a person dict."""
+    kp = person["keypoints"]
+    for idx in (LEFT_WRIST, RIGHT_WRIST):
+        if idx >= len(kp):
+            continue
+        x, y, conf = kp[idx]
+        if conf > min_conf:
+            yield idx, (int(x), int(y)), float(conf)
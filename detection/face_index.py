@@ -0,0 +1,157 @@
+# face_index.py — part of detection
+# detection/face_index.py
+"""
+Known-face embedding index.
+
+Encodings live in one (N, 128) NumPy matrix so every face in a frame is
+matched against every enrolled identity with a single matrix product.
+The matrix is cached on disk (encodings.npy + meta.json) keyed by the hash
+of each photo, so only photos whose content is new to the index are encoded
+on startup; renamed, copied or touched photos reuse their cached encoding.
+"""
+import json
+import os
+
+import numpy as np
+import face_recognition
+
+from utils.artifacts import file_hash
+
+FACES_DIR = "known_faces"
+INDEX_DIR = os.path.join("models", "face_index")
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+ENCODING_DIM = 128
+
+
+class FaceIndex:
+    def __init__(self, faces_dir=FACES_DIR, index_dir=INDEX_DIR):
+        self.faces_dir = faces_dir
+        self.index_dir = index_dir
+        self.encodings = np.zeros((0, ENCODING_DIM), dtype=np.float64)
+        self.names = []
+        self.files = []          # source photo of each row
+        self.signatures = {}     # file -> content hash (also records photos without a face)
+        self._sq_norms = np.zeros(0, dtype=np.float64)
+
+    def __len__(self):
+        return len(self.names)
+
+    # -----------------------------
+    # Persistence
+    # -----------------------------
+    @property
+    def _npy_path(self):
+        return os.path.join(self.index_dir, "encodings.npy")
+
+    @property
+    def _meta_path(self):
+        return os.path.join(self.index_dir, "meta.json")
+
+    def load(self):
+        """Loads the cached index; returns False if there is none (or it is unreadable)."""
+        try:
+            encodings = np.load(self._npy_path)
+            with open(self._meta_path, "r") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if len(meta.get("names", [])) != len(encodings):
+            return False
+        self.encodings = encodings.reshape(-1, ENCODING_DIM)
+        self.names = meta["names"]
+        self.files = meta["files"]
+        self.signatures = meta.get("signatures", {})
+        self._refresh_norms()
+        return True
+
+    def save(self):
+        os.makedirs(self.index_dir, exist_ok=True)
+        tmp_npy = self._npy_path + ".tmp.npy"
+        tmp_meta = self._meta_path + ".tmp"
+        np.save(tmp_npy, self.encodings)
+        with open(tmp_meta, "w") as f:
+            json.dump({"names": self.names, "files": self.files, "signatures": self.signatures}, f)
+        os.replace(tmp_npy, self._npy_path)
+        os.replace(tmp_meta, self._meta_path)
+
+    def _refresh_norms(self):
+        self._sq_norms = np.einsum("ij,ij->i", self.encodings, self.encodings)
+
+    # -----------------------------
+    # Incremental update
+    # -----------------------------
+    def sync(self):
+        """
+        Brings the index in line with faces_dir: keeps rows of unchanged
+        photos, encodes photos with unseen content and drops deleted ones.
+        Returns the number of photos that had to be encoded.
+        """
+        current = {}
+        if os.path.isdir(self.faces_dir):
+            for file in sorted(os.listdir(self.faces_dir)):
+                if file.lower().endswith(IMAGE_EXTS):
+                    current[file] = file_hash(os.path.join(self.faces_dir, file))
+
+        # Encodings (or "no face") already known for a given content hash
+        by_hash = {self.signatures.get(file): i for i, file in enumerate(self.files) if file in self.signatures}
+        known_hashes = set(self.signatures.values())
+        changed = any(self.signatures.get(file) != h for file, h in current.items()) or \
+            len(self.signatures) != len(current)
+
+        encodings, names, files = [], [], []
+        encoded = 0
+        for file, h in current.items():
+            if h in by_hash:
+                encodings.append(self.encodings[by_hash[h]].reshape(1, -1))
+            elif h in known_hashes:
+                continue                       # photo without a face, already reported
+            else:
+                image = face_recognition.load_image_file(os.path.join(self.faces_dir, file))
+                enc = face_recognition.face_encodings(image)
+                encoded += 1
+                if not enc:
+                    print(f"[WARN] No face found in {file}, skipping.")
+                    continue
+                encodings.append(np.asarray(enc[0], dtype=np.float64).reshape(1, -1))
+            names.append(file.split(".")[0])
+            files.append(file)
+
+        self.encodings = (np.vstack(encodings) if encodings
+                          else np.zeros((0, ENCODING_DIM), dtype=np.float64))
+        self.names = names
+        self.files = files
+        self.signatures = current
+        self._refresh_norms()
+        if changed:
+            self.save()
+        return encoded
+
+    def add(self, name, encoding, file=None):
+        """Enrolls one encoding at runtime (not tied to a photo unless file is given)."""
+        self.encodings = np.vstack([self.encodings, np.asarray(encoding, dtype=np.float64).reshape(1, -1)])
+        self.names.append(name)
+        self.files.append(file or f"<runtime:{name}:{len(self.names)}>")
+        self._refresh_norms()
+
+    # -----------------------------
+    # Matching
+    # -----------------------------
+    def distances(self, encodings):
+        """(M, N) Euclidean distances between M query encodings and the N known ones."""
+        q = np.asarray(encodings, dtype=np.float64).reshape(-1, ENCODING_DIM)
+        d2 = (np.einsum("ij,ij->i", q, q)[:, None] + self._sq_norms[None, :]
+              - 2.0 * q @ self.encodings.T)
+        np.maximum(d2, 0.0, out=d2)
+        return np.sqrt(d2)
+
+    def match(self, encodings, tolerance=0.5):
+        """Nearest known identity for each query -> list of (name, distance)."""
+        if len(encodings) == 0:
+            return []
+        if len(self.names) == 0:
+            return [("Unknown", float("inf")) for _ in encodings]
+        d = self.distances(encodings)
+        best = d.argmin(axis=1)
+        best_d = d[np.arange(len(best)), best]
+        return [(self.names[j] if dist <= tolerance else "Unknown", float(dist))
+                for j, dist in zip(best, best_d)]
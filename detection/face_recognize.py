@@ -1,31 +1,149 @@
-# face_recognize.py � part of detection
+# face_recognize.py — part of detection
 # detection/face_recognize.py
-import face_recognition, os, cv2
+import threading
+import time
 
-known_encodings = []
-known_names = []
+import face_recognition, cv2
+
+from detection.face_index import FaceIndex
+from detection.scaling import FrameScaler, face_location_to_source
+
+MATCH_TOLERANCE = 0.5
+# Tracked identities are re-checked when they get this old ...
+IDENTITY_TTL = 10.0
+# ... or when the last match was this weak (distance close to the tolerance)
+REFRESH_DISTANCE = 0.45
+# No track is re-encoded more often than this
+MIN_RETRY = 1.0
+# Face search only looks at the head part of a person box, downscaled to this width
+HEAD_FRACTION = 0.45
+FACE_CROP_MAX_W = 160
+# recognize_faces() searches a copy of the frame with this long side; encodings use the full-res face
+FACE_DETECT_SIZE = 640
+
+face_index = FaceIndex()
+_index_lock = threading.Lock()
+_index_ready = False
 
 def load_known_faces():
-    global known_encodings, known_names
-    for file in os.listdir("known_faces"):
-        path = os.path.join("known_faces", file)
-        image = face_recognition.load_image_file(path)
-        enc = face_recognition.face_encodings(image)
-        if enc:
-            known_encodings.append(enc[0])
-            known_names.append(file.split(".")[0])
-
-load_known_faces()
-
-def recognize_faces(frame):
-    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    face_locs = face_recognition.face_locations(rgb)
-    encs = face_recognition.face_encodings(rgb, face_locs)
+    """Loads the cached face index and encodes only photos it has not seen. Runs once."""
+    global _index_ready
+    if _index_ready:
+        return face_index
+    with _index_lock:
+        if _index_ready:
+            return face_index
+        t0 = time.perf_counter()
+        face_index.load()
+        encoded = face_index.sync()
+        _index_ready = True
+    print(f"[INFO] Face index ready: {len(face_index)} identities ({encoded} photos encoded) "
+          f"in {(time.perf_counter() - t0) * 1000:.0f}ms")
+    return face_index
+
+
+def warm_known_faces():
+    """Loads the face index on a background thread; the first recognition call waits for it."""
+    thread = threading.Thread(target=load_known_faces, name="face-index", daemon=True)
+    thread.start()
+    return thread
+
+
+def recognize_faces(frame, detect_size=FACE_DETECT_SIZE):
+    """Finds faces on a downscaled copy, then encodes them from the full-resolution frame."""
+    load_known_faces()
+    small, scale = FrameScaler(detect_size).prepare(frame)
+    face_locs = [face_location_to_source(loc, scale)
+                 for loc in face_recognition.face_locations(cv2.cvtColor(small, cv2.COLOR_BGR2RGB))]
+    found = [(enc, loc) for enc, loc in zip(_encode_full_res(frame, face_locs), face_locs) if enc is not None]
+    face_locs = [loc for _, loc in found]
+    matches = face_index.match([enc for enc, _ in found], tolerance=MATCH_TOLERANCE)
+    return [(name, loc) for (name, _), loc in zip(matches, face_locs)]
+
+
+def _encode_full_res(frame, locs, margin=0.25):
+    """Encodes faces from high-res crops around each location (only those pixels are converted)."""
+    fh, fw = frame.shape[:2]
+    encs = []
+    for top, right, bottom, left in locs:
+        mh, mw = int((bottom - top) * margin), int((right - left) * margin)
+        y1, x1 = max(0, top - mh), max(0, left - mw)
+        y2, x2 = min(fh, bottom + mh), min(fw, right + mw)
+        crop = cv2.cvtColor(frame[y1:y2, x1:x2], cv2.COLOR_BGR2RGB)
+        enc = face_recognition.face_encodings(crop, [(top - y1, right - x1, bottom - y1, left - x1)])
+        encs.append(enc[0] if enc else None)
+    return encs
+
+
+def _needs_refresh(track, now):
+    if track.identity is None:
+        return True
+    age = now - track.identity_ts
+    if age < MIN_RETRY:
+        return False
+    if track.identity == "Unknown" or track.identity_dist is None:
+        return True
+    return age >= IDENTITY_TTL or track.identity_dist > REFRESH_DISTANCE
+
+
+def _encode_head(frame, box):
+    """Finds and encodes the largest face in the head region of a person box.
+    Returns (encoding, (top, right, bottom, left) in frame coords) or (None, None)."""
+    fh, fw = frame.shape[:2]
+    x1, y1, x2, y2 = box
+    x1, x2 = max(0, x1), min(fw, x2)
+    y1 = max(0, y1)
+    y2 = min(fh, y1 + int((box[3] - box[1]) * HEAD_FRACTION))
+    if x2 - x1 < 20 or y2 - y1 < 20:
+        return None, None
+    crop = frame[y1:y2, x1:x2]
+    # Search on a small copy of the head region, encode from the full-res crop
+    small, scale = FrameScaler(FACE_CROP_MAX_W).prepare(crop)
+    locs = face_recognition.face_locations(cv2.cvtColor(small, cv2.COLOR_BGR2RGB))
+    if not locs:
+        return None, None
+    loc = max(locs, key=lambda l: (l[2] - l[0]) * (l[1] - l[3]))
+    top, right, bottom, left = face_location_to_source(loc, scale)
+    enc = _encode_full_res(crop, [(top, right, bottom, left)])[0]
+    if enc is None:
+        return None, None
+    return enc, (top + y1, right + x1, bottom + y1, left + x1)
+
+
+def recognize_tracked(frame, persons, tracker, now=None):
+    """
+    Track-cached face recognition. Each person dict gets ``track_id`` and
+    ``identity``; faces are only encoded for tracks that are new, weakly
+    matched or past IDENTITY_TTL, and only on a cropped, downscaled head region.
+    Returns [(name, (top, right, bottom, left))] like recognize_faces().
+    """
+    load_known_faces()
+    now = time.monotonic() if now is None else now
+    tracks = tracker.update([p["box"] for p in persons], now)
+
+    refresh = [(p, t) for p, t in zip(persons, tracks) if _needs_refresh(t, now)]
+    encs, found = [], []
+    for p, t in refresh:
+        enc, loc = _encode_head(frame, p["box"])
+        t.identity_ts = now
+        if enc is None:
+            if t.identity is None:
+                t.identity = "Unknown"
+            continue
+        encs.append(enc)
+        found.append((t, loc))
+    for (name, dist), (t, loc) in zip(face_index.match(encs, tolerance=MATCH_TOLERANCE), found):
+        t.identity = name
+        t.identity_dist = dist if name != "Unknown" else None
+        bx, by = t.box[0], t.box[1]
+        t.face_offset = (loc[0] - by, loc[1] - bx, loc[2] - by, loc[3] - bx)
+
     results = []
-    for enc, loc in zip(encs, face_locs):
-        matches = face_recognition.compare_faces(known_encodings, enc, tolerance=0.5)
-        name = "Unknown"
-        if True in matches:
-            name = known_names[matches.index(True)]
-        results.append((name, loc))
+    for p, t in zip(persons, tracks):
+        p["track_id"] = t.id
+        p["identity"] = t.identity
+        if t.face_offset is not None:
+            bx, by = t.box[0], t.box[1]
+            top, right, bottom, left = t.face_offset
+            results.append((t.identity, (top + by, right + bx, bottom + by, left + bx)))
     return results
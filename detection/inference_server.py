@@ -0,0 +1,266 @@
+# inference_server.py — part of detection
+# detection/inference_server.py
+"""
+Shared inference for many cameras.
+
+One set of models serves every camera: worker threads collect the newest
+unprocessed frame of each camera and push them through the pose (and, when
+due, object) model as a single batch. Per-camera state - tracker, motion
+gate, restricted areas, item watcher, cached objects - lives in CameraContext.
+Add replicas (each with its own model copy) to use more cores.
+"""
+import json
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from camera.capture import LatestFrameReader, parse_source
+from detection.engine import DetectionEngine, wrists
+from detection.face_recognize import recognize_tracked, warm_known_faces
+from detection.item_watch import ItemWatcher, yolo_wrists
+from detection.motion import MotionDetector
+from detection.scaling import FrameScaler, detections_to_source
+from detection.tracker import IoUTracker
+from detection.zones import ZoneMonitor
+from utils.pipeline import DropQueue, StageStats
+from utils.timing import StageTimer
+
+
+class CameraContext:
+    def __init__(self, name, source, restricted_areas=None, items_file=None,
+                 object_every=5, motion_gate=True, infer_size=None):
+        self.name = name
+        # source=None: frames are fed by the caller (e.g. replay.py)
+        self.reader = LatestFrameReader(parse_source(source)) if source is not None else None
+        self.tracker = IoUTracker()
+        self.motion = MotionDetector() if motion_gate else None
+        self.restricted_areas = [np.array(a, np.int32) for a in (restricted_areas or [])]
+        # Smoothed, debounced wrists per tracked person, like main.py; alerts go through claim_alert()
+        self.zone_monitor = ZoneMonitor(restricted_areas) if restricted_areas else None
+        # Hand-near-item scoring with the same thresholds and debouncing as tftcam.py
+        self.item_watcher = None
+        if items_file:
+            with open(items_file, "r") as f:
+                self.item_watcher = ItemWatcher(json.load(f))
+        self.object_every = object_every
+        self.objects = []
+        self.frame_idx = 0
+        self.last_id = 0
+        self.busy = False
+        self.last_result = None
+        self.results = DropQueue(2)
+        self.latency_ms = deque(maxlen=200)
+        self.stats = StageStats(name)
+        # Each camera picks its own model input size; latency is tracked per camera and setting
+        self.scaler = FrameScaler(infer_size)
+        self.timer = StageTimer(name, setting=infer_size or "full")
+
+    def claim(self):
+        """Newest unprocessed frame, or None. Caller holds the server lock."""
+        if self.busy:
+            return None
+        item = self.reader.read(self.last_id, timeout=0)
+        if item is None:
+            return None
+        self.last_id = item[0]
+        self.busy = True
+        return item
+
+    def objects_due(self):
+        """Object pass on this frame: motion just started, or the object_every schedule."""
+        return ((self.motion is not None and self.motion.started)
+                or (self.object_every > 0 and self.frame_idx % self.object_every == 0))
+
+    def postprocess(self, frame, persons, now=None):
+        """
+        Per-camera logic on top of the shared detections.
+        :param now: capture time (monotonic seconds, or video time when replaying)
+        """
+        now = time.monotonic() if now is None else now
+        with self.timer.stage("faces"):
+            face_results = recognize_tracked(frame, persons, self.tracker, now=now)
+        observations = [(p["track_id"], list(wrists(p))) for p in persons]
+        zones_active = []
+        if self.zone_monitor is not None:
+            zone_events, points = self.zone_monitor.update(observations, now)
+            for ev in zone_events:
+                print(f"[ZONE] {self.name}: track {ev['track']} {ev['kind']} zone {ev['zone']}")
+            zones_active = self.zone_monitor.active()
+            hands = [(point, inside) for _, _, point, inside in points]
+        else:
+            hands = [(point, False) for _, kpts in observations for _, point, _ in kpts]
+        item_event = None
+        if self.item_watcher is not None:
+            people = [(p["track_id"], yolo_wrists(p)) for p in persons]
+            item_event = self.item_watcher.update_people((frame.shape[1], frame.shape[0]), people, now)
+        return {
+            "camera": self.name,
+            "persons": persons,
+            "objects": persons + self.objects,
+            "face_results": face_results,
+            "hands": hands,
+            "hand_in_restricted_area": bool(zones_active),
+            "zones_active": zones_active,
+            "zones_hit": sorted({zone for _, zone in zones_active}),
+            "item_event": item_event,
+        }
+
+    def claim_alert(self, result, now):
+        """True at most once per cooldown for the (track, zone) pairs of ``result`` (see ZoneStates)."""
+        if self.zone_monitor is None:
+            return False
+        return any(self.zone_monitor.claim_alert(track, zone, now) for track, zone in result["zones_active"])
+
+
+class InferenceServer:
+    """
+    :param cameras: list of CameraContext
+    :param engine_factory: fn(replica=i) -> DetectionEngine; called once per replica
+    :param batch_max: max frames per model call
+    """
+
+    def __init__(self, cameras, engine_factory=DetectionEngine, replicas=1, batch_max=8):
+        self.cameras = cameras
+        self.engines = [engine_factory(replica=i) for i in range(replicas)]
+        self.batch_max = batch_max
+        self.throughput = StageStats("total")
+        self.batches = 0
+        self.batched_frames = 0
+        self._lock = threading.Lock()
+        self._running = False
+        self._threads = []
+        self._next = 0
+
+    def start(self):
+        self._running = True
+        # Models and the face index load in the background while the cameras connect
+        warm_known_faces()
+        for engine in self.engines:
+            engine.warmup()
+        for cam in self.cameras:
+            cam.reader.start()
+        for i, engine in enumerate(self.engines):
+            t = threading.Thread(target=self._work, args=(engine,), name=f"inference-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def stop(self):
+        self._running = False
+        for t in self._threads:
+            t.join(timeout=2)
+        for cam in self.cameras:
+            cam.reader.stop()
+
+    @property
+    def running(self):
+        return self._running and any(c.reader.running for c in self.cameras)
+
+    def _collect(self):
+        """Claims up to batch_max cameras with a new frame, round-robin for fairness."""
+        batch = []
+        with self._lock:
+            n = len(self.cameras)
+            for k in range(n):
+                cam = self.cameras[(self._next + k) % n]
+                item = cam.claim()
+                if item is not None:
+                    batch.append((cam, item))
+                    if len(batch) >= self.batch_max:
+                        break
+            self._next = (self._next + 1) % max(n, 1)
+        return batch
+
+    def _work(self, engine):
+        while self._running:
+            batch = self._collect()
+            if not batch:
+                time.sleep(0.002)
+                continue
+            try:
+                self._process(engine, batch)
+            except Exception as e:
+                print("[ERROR] Batch inference failed:", e)
+            finally:
+                with self._lock:
+                    for cam, _ in batch:
+                        cam.busy = False
+
+    def _process(self, engine, batch):
+        # Motion gate: static cameras reuse their last result and never reach the models
+        active = []
+        for cam, (frame_id, ts, frame) in batch:
+            if cam.motion is not None:
+                cam.motion.update(frame)
+                if not cam.motion.active and cam.last_result is not None:
+                    # An item event belongs to the frame that raised it, not to its repeats
+                    self._publish(cam, frame_id, ts, frame, dict(cam.last_result, skipped=True, item_event=None))
+                    continue
+            active.append((cam, frame_id, ts, frame))
+        if not active:
+            return
+
+        # Downscale per camera, then one model call per input size: a camera set to 320 never runs at 640
+        prepared = [cam.scaler.prepare(frame) for cam, _, _, frame in active]
+        groups = {}
+        for i, (cam, *_rest) in enumerate(active):
+            groups.setdefault(cam.scaler.infer_size, []).append(i)
+
+        persons_per_frame = [None] * len(active)
+        for imgsz, members in groups.items():
+            t0 = time.perf_counter()
+            batch_persons = engine.detect_people_batch([prepared[i][0] for i in members], imgsz=imgsz)
+            pose_ms = (time.perf_counter() - t0) * 1000
+            for i, persons in zip(members, batch_persons):
+                persons_per_frame[i] = detections_to_source(persons, prepared[i][1])
+                active[i][0].timer.add("pose", pose_ms)
+
+            due = [i for i in members if active[i][0].objects_due()]
+            if due:
+                t0 = time.perf_counter()
+                objects_per_frame = engine.detect_objects_batch([prepared[i][0] for i in due], imgsz=imgsz)
+                objects_ms = (time.perf_counter() - t0) * 1000
+                for i, objects in zip(due, objects_per_frame):
+                    active[i][0].objects = detections_to_source(objects, prepared[i][1])
+                    active[i][0].timer.add("objects", objects_ms)
+            self.batches += 1
+        self.batched_frames += len(active)
+
+        for (cam, frame_id, ts, frame), persons in zip(active, persons_per_frame):
+            cam.frame_idx += 1
+            result = cam.postprocess(frame, persons, ts)
+            cam.last_result = result
+            self._publish(cam, frame_id, ts, frame, result)
+
+    def _publish(self, cam, frame_id, ts, frame, result):
+        cam.latency_ms.append((time.monotonic() - ts) * 1000)
+        cam.stats.tick()
+        self.throughput.tick()
+        cam.results.put((frame_id, ts, frame, result))
+
+    def report(self):
+        parts = []
+        for cam in self.cameras:
+            lat = sorted(cam.latency_ms)
+            p50 = lat[len(lat) // 2] if lat else 0.0
+            p95 = lat[int(len(lat) * 0.95) - 1] if lat else 0.0
+            parts.append(f"{cam.name} {cam.stats.fps():.1f} fps p50={p50:.0f}ms p95={p95:.0f}ms")
+        avg_batch = self.batched_frames / self.batches if self.batches else 0.0
+        print(f"[SERVER] total {self.throughput.fps():.1f} fps, avg batch {avg_batch:.1f} | " + " | ".join(parts))
+        for cam in self.cameras:
+            print(cam.timer.report())
+
+
+def load_cameras(config_path, object_every=5, motion_gate=True, infer_size=None):
+    """Reads cameras.json -> list of CameraContext."""
+    with open(config_path, "r") as f:
+        config = json.load(f)
+    return [CameraContext(c["name"], c.get("source", 0),
+                          restricted_areas=c.get("restricted_areas", []),
+                          items_file=c.get("items"),
+                          object_every=c.get("object_every", object_every),
+                          motion_gate=c.get("motion_gate", motion_gate),
+                          infer_size=c.get("infer_size", infer_size))
+            for c in config.get("cameras", [])]
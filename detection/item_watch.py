@@ -0,0 +1,139 @@
+# item_watch.py — part of detection
+# detection/item_watch.py
+"""
+Hand-near-item scoring used by tftcam.py and replay.py.
+
+Every visible wrist of every tracked person is scored against the annotated
+items it is close to (distance, approach velocity, keypoint confidence) in
+one vectorized pass (detection/scoring.py). Each (person, hand, item) score
+is smoothed (EMA) and runs through the debounce state machine in
+detection/zones.py: an event fires after enough consecutive frames at or
+above the enter threshold, the pair stays "on" until the score has been
+below the lower exit threshold for a few frames, and alerts cool down per
+pair and per item. Time is passed in by the caller so recorded video can
+use its own clock.
+"""
+import cv2
+import numpy as np
+
+from detection.engine import LEFT_WRIST, wrists
+from detection.roi import ItemROIs
+from detection.scoring import SIDES, ItemPolygons, PairScorer
+from detection.zones import ZoneStates
+
+DIST_THRESH_PX = 120
+VEL_SCALE = 200.0
+W_D, W_V, W_C = 0.6, 0.3, 0.1
+SCORE_THRESHOLD = 0.6           # smoothed score needed to enter ...
+EXIT_SCORE_THRESHOLD = 0.45     # ... and to stay in, so a score hovering at the threshold does not flap
+CONSECUTIVE_FRAMES_REQ = 6
+EXIT_FRAMES_REQ = 3             # frames below the exit threshold (or hand gone) before a pair resets
+SCORE_EMA_ALPHA = 0.6           # weight of the newest score, 1.0 = raw per-frame scores
+COOLDOWN_SECONDS = 8
+
+
+def yolo_wrists(person, min_conf=0.3):
+    """[(side, (x, y), conf)] for the visible wrists of a DetectionEngine person dict."""
+    return [("L" if idx == LEFT_WRIST else "R", pt, conf) for idx, pt, conf in wrists(person, min_conf)]
+
+
+class ItemWatcher:
+    """
+    :param items_data: contents of items.json ({"ref_size", "items"})
+    :param score_threshold, exit_threshold: smoothed score to enter / to stay in (exit <= enter)
+    :param consecutive, exit_frames: frames needed to enter / to leave
+    :param ema_alpha: score smoothing per (person, hand, item), 1.0 = none
+    Call ``update_people(frame_size, people, now)`` (or ``update`` for a single
+    person) once per processed frame.
+    """
+
+    def __init__(self, items_data, dist_thresh=DIST_THRESH_PX, vel_scale=VEL_SCALE,
+                 weights=(W_D, W_V, W_C), score_threshold=SCORE_THRESHOLD, exit_threshold=EXIT_SCORE_THRESHOLD,
+                 consecutive=CONSECUTIVE_FRAMES_REQ, exit_frames=EXIT_FRAMES_REQ, ema_alpha=SCORE_EMA_ALPHA,
+                 cooldown=COOLDOWN_SECONDS):
+        ref = items_data.get("ref_size", {})
+        # Scaled contours are cached per frame size; the grid pad matches the scoring radius
+        self.item_rois = ItemROIs(items_data.get("items", []), ref.get("w", 1), ref.get("h", 1),
+                                  pad=dist_thresh)
+        self.dist_thresh = dist_thresh
+        self.vel_scale = vel_scale
+        self.weights = weights
+        self.score_threshold = score_threshold
+        self.consecutive = consecutive
+        self.cooldown = cooldown
+        self.ema_alpha = ema_alpha
+        self.scorer = PairScorer(dist_thresh, vel_scale, weights)
+        self._polys = {}
+        self._ema = {}             # ((track, side), item) -> (smoothed score, last seen)
+        # track = (person track, hand side), zone = item name
+        self.states = ZoneStates(enter_level=score_threshold, exit_level=min(exit_threshold, score_threshold),
+                                 enter_frames=consecutive, exit_frames=exit_frames, dwell_seconds=None,
+                                 cooldown=cooldown, zone_cooldown=cooldown)
+        self.max_score = 0.0
+
+    @property
+    def consec_counter(self):
+        return self.states.max_hits()
+
+    def polygons(self, fw, fh):
+        polys = self._polys.get((fw, fh))
+        if polys is None:
+            polys = self._polys[(fw, fh)] = ItemPolygons(self.item_rois.for_size(fw, fh))
+        return polys
+
+    def update(self, frame_size, wrists, now):
+        """
+        Single-person form of update_people().
+        :param wrists: [(side, (x, y), visibility)]
+        """
+        return self.update_people(frame_size, [(0, wrists)], now)
+
+    def update_people(self, frame_size, people, now):
+        """
+        :param frame_size: (width, height)
+        :param people: [(track_id, [(side, (x, y), confidence)])], e.g. yolo_wrists() per tracked person
+        :return: event dict (track, hand, score, dist_px, vel, item_name) or None
+        """
+        polys = self.polygons(*frame_size)
+        hands = [(track, side, pt, conf) for track, kpts in people for side, pt, conf in kpts]
+        scores = self.scorer.score(polys, [h[0] for h in hands], [SIDES.index(h[1]) for h in hands],
+                                   [h[2] for h in hands], [h[3] for h in hands], now)
+
+        best = {}
+        valid = scores["valid"]
+        self.max_score = float(scores["score"][valid].max()) if valid.any() else 0.0
+        for row, col in zip(*np.nonzero(valid)):
+            track, side = hands[row][:2]
+            key = ((track, side), polys.names[scores["items"][col]])
+            score = float(scores["score"][row, col])
+            if key not in best or score > best[key]["score"]:
+                best[key] = {"track": track, "hand": side, "score": score,
+                             "dist_px": float(scores["dist"][row, col]), "vel": float(scores["vel"][row, col]),
+                             "item_name": key[1]}
+
+        # consecutive frame check (per person, hand and item) on the smoothed score, and cooldown
+        self.states.update(self._smoothed(best, now), now)
+        for key in sorted(self.states.active(), key=lambda k: -best[k]["score"] if k in best else 0.0):
+            if key in best and self.states.claim_alert(key[0], key[1], now):
+                return best[key]
+        return None
+
+    def _smoothed(self, best, now):
+        a = self.ema_alpha
+        levels = {}
+        for key, ev in best.items():
+            prev = self._ema.get(key)
+            level = ev["score"] if prev is None else a * ev["score"] + (1 - a) * prev[0]
+            self._ema[key] = (level, now)
+            levels[key] = level
+        for key in [k for k, (_, seen) in self._ema.items() if now - seen > self.states.stale_seconds]:
+            del self._ema[key]
+        return levels
+
+    def draw(self, frame):
+        rois = self.item_rois.for_size(frame.shape[1], frame.shape[0])
+        for it in rois.items:
+            cv2.polylines(frame, [it["cnt"]], True, (0,0,255), 2)
+            cx, cy = it["center"]
+            cv2.putText(frame, it["name"], (cx+5, cy), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0,255,255), 2)
+        return frame
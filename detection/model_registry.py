@@ -0,0 +1,112 @@
+# model_registry.py — part of detection
+# detection/model_registry.py
+"""
+Lazy, shared model loading.
+
+    model = registry.get("models/yolov8n-pose.pt", backend="onnx", threads=4)
+    registry.warmup([("models/yolov8n-pose.pt", {"backend": "onnx"})], imgsz=640)
+
+Nothing is loaded at import. get() loads a model the first time it is asked
+for and hands the same instance to every later caller; warmup() does the
+loading plus one dummy inference on a background thread, so the first real
+frame does not pay for graph optimization / allocator warm-up. A caller that
+asks for a model while it is still warming simply waits for it. ``replica``
+gives parallel inference workers their own copy of the same model.
+"""
+import threading
+import time
+
+import numpy as np
+
+from detection.backends import EXPORT_IMGSZ, load_model
+
+
+class ModelRegistry:
+    def __init__(self, loader=load_model):
+        self.loader = loader
+        self._models = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+        self.load_ms = {}
+        self.warm_ms = {}
+
+    @staticmethod
+    def key(weights, backend="torch", threads=None, int8=False, replica=0):
+        return (weights, backend, threads, bool(int8), replica)
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def loaded(self, weights, backend="torch", threads=None, int8=False, replica=0):
+        return self.key(weights, backend, threads, int8, replica) in self._models
+
+    def _load(self, key):
+        weights, backend, threads, int8, _ = key
+        t0 = time.perf_counter()
+        model = self.loader(weights, backend, threads=threads, int8=int8)
+        self.load_ms[key] = (time.perf_counter() - t0) * 1000
+        return model
+
+    def get(self, weights, backend="torch", threads=None, int8=False, replica=0):
+        """The shared model for these settings, loading it on first use (or waiting for its warm-up)."""
+        key = self.key(weights, backend, threads, int8, replica)
+        model = self._models.get(key)
+        if model is not None:
+            return model
+        with self._key_lock(key):
+            model = self._models.get(key)
+            if model is None:
+                model = self._models[key] = self._load(key)
+        return model
+
+    def warm(self, weights, backend="torch", threads=None, int8=False, replica=0, imgsz=EXPORT_IMGSZ):
+        """
+        Loads the model and runs one inference on a blank imgsz x imgsz frame
+        before publishing it, so get() callers never race the dummy inference.
+        """
+        key = self.key(weights, backend, threads, int8, replica)
+        with self._key_lock(key):
+            model = self._models.get(key)
+            if model is not None:
+                return model
+            model = self._load(key)
+            t0 = time.perf_counter()
+            model([np.zeros((imgsz, imgsz, 3), np.uint8)], imgsz=imgsz, verbose=False)
+            self.warm_ms[key] = (time.perf_counter() - t0) * 1000
+            self._models[key] = model
+        return model
+
+    def warmup(self, specs, imgsz=EXPORT_IMGSZ, background=True):
+        """
+        :param specs: [(weights, {"backend":, "threads":, "int8":, "replica":})]
+        :param background: warm on a daemon thread and return it (else warm inline and return None)
+        """
+        def run():
+            for weights, opts in specs:
+                try:
+                    self.warm(weights, imgsz=imgsz, **opts)
+                except Exception as e:
+                    # The frame loop will hit (and report) the same error on first use
+                    print(f"[WARN] Warm-up of {weights} failed: {e}")
+
+        if not background:
+            run()
+            return None
+        thread = threading.Thread(target=run, name="model-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def report(self):
+        parts = []
+        for key, ms in self.load_ms.items():
+            weights, backend, _, int8, replica = key
+            warm = self.warm_ms.get(key)
+            label = f"{backend}{'-int8' if int8 else ''}{f' #{replica}' if replica else ''}"
+            parts.append(f"{weights.rsplit('/', 1)[-1]} ({label}) load={ms:.0f}ms"
+                         + (f" warm={warm:.0f}ms" if warm is not None else ""))
+        return "[STARTUP] models | " + (" | ".join(parts) if parts else "none loaded")
+
+
+# Shared by every engine in the process
+registry = ModelRegistry()
@@ -1 +1,100 @@
-# motion.py  part of detection
+# motion.py — part of detection
+# detection/motion.py
+"""
+Cheap motion gate. Works on a small grayscale copy of the frame, compares
+it with a running-average background and returns the changed regions in
+source-frame coordinates. Callers skip the neural nets while ``active`` is
+False, or run them only on the ROI crop.
+"""
+import cv2
+import numpy as np
+
+
+class MotionDetector:
+    """
+    :param width: processing width of the downscaled frame
+    :param threshold: per-pixel gray-level change that counts as motion (lower = more sensitive)
+    :param min_area: fraction of the frame that must change to count as motion
+    :param alpha: background adaptation rate (higher = forgets still objects sooner)
+    :param hold_frames: hysteresis; stay active this many frames after the last motion
+    """
+
+    def __init__(self, width=160, threshold=25, min_area=0.002, alpha=0.05, hold_frames=15, blur=5):
+        self.width = width
+        self.threshold = threshold
+        self.min_area = min_area
+        self.alpha = alpha
+        self.hold_frames = hold_frames
+        self.blur = blur
+        self._bg = None
+        self._idle = hold_frames + 1
+        self.active = False
+        self.started = False      # True only on the frame where motion begins
+        self.rois = []
+        # Counters
+        self.frames = 0
+        self.active_frames = 0
+
+    def reset(self):
+        self._bg = None
+
+    def update(self, frame):
+        """Feeds one frame; returns the list of motion ROIs (x1, y1, x2, y2) in frame coords."""
+        fh, fw = frame.shape[:2]
+        scale = self.width / fw
+        small = cv2.resize(frame, (self.width, max(1, int(fh * scale))), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        gray = cv2.GaussianBlur(gray, (self.blur, self.blur), 0)
+
+        self.frames += 1
+        if self._bg is None:
+            self._bg = gray.astype(np.float32)
+            self.rois = []
+            self._set_active(False)
+            return self.rois
+
+        diff = cv2.absdiff(gray, cv2.convertScaleAbs(self._bg))
+        cv2.accumulateWeighted(gray, self._bg, self.alpha)
+        _, mask = cv2.threshold(diff, self.threshold, 255, cv2.THRESH_BINARY)
+        mask = cv2.dilate(mask, None, iterations=2)
+
+        rois = []
+        moving = cv2.countNonZero(mask) >= self.min_area * mask.size
+        if moving:
+            contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            min_px = self.min_area * mask.size * 0.25
+            for cnt in contours:
+                if cv2.contourArea(cnt) < min_px:
+                    continue
+                x, y, w, h = cv2.boundingRect(cnt)
+                rois.append((int(x / scale), int(y / scale),
+                             min(fw, int((x + w) / scale)), min(fh, int((y + h) / scale))))
+        self.rois = rois
+        self._set_active(bool(rois))
+        return rois
+
+    def _set_active(self, moving):
+        was_active = self.active
+        self._idle = 0 if moving else self._idle + 1
+        self.active = self._idle <= self.hold_frames
+        self.started = self.active and not was_active
+        if self.active:
+            self.active_frames += 1
+
+    def union_roi(self, frame_shape, pad=40):
+        """Single padded bounding box around all current ROIs, or None."""
+        if not self.rois:
+            return None
+        fh, fw = frame_shape[:2]
+        rois = np.array(self.rois)
+        x1, y1 = rois[:, :2].min(axis=0) - pad
+        x2, y2 = rois[:, 2:].max(axis=0) + pad
+        return (max(0, int(x1)), max(0, int(y1)), min(fw, int(x2)), min(fh, int(y2)))
+
+    @property
+    def skipped_ratio(self):
+        return 1.0 - self.active_frames / self.frames if self.frames else 0.0
+
+    def stats(self):
+        return (f"[MOTION] {self.frames} frames, {self.frames - self.active_frames} skipped "
+                f"({self.skipped_ratio * 100:.1f}%)")
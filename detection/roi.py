@@ -0,0 +1,71 @@
+# roi.py — part of detection
+# detection/roi.py
+"""
+Item ROI geometry for the shelf watcher.
+
+Polygons from items.json are scaled once per frame size and kept with
+their contours, centres and padded bounding boxes. A uniform grid over the
+padded boxes lets a wrist look up only the items it can possibly be near,
+so per-frame cost follows the items around the hands, not the catalogue.
+"""
+import cv2
+import numpy as np
+
+
+class ScaledROIs:
+    def __init__(self, items, scale_x, scale_y, pad, cell):
+        self.pad = pad
+        self.cell = cell
+        self.items = []
+        self.grid = {}
+        for idx, it in enumerate(items):
+            poly = [(int(x*scale_x), int(y*scale_y)) for (x, y) in it["poly"]]
+            cnt = np.array(poly, dtype=np.int32).reshape((-1,1,2))
+            xs = [p[0] for p in poly]
+            ys = [p[1] for p in poly]
+            center = (int(sum(xs) / len(poly)), int(sum(ys) / len(poly)))
+            bbox = (min(xs) - pad, min(ys) - pad, max(xs) + pad, max(ys) + pad)
+            self.items.append({"name": it["name"], "poly": poly, "cnt": cnt,
+                               "center": center, "bbox": bbox})
+            for gx in range(bbox[0] // cell, bbox[2] // cell + 1):
+                for gy in range(bbox[1] // cell, bbox[3] // cell + 1):
+                    self.grid.setdefault((gx, gy), []).append(idx)
+
+    def __len__(self):
+        return len(self.items)
+
+    def candidates(self, point):
+        """Indices of items whose padded box contains the point."""
+        x, y = point
+        out = []
+        for idx in self.grid.get((int(x) // self.cell, int(y) // self.cell), ()):
+            x1, y1, x2, y2 = self.items[idx]["bbox"]
+            if x1 <= x <= x2 and y1 <= y <= y2:
+                out.append(idx)
+        return out
+
+    def signed_dist(self, point, idx):
+        """Positive inside the polygon, negative outside (pixels)."""
+        return cv2.pointPolygonTest(self.items[idx]["cnt"], (float(point[0]), float(point[1])), True)
+
+
+class ItemROIs:
+    """
+    :param items: list of {"name", "poly"} in reference-image coordinates
+    :param pad: search radius around each polygon (use DIST_THRESH_PX)
+    """
+
+    def __init__(self, items, ref_w, ref_h, pad=120, cell=None):
+        self.items = items
+        self.ref_w = ref_w or 1
+        self.ref_h = ref_h or 1
+        self.pad = int(pad)
+        self.cell = int(cell or max(32, 2 * self.pad))
+        self._cache = {}
+
+    def for_size(self, fw, fh):
+        scaled = self._cache.get((fw, fh))
+        if scaled is None:
+            scaled = ScaledROIs(self.items, fw / self.ref_w, fh / self.ref_h, self.pad, self.cell)
+            self._cache[(fw, fh)] = scaled
+        return scaled
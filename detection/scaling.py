@@ -0,0 +1,67 @@
+# scaling.py — part of detection
+# detection/scaling.py
+"""
+Resolution-adaptive inference.
+
+Models see a copy of the frame whose long side is at most ``infer_size``;
+boxes, keypoints and face locations are mapped back to source coordinates,
+so drawing, zones and high-res crops keep working on the full frame.
+"""
+import cv2
+import numpy as np
+
+
+class FrameScaler:
+    """
+    :param infer_size: max long side in px for the model input (None/0 = full resolution)
+    """
+
+    def __init__(self, infer_size=None):
+        self.infer_size = int(infer_size) if infer_size else 0
+
+    def scale_for(self, shape):
+        """Factor model/source (<= 1) for a frame of this shape."""
+        if not self.infer_size:
+            return 1.0
+        long_side = max(shape[0], shape[1])
+        return min(1.0, self.infer_size / long_side)
+
+    def prepare(self, frame):
+        """-> (model input, scale). Shrinks with INTER_AREA; never upsamples."""
+        scale = self.scale_for(frame.shape)
+        if scale >= 1.0:
+            return frame, 1.0
+        h, w = frame.shape[:2]
+        small = cv2.resize(frame, (max(1, round(w * scale)), max(1, round(h * scale))), interpolation=cv2.INTER_AREA)
+        return small, scale
+
+
+def box_to_source(box, scale):
+    if scale == 1.0:
+        return tuple(int(v) for v in box)
+    return tuple(int(round(v / scale)) for v in box)
+
+
+def keypoints_to_source(kpts, scale):
+    """(N, 3) x, y, conf -> same array layout in source pixels (conf untouched)."""
+    if scale == 1.0:
+        return kpts
+    out = np.array(kpts, dtype=np.float32, copy=True)
+    out[:, :2] /= scale
+    return out
+
+
+def face_location_to_source(loc, scale):
+    """(top, right, bottom, left) as used by face_recognition."""
+    return box_to_source(loc, scale)
+
+
+def detections_to_source(detections, scale):
+    """Maps the box (and keypoints, if any) of detection dicts back to source coordinates in place."""
+    if scale == 1.0:
+        return detections
+    for det in detections:
+        det["box"] = box_to_source(det["box"], scale)
+        if "keypoints" in det:
+            det["keypoints"] = keypoints_to_source(det["keypoints"], scale)
+    return detections
@@ -0,0 +1,166 @@
+# scoring.py — part of detection
+# detection/scoring.py
+"""
+Vectorized hand-vs-item scoring for every person in view.
+
+    polys = ItemPolygons(item_rois.for_size(fw, fh))
+    scores = scorer.score(polys, tracks, sides, points, conf, now)
+
+All wrists of a frame go through one set of NumPy operations: signed
+point-to-polygon distance (segment distance + ray-casting parity) for every
+(wrist, item edge), the previous wrist positions in the same batch for the
+approach velocity, then the distance / velocity / confidence score. Items
+whose padded box holds no wrist are dropped before the edge maths, so the
+cost follows the items around the hands, not the catalogue.
+
+Velocity history is two small arrays indexed by a per-track slot: the last
+wrist position per (slot, hand) and the time the slot was last seen. Slots
+of tracks gone for stale_seconds are reused.
+"""
+import numpy as np
+
+SIDES = ("R", "L")
+MAX_TRACKS = 16            # initial slots; doubled when more people are in view
+STALE_SECONDS = 5.0        # free the slot of a track not seen for this long
+
+
+class ItemPolygons:
+    """Edge arrays of one detection.roi.ScaledROIs, built once per frame size."""
+
+    def __init__(self, scaled):
+        self.names = [it["name"] for it in scaled.items]
+        polys = [np.asarray(it["poly"], np.float64).reshape(-1, 2) for it in scaled.items]
+        self.lengths = np.array([len(p) for p in polys], np.intp)
+        self.bbox = np.array([it["bbox"] for it in scaled.items], np.float64).reshape(-1, 4)
+        if polys:
+            self.a = np.concatenate(polys)
+            self.b = np.concatenate([np.roll(p, -1, axis=0) for p in polys])
+        else:
+            self.a = self.b = np.zeros((0, 2))
+        self.ab = self.b - self.a
+        self.len2 = np.maximum((self.ab ** 2).sum(axis=1), 1e-12)
+        dy = self.ab[:, 1]
+        # x step per unit y along each edge; horizontal edges never straddle a ray, so 0 is safe
+        self.dxdy = np.divide(self.ab[:, 0], dy, out=np.zeros_like(dy), where=dy != 0)
+        self.edge_item = np.repeat(np.arange(len(polys)), self.lengths)
+
+    def __len__(self):
+        return len(self.names)
+
+    def near(self, points):
+        """(N, items) bool: point inside the item's padded box."""
+        p = points[:, None, :]
+        b = self.bbox[None, :, :]
+        return ((p[..., 0] >= b[..., 0]) & (p[..., 0] <= b[..., 2]) &
+                (p[..., 1] >= b[..., 1]) & (p[..., 1] <= b[..., 3]))
+
+    def signed_dist(self, points, items=None):
+        """
+        (N, len(items)) signed distances, positive inside (same convention as
+        cv2.pointPolygonTest with measureDist=True).
+        :param items: item indices to test (None = all)
+        """
+        a, ab, len2, dxdy, lengths = self.a, self.ab, self.len2, self.dxdy, self.lengths
+        if items is not None:
+            edges = np.isin(self.edge_item, items)
+            a, ab, len2, dxdy, lengths = a[edges], ab[edges], len2[edges], dxdy[edges], lengths[items]
+        if len(lengths) == 0 or len(points) == 0:
+            return np.zeros((len(points), len(lengths)))
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+
+        ap = points[:, None, :] - a[None, :, :]                       # (N, E, 2)
+        t = np.clip((ap * ab).sum(axis=2) / len2, 0.0, 1.0)
+        off = ap - t[..., None] * ab
+        dist = np.sqrt(np.minimum.reduceat((off ** 2).sum(axis=2), starts, axis=1))
+
+        # Ray cast to +x: an odd number of edge crossings means inside
+        py = points[:, 1:2]
+        ay, by = a[:, 1], a[:, 1] + ab[:, 1]
+        straddle = (ay > py) != (by > py)
+        crosses = straddle & (points[:, 0:1] < a[:, 0] + (py - ay) * dxdy)
+        inside = np.add.reduceat(crosses, starts, axis=1) % 2 == 1
+        return np.where(inside, dist, -dist)
+
+
+class PairScorer:
+    """
+    Scores every (person, hand, item) pair of a frame in one pass.
+    :param dist_thresh: distance (px) at which the distance component reaches 0
+    :param vel_scale: approach speed (px/s) at which the velocity component saturates
+    :param weights: (distance, velocity, confidence) weights
+    """
+
+    def __init__(self, dist_thresh, vel_scale, weights, capacity=MAX_TRACKS, stale_seconds=STALE_SECONDS):
+        self.dist_thresh = float(dist_thresh)
+        self.vel_scale = float(vel_scale)
+        self.weights = weights
+        self.stale_seconds = stale_seconds
+        self._slots = {}                                            # track -> slot
+        self._prev_pt = np.full((capacity, len(SIDES), 2), np.nan)  # last wrist position per slot and hand
+        self._last_seen = np.full(capacity, -np.inf)
+        self.prev_time = None
+
+    def __len__(self):
+        return len(self._slots)
+
+    def _slot(self, track):
+        slot = self._slots.get(track)
+        if slot is None:
+            used = set(self._slots.values())
+            free = next((s for s in range(len(self._last_seen)) if s not in used), None)
+            if free is None:
+                free = len(self._last_seen)
+                self._prev_pt = np.concatenate([self._prev_pt, np.full_like(self._prev_pt, np.nan)])
+                self._last_seen = np.concatenate([self._last_seen, np.full_like(self._last_seen, -np.inf)])
+            self._prev_pt[free] = np.nan
+            slot = self._slots[track] = free
+        return slot
+
+    def _expire(self, now):
+        for track, slot in list(self._slots.items()):
+            if now - self._last_seen[slot] > self.stale_seconds:
+                del self._slots[track]
+
+    def score(self, polys, tracks, sides, points, conf, now):
+        """
+        :param polys: ItemPolygons for the current frame size
+        :param tracks: track id per wrist (any hashable)
+        :param sides: index into SIDES per wrist
+        :param points: (N, 2) wrist positions in frame pixels
+        :param conf: (N,) keypoint confidences
+        :return: {"items": (K,) item indices near at least one wrist, and (N, K)
+                  arrays "dist", "vel" (approach speed, px/s), "score", "valid"}
+                  where valid marks pairs with the wrist inside the polygon
+        """
+        points = np.asarray(points, np.float64).reshape(-1, 2)
+        conf = np.asarray(conf, np.float64).reshape(-1)
+        sides = np.asarray(sides, np.intp).reshape(-1)
+        n = len(points)
+        dt = max(now - self.prev_time, 1e-6) if self.prev_time is not None else 1e-6
+
+        near = polys.near(points) if n else np.zeros((0, len(polys)), bool)
+        items = np.flatnonzero(near.any(axis=0))
+        slots = np.array([self._slot(t) for t in tracks], np.intp)
+        prev = self._prev_pt[slots, sides] if n else np.zeros((0, 2))
+        has_prev = ~np.isnan(prev[:, 0])
+
+        # Current and previous wrist positions share one distance pass
+        dists = polys.signed_dist(np.concatenate([points, prev[has_prev]]), items)
+        dist = dists[:n]
+        prev_dist = np.full_like(dist, np.nan)
+        prev_dist[has_prev] = dists[n:]
+        vel = np.where(np.isnan(prev_dist), 0.0, -(dist - prev_dist) / dt)
+
+        w_d, w_v, w_c = self.weights
+        d_comp = np.maximum(0.0, (self.dist_thresh - dist) / self.dist_thresh)
+        v_comp = np.clip(vel / self.vel_scale, 0.0, 1.0)
+        score = w_d * d_comp + w_v * v_comp + w_c * conf[:, None]
+        # Only score a hand inside (or on the edge of) the polygon
+        valid = near[:, items] & (dist >= 0)
+
+        if n:
+            self._prev_pt[slots, sides] = points
+            self._last_seen[slots] = now
+        self.prev_time = now
+        self._expire(now)
+        return {"items": items, "dist": dist, "vel": vel, "score": score, "valid": valid}
@@ -0,0 +1,92 @@
+# tracker.py — part of detection
+# detection/tracker.py
+"""
+Greedy IoU tracker over person boxes. Gives every person a stable track ID
+so per-person state (face identity, wrist history, zone state) can be
+cached across frames instead of recomputed.
+"""
+import threading
+import time
+
+import numpy as np
+
+
+def iou_matrix(a, b):
+    """(len(a), len(b)) IoU between two arrays of x1, y1, x2, y2 boxes."""
+    a = np.asarray(a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float32).reshape(-1, 4)
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-6), 0.0)
+
+
+class Track:
+    def __init__(self, track_id, box, now):
+        self.id = track_id
+        self.box = box
+        self.created = now
+        self.last_seen = now
+        self.hits = 1
+        self.misses = 0
+        # Cached face identity
+        self.identity = None
+        self.identity_dist = None
+        self.identity_ts = 0.0
+        self.face_offset = None   # face (top, right, bottom, left) relative to box top-left
+
+
+class IoUTracker:
+    def __init__(self, iou_threshold=0.3, max_misses=15):
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.tracks = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def update(self, boxes, now=None):
+        """
+        Associates this frame's boxes with existing tracks.
+        Returns the list of Track objects aligned with ``boxes``.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            ids = list(self.tracks)
+            assigned = [None] * len(boxes)
+            if ids and boxes:
+                iou = iou_matrix([self.tracks[i].box for i in ids], boxes)
+                # Greedy: best pairs first
+                for flat in np.argsort(-iou, axis=None):
+                    t, b = divmod(int(flat), len(boxes))
+                    if iou[t, b] < self.iou_threshold:
+                        break
+                    if assigned[b] is not None or ids[t] is None:
+                        continue
+                    track = self.tracks[ids[t]]
+                    track.box = boxes[b]
+                    track.last_seen = now
+                    track.hits += 1
+                    track.misses = 0
+                    assigned[b] = track
+                    ids[t] = None
+
+            for t in ids:
+                if t is None:
+                    continue
+                track = self.tracks[t]
+                track.misses += 1
+                if track.misses > self.max_misses:
+                    del self.tracks[t]
+
+            for b, box in enumerate(boxes):
+                if assigned[b] is None:
+                    track = Track(self._next_id, box, now)
+                    self._next_id += 1
+                    self.tracks[track.id] = track
+                    assigned[b] = track
+            return assigned
@@ -0,0 +1,219 @@
+# zones.py — part of detection
+# detection/zones.py
+"""
+Debounced per-track, per-zone triggers.
+
+    outside --level >= enter_level for enter_frames--> inside   ("enter")
+    inside  --for dwell_seconds-->                     inside   ("dwell", once)
+    inside  --level <  exit_level for exit_frames-->   outside  ("exit")
+
+ZoneStates is the state machine on its own: callers feed it one level per
+(track, zone) pair per frame (signed distance to a polygon, an item score,
+...). enter_level > exit_level gives hysteresis, so a wrist hovering on a
+zone edge does not flap in and out. claim_alert() adds cooldowns per pair
+and per zone, so one incident produces one alert instead of one per frame.
+
+ZoneMonitor applies it to restricted-area polygons: wrist keypoints are
+EMA-smoothed per track and only tested against the zones whose padded box
+contains them (detection/roi.py grid), so a frame costs
+O(tracks x nearby zones), not O(tracks x zones).
+"""
+import threading
+
+import numpy as np
+
+from detection.roi import ScaledROIs
+
+ENTER_FRAMES = 3
+EXIT_FRAMES = 5
+DWELL_SECONDS = 2.0
+ALERT_COOLDOWN = 10.0      # per (track, zone)
+ZONE_COOLDOWN = 3.0        # per zone, covers a person whose track ID changed
+ENTER_MARGIN_PX = 0        # wrist must be this far inside to enter ...
+EXIT_MARGIN_PX = 15        # ... and this far outside to leave
+EMA_ALPHA = 0.5            # weight of the newest keypoint
+STALE_SECONDS = 5.0        # forget tracks not seen for this long
+
+
+class _PairState:
+    __slots__ = ("inside", "hits", "misses", "since", "dwelled", "last_seen", "level")
+
+    def __init__(self, now):
+        self.inside = False
+        self.hits = 0
+        self.misses = 0
+        self.since = None
+        self.dwelled = False
+        self.last_seen = now
+        self.level = None
+
+
+class ZoneStates:
+    """
+    :param enter_level: a level at or above this counts as a hit while outside
+    :param exit_level: a level below this counts as a miss while inside (<= enter_level)
+    :param enter_frames: consecutive hits needed to enter
+    :param exit_frames: consecutive misses needed to exit
+    :param dwell_seconds: time inside before a "dwell" event (None = never)
+    """
+
+    def __init__(self, enter_level=0.0, exit_level=0.0, enter_frames=ENTER_FRAMES, exit_frames=EXIT_FRAMES,
+                 dwell_seconds=DWELL_SECONDS, cooldown=ALERT_COOLDOWN, zone_cooldown=ZONE_COOLDOWN,
+                 stale_seconds=STALE_SECONDS):
+        self.enter_level = enter_level
+        self.exit_level = min(exit_level, enter_level)
+        self.enter_frames = enter_frames
+        self.exit_frames = exit_frames
+        self.dwell_seconds = dwell_seconds
+        self.cooldown = cooldown
+        self.zone_cooldown = zone_cooldown
+        self.stale_seconds = stale_seconds
+        self._states = {}          # (track, zone) -> _PairState
+        self._last_alert = {}      # (track, zone) -> ts
+        self._zone_alert = {}      # zone -> ts
+        self._lock = threading.Lock()
+        self.alerts = 0
+        self.suppressed = 0
+
+    def update(self, levels, now):
+        """
+        :param levels: {(track, zone): level} for the pairs observed this frame;
+                       pairs not listed count as a miss
+        :return: [{"kind", "track", "zone", "ts", "level"}] transitions this frame
+        """
+        events = []
+        with self._lock:
+            for key, level in levels.items():
+                if key not in self._states:
+                    self._states[key] = _PairState(now)
+            for key, st in list(self._states.items()):
+                level = levels.get(key)
+                if level is not None:
+                    st.last_seen = now
+                    st.level = level
+                hit = level is not None and level >= (self.exit_level if st.inside else self.enter_level)
+                if hit:
+                    st.hits += 1
+                    st.misses = 0
+                else:
+                    st.misses += 1
+                    st.hits = 0
+                if not st.inside and st.hits >= self.enter_frames:
+                    st.inside, st.since, st.dwelled = True, now, False
+                    events.append(self._event("enter", key, now, st))
+                elif st.inside and st.misses >= self.exit_frames:
+                    st.inside = False
+                    events.append(self._event("exit", key, now, st))
+                if (st.inside and not st.dwelled and self.dwell_seconds is not None
+                        and now - st.since >= self.dwell_seconds):
+                    st.dwelled = True
+                    events.append(self._event("dwell", key, now, st))
+                if not st.inside and now - st.last_seen > self.stale_seconds:
+                    del self._states[key]
+                    self._last_alert.pop(key, None)
+        return events
+
+    @staticmethod
+    def _event(kind, key, now, st):
+        return {"kind": kind, "track": key[0], "zone": key[1], "ts": now, "level": st.level}
+
+    def active(self):
+        """[(track, zone)] currently inside."""
+        with self._lock:
+            return [key for key, st in self._states.items() if st.inside]
+
+    def state(self, track, zone):
+        with self._lock:
+            st = self._states.get((track, zone))
+            return None if st is None else {"inside": st.inside, "hits": st.hits, "misses": st.misses,
+                                            "since": st.since, "level": st.level}
+
+    def max_hits(self):
+        """Longest current run of consecutive hits (for on-screen debugging)."""
+        with self._lock:
+            return max((st.hits for st in self._states.values()), default=0)
+
+    def claim_alert(self, track, zone, now):
+        """True (and starts the cooldowns) if the pair is inside and neither cooldown is running."""
+        with self._lock:
+            st = self._states.get((track, zone))
+            if st is None or not st.inside:
+                return False
+            last = self._last_alert.get((track, zone))
+            zone_last = self._zone_alert.get(zone)
+            if (last is not None and now - last < self.cooldown) or \
+                    (zone_last is not None and now - zone_last < self.zone_cooldown):
+                self.suppressed += 1
+                return False
+            self._last_alert[(track, zone)] = now
+            self._zone_alert[zone] = now
+            self.alerts += 1
+            return True
+
+    def stats(self):
+        with self._lock:
+            inside = sum(st.inside for st in self._states.values())
+            return f"[ZONES] pairs={len(self._states)} inside={inside} alerts={self.alerts} suppressed={self.suppressed}"
+
+
+class ZoneMonitor:
+    """
+    :param zones: list of polygons [(x, y), ...] (zone ids are their indices) or {name: polygon}
+    :param ema_alpha: keypoint smoothing, 1.0 = raw keypoints
+    Feed it ``update([(track_id, [(key, (x, y), conf)])], now)`` once per processed frame.
+    """
+
+    def __init__(self, zones, enter_margin=ENTER_MARGIN_PX, exit_margin=EXIT_MARGIN_PX, ema_alpha=EMA_ALPHA,
+                 **state_kwargs):
+        named = zones.items() if isinstance(zones, dict) else enumerate(zones)
+        self.zone_ids = []
+        items = []
+        for zone_id, poly in named:
+            self.zone_ids.append(zone_id)
+            items.append({"name": zone_id, "poly": [tuple(p) for p in poly]})
+        self.rois = ScaledROIs(items, 1.0, 1.0, pad=int(exit_margin) + 1, cell=max(32, 4 * int(exit_margin) + 4))
+        self.ema_alpha = ema_alpha
+        self.states = ZoneStates(enter_level=enter_margin, exit_level=-exit_margin, **state_kwargs)
+        self._smooth = {}          # (track, key) -> (x, y, last_seen)
+        self._lock = threading.Lock()
+
+    def _smoothed(self, track, key, point, now):
+        prev = self._smooth.get((track, key))
+        x, y = float(point[0]), float(point[1])
+        if prev is not None:
+            a = self.ema_alpha
+            x, y = a * x + (1 - a) * prev[0], a * y + (1 - a) * prev[1]
+        self._smooth[(track, key)] = (x, y, now)
+        return x, y
+
+    def update(self, observations, now):
+        """
+        :param observations: [(track_id, [(key, (x, y), conf)])], e.g. wrists per tracked person
+        :return: (events, points) where points is [(track_id, key, (x, y) smoothed, inside_any)]
+        """
+        levels, points = {}, []
+        with self._lock:
+            for track, kpts in observations:
+                for key, point, _ in kpts:
+                    x, y = self._smoothed(track, key, point, now)
+                    for idx in self.rois.candidates((x, y)):
+                        pair = (track, self.zone_ids[idx])
+                        d = self.rois.signed_dist((x, y), idx)
+                        if d > levels.get(pair, -np.inf):
+                            levels[pair] = d
+                    points.append((track, key, (int(round(x)), int(round(y)))))
+            stale = [k for k, v in self._smooth.items() if now - v[2] > self.states.stale_seconds]
+            for k in stale:
+                del self._smooth[k]
+        events = self.states.update(levels, now)
+        inside = {track for track, _ in self.states.active()}
+        return events, [(track, key, pt, track in inside) for track, key, pt in points]
+
+    def active(self):
+        return self.states.active()
+
+    def claim_alert(self, track, zone, now):
+        return self.states.claim_alert(track, zone, now)
+
+    def stats(self):
+        return self.states.stats()
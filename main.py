@@ -1,17 +1,31 @@
 # main.py - IoT Theft Detection with YOLO + Face Recognition + Pose Detection + Restricted Area + Microphone
 
+from utils import startup
+import argparse
 import cv2
 import time
 import os
 import numpy as np
-from ultralytics import YOLO
-import sounddevice as sd
-from detection.face_recognize import recognize_faces
-from alerts.telegram import send_telegram_alert
+from detection.engine import DetectionEngine, wrists
+from detection.face_recognize import recognize_tracked, warm_known_faces
+from detection.model_registry import registry
+from detection.tracker import IoUTracker
+from detection.motion import MotionDetector
+from detection.scaling import FrameScaler
+from detection.zones import ZoneMonitor
+from alerts.dispatcher import AlertDispatcher
+from alerts.telegram import TelegramSink
 from utils.logger import log_event
-import serial
-import time
-import winsound 
+from utils import metrics
+from utils.helpers import draw_pose
+from utils.pipeline import Pipeline
+from utils.storage import SnapshotStore
+from utils.timing import StageTimer
+from camera.capture import LatestFrameReader
+from camera.recorder import ClipRecorder
+from utils.frame_bus import FramePublisher
+from utils.serial_listener import SerialListener
+startup.mark("imports")
 # -----------------------------
 # Sound detection parameters
 # -----------------------------
@@ -19,24 +33,23 @@ SOUND_THRESHOLD = 0.2  # Adjust based on mic sensitivity
 DURATION = 0.1         # seconds to sample per frame
 
 
-arduino = serial.Serial('COM5', 9600, timeout=1)
-time.sleep(2)  # wait for NodeMCU to initialize
+SERIAL_PORT = "COM5"   # or a pty / "file:<path>" stand-in for testing
+SOUND_WINDOW_MS = 500  # a SOUND within +-this of the frame's capture time counts
+
+# Reads the NodeMCU in the background and timestamps every line (reconnects on its own).
+# The port is only opened by start() in main(), so importing this module touches no hardware.
+sound_listener = SerialListener(SERIAL_PORT, 9600)
 
-def detect_sound_from_arduino():
-    if arduino.in_waiting > 0:
-        try:
-            line = arduino.readline().decode('utf-8', errors='ignore').strip()
-            if line:
-                print(f"[Serial] {line}")
-            return line == "SOUND"
-        except Exception as e:
-            print("[ERROR] Serial read failed:", e)
-    return False
+def detect_sound_from_arduino(frame_ts=None):
+    """True if the sensor reported SOUND around the frame's capture time (monotonic)."""
+    frame_ts = time.monotonic() if frame_ts is None else frame_ts
+    return sound_listener.sound_near(frame_ts, SOUND_WINDOW_MS)
 
 
 
 # def detect_sound():
 #     """Return True if sound exceeds threshold"""
+#     import sounddevice as sd
 #     try:
 #         audio = sd.rec(int(DURATION * 44100), samplerate=44100, channels=1, blocking=True)
 #         peak = np.abs(audio).max()
@@ -45,154 +58,349 @@ def detect_sound_from_arduino():
 #         return False
 
 # -----------------------------
-# Load YOLO models
+# YOLO models (loaded lazily through detection/model_registry.py, warmed in main())
 # -----------------------------
 MODEL_PATH = "models/Training_model/yolov8n.pt"
 POSE_MODEL_PATH = "models/yolov8n-pose.pt"
+OBJECT_EVERY = 5   # run the object model every Nth frame; persons come from the pose pass
+INFER_SIZE = 640   # long side the models see (None = full frame); results map back to source pixels
+BACKEND = "torch"  # "onnx" / "openvino": exported once to models/cache/ and run by ONNX Runtime
+BACKEND_THREADS = None   # intra-op threads (None = library default)
+BACKEND_INT8 = False     # INT8-quantized ONNX weights
+
+# Per-stage latency, printed with the periodic status so each inference size can be compared
+timer = StageTimer("main", setting=INFER_SIZE or "full")
+engine = DetectionEngine(MODEL_PATH, POSE_MODEL_PATH, object_every=OBJECT_EVERY, conf=0.5,
+                         infer_size=INFER_SIZE, timer=timer, backend=BACKEND, threads=BACKEND_THREADS,
+                         int8=BACKEND_INT8)
+tracker = IoUTracker()
+
+# -----------------------------
+# Motion gate
+# -----------------------------
+MOTION_MODE = "skip"   # "skip": no inference on static frames, "crop": also limit pose to the motion ROI, "off"
+motion_detector = MotionDetector(threshold=25, min_area=0.002, hold_frames=15)
+_last_result = None
 
-yolo = YOLO(MODEL_PATH)
-pose_model = YOLO(POSE_MODEL_PATH)
+# -----------------------------
+# Alert dispatch (off the frame loop)
+# -----------------------------
+ALERT_SINKS = ["telegram"]     # any of "telegram", "email", "mqtt"
+ALERT_COALESCE_SECONDS = 5.0
+SNAPSHOT_FORMAT = "jpg"        # or "webp" (smaller at the same quality)
+SNAPSHOT_QUALITY = 85
+CAPTURE_QUOTA_GB = 2           # oldest alert snapshots and clips are evicted beyond this
+CLIP_DIR = "captures/clips"
+
+def build_alert_dispatcher(names=ALERT_SINKS):
+    sinks = []
+    for name in names:
+        if name == "telegram":
+            sinks.append(TelegramSink())
+        elif name == "email":
+            from alerts.email_alert import EmailSink
+            sinks.append(EmailSink())
+        elif name == "mqtt":
+            from alerts.mqtt_publish import MqttSink
+            sinks.append(MqttSink())
+    # Only captures/alert and the clips are ours; known/, unknown/ and replay/ are never evicted
+    store = SnapshotStore("captures", fmt=SNAPSHOT_FORMAT, quality=SNAPSHOT_QUALITY,
+                          quota_bytes=int(CAPTURE_QUOTA_GB * 1024 ** 3), kinds=("alert",), clip_dir=CLIP_DIR)
+    return AlertDispatcher(sinks, coalesce_window=ALERT_COALESCE_SECONDS, store=store)
 
-os.makedirs("captures/known", exist_ok=True)
-os.makedirs("captures/unknown", exist_ok=True)
+dispatcher = build_alert_dispatcher()
+
+# -----------------------------
+# Metrics (/metrics on a local port; always on when headless)
+# -----------------------------
+METRICS_PORT = metrics.METRICS_PORT
+FRAMES = metrics.counter("theft_frames_total", "Frames through the detection loop", ("source",)).labels("main")
+SKIPPED = metrics.counter("theft_frames_skipped_total", "Frames whose inference the motion gate skipped",
+                          ("source",)).labels("main")
+ALERTS = metrics.counter("theft_alerts_total", "Alerts raised", ("source",)).labels("main")
+
+def register_pipeline_metrics(pipeline):
+    """Queue depths, drops and FPS are read from the live objects at scrape time."""
+    metrics.gauge_callback("theft_fps", "Rolling frames per second per pipeline stage",
+                           lambda: {k: v.fps() for k, v in pipeline.stats.items()}, ("stage",))
+    metrics.counter_callback("theft_frames_dropped_total", "Frames dropped by a full pipeline queue",
+                             lambda: {"infer": pipeline.in_q.dropped, "render": pipeline.out_q.dropped}, ("queue",))
+    metrics.gauge_callback("theft_alert_queue_depth", "Alerts waiting for the dispatcher", dispatcher.pending)
+    metrics.counter_callback("theft_alerts_dropped_total", "Alerts dropped because the dispatcher queue was full",
+                             lambda: dispatcher.dropped)
+
+# -----------------------------
+# Pre-event clips (raw frames, encoded in a separate process)
+# -----------------------------
+CLIP_PRE_SECONDS = 5
+CLIP_POST_SECONDS = 5
+CLIP_FPS = 15
+recorder = ClipRecorder(CLIP_PRE_SECONDS, CLIP_POST_SECONDS, fps=CLIP_FPS, out_dir=CLIP_DIR,
+                        on_saved=dispatcher.store.add)
+
+# -----------------------------
+# Live video for the dashboard (annotated frames into shared memory; the dashboard encodes)
+# -----------------------------
+LIVE_VIDEO = True
+LIVE_VIDEO_FPS = 15
+frame_bus = FramePublisher("main", fps=LIVE_VIDEO_FPS)
 
 # -----------------------------
 # Restricted area
 # -----------------------------
 restricted_area = [(100, 200), (500, 200), (500, 400), (100, 400)]
-def point_in_polygon(point, polygon):
-    return cv2.pointPolygonTest(np.array(polygon, np.int32), point, False) >= 0
+# A wrist has to stay inside for a few frames before the zone counts as entered, and has to be
+# clearly outside for a few frames to leave it; alerts are cooled down per person and per zone
+ZONE_ENTER_FRAMES = 3
+ZONE_EXIT_FRAMES = 5
+ZONE_ALERT_COOLDOWN = 10.0
+zone_monitor = ZoneMonitor([restricted_area], enter_frames=ZONE_ENTER_FRAMES, exit_frames=ZONE_EXIT_FRAMES,
+                           cooldown=ZONE_ALERT_COOLDOWN)
 
-def main():
-    print("[INFO] 🚀 IoT Theft Detection started with microphone input. Press 'q' to quit.")
-    cap = cv2.VideoCapture(0)
-    last_log_time = 0
+def detect(frame):
+    """Inference stage: runs the models on one frame and returns plain results."""
+    global _last_result
+    roi = None
+    motion_started = False
+    if MOTION_MODE != "off":
+        with timer.stage("motion"):
+            motion_detector.update(frame)
+        if not motion_detector.active and _last_result is not None:
+            # Static scene: nothing can have changed, reuse the last result
+            return dict(_last_result, skipped=True)
+        motion_started = motion_detector.started
+        if MOTION_MODE == "crop":
+            roi = motion_detector.union_roi(frame.shape)
 
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            if time.time() - last_log_time >= 3:
-                print("[WARN] ⚠️ No frame captured.")
-                last_log_time = time.time()
-            continue
+    # -----------------------------
+    # Pose pass (persons + keypoints) and scheduled object pass
+    # -----------------------------
+    detections = engine(frame, motion=motion_started, roi=roi)
+    objects = detections["objects"]
+    persons = detections["persons"]
 
-        # -----------------------------
-        # Draw restricted area
-        # -----------------------------
-        pts = np.array(restricted_area, np.int32).reshape((-1,1,2))
-        cv2.polylines(frame, [pts], isClosed=True, color=(0,0,255), thickness=2)
-        cv2.putText(frame, "Restricted Area", (restricted_area[0][0], restricted_area[0][1]-10),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0,0,255), 2)
+    # -----------------------------
+    # Face recognition
+    # -----------------------------
+    with timer.stage("faces"):
+        face_results = recognize_tracked(frame, persons, tracker)
 
-        # -----------------------------
-        # YOLO object detection
-        # -----------------------------
-        results = yolo(frame, conf=0.5)
-        objects = []
-        persons = []
-        for r in results:
-            for box in r.boxes:
-                cls_id = int(box.cls[0])
-                cls_name = yolo.names[cls_id]
-                conf = float(box.conf[0])
-                x1, y1, x2, y2 = map(int, box.xyxy[0])
-
-                obj = {"class": cls_name, "confidence": conf, "box": (x1, y1, x2, y2)}
-                objects.append(obj)
-                if cls_name == "person":
-                    persons.append(obj)
-
-                cv2.rectangle(frame, (x1,y1),(x2,y2),(255,0,0),2)
-                cv2.putText(frame, f"{cls_name} {conf:.2f}", (x1,y1-10),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255,0,0),2)
+    # -----------------------------
+    # Wrists vs restricted area (smoothed per track, debounced)
+    # -----------------------------
+    observations = [(p["track_id"], list(wrists(p))) for p in persons]
+    zone_events, points = zone_monitor.update(observations, time.monotonic())
+    for ev in zone_events:
+        print(f"[ZONE] track {ev['track']} {ev['kind']} zone {ev['zone']}")
+    zones_active = zone_monitor.active()
 
-        # -----------------------------
-        # Face recognition
-        # -----------------------------
-        face_results = recognize_faces(frame) if persons else []
+    _last_result = {
+        "objects": objects,
+        "persons": persons,
+        "face_results": face_results,
+        "hands": [(point, inside) for _, _, point, inside in points],
+        "hand_in_restricted_area": bool(zones_active),
+        "zones_active": zones_active,
+        "skipped": False,
+    }
+    return _last_result
 
-        # -----------------------------
-        # Pose detection
-        # -----------------------------
-        hand_in_restricted_area = False
-        if persons:
-            pose_results = pose_model(frame)
-            if pose_results:
-                frame = pose_results[0].plot()
-                for person in pose_results:
-                    keypoints = person.keypoints
-                    num_keypoints = keypoints.shape[0]
-                    for idx in [9,10]:  # wrists
-                        if idx >= num_keypoints:
-                            continue
-                        x,y,conf = keypoints[idx]
-                        if conf > 0.3:
-                            hand_point = (int(x),int(y))
-                            cv2.circle(frame, hand_point, 24, (0,255,255), -1)
-                            if point_in_polygon(hand_point, restricted_area):
-                                hand_in_restricted_area = True
-                                cv2.putText(frame, "⚠️ HAND IN RESTRICTED AREA!",
-                                            (hand_point[0]+10, hand_point[1]),
-                                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0,0,255),2)
+
+def annotate(frame, result):
+    """Draws detections onto the frame (render stage)."""
+    for person in result["persons"]:
+        draw_pose(frame, person["keypoints"])
+
+    # -----------------------------
+    # Draw restricted area
+    # -----------------------------
+    pts = np.array(restricted_area, np.int32).reshape((-1,1,2))
+    cv2.polylines(frame, [pts], isClosed=True, color=(0,0,255), thickness=2)
+    cv2.putText(frame, "Restricted Area", (restricted_area[0][0], restricted_area[0][1]-10),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0,0,255), 2)
+
+    for obj in result["objects"]:
+        x1, y1, x2, y2 = obj["box"]
+        cv2.rectangle(frame, (x1,y1),(x2,y2),(255,0,0),2)
+        cv2.putText(frame, f"{obj['class']} {obj['confidence']:.2f}", (x1,y1-10),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255,0,0),2)
+
+    for hand_point, inside in result["hands"]:
+        cv2.circle(frame, hand_point, 24, (0,255,255), -1)
+        if inside:
+            cv2.putText(frame, "⚠️ HAND IN RESTRICTED AREA!",
+                        (hand_point[0]+10, hand_point[1]),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0,0,255),2)
+
+    # -----------------------------
+    # Draw face results
+    # -----------------------------
+    for name, loc in result["face_results"]:
+        if loc is None or len(loc)!=4:
+            continue
+        top,right,bottom,left = loc
+        label = name if name else "Unknown"
+        color = (0,255,0) if label!="Unknown" else (0,0,255)
+        cv2.rectangle(frame, (left,top),(right,bottom),color,2)
+        y_label = max(top-10,10)
+        (text_w,text_h),_ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX,0.8,2)
+        cv2.rectangle(frame,(left,y_label-text_h-2),(left+text_w,y_label+2),color,-1)
+        cv2.putText(frame,label,(left,y_label),cv2.FONT_HERSHEY_SIMPLEX,0.8,(255,255,255),2)
+    return frame
+
+
+def main(source=0, headless=False, workers=1, metrics_port=None):
+    print("[INFO] 🚀 IoT Theft Detection started with microphone input. Press 'q' to quit.")
+    last_log_time = 0
+    first_frame = True
+    os.makedirs("captures/known", exist_ok=True)
+    os.makedirs("captures/unknown", exist_ok=True)
+
+    def render(frame, result, ts):
+        nonlocal last_log_time, first_frame
+        FRAMES.inc()
+        if result["skipped"]:
+            SKIPPED.inc()
+        if first_frame:
+            startup.mark("first frame")
+            print(startup.report())
+            print(registry.report())
+            first_frame = False
+        # Raw frame into the pre-event ring before anything is drawn on it
+        recorder.push(frame, ts)
+        with timer.stage("render"):
+            frame = annotate(frame, result)
+        if LIVE_VIDEO:
+            with timer.stage("publish"):
+                frame_bus.publish(frame)
+        objects = result["objects"]
+        persons = result["persons"]
 
         # -----------------------------
         # Microphone sound detection
         # -----------------------------
-        sound_detected = detect_sound_from_arduino()
-        # sound_detected = detect_sound_from_arduino()
+        sound_detected = detect_sound_from_arduino(ts)
         if sound_detected:
             print("[INFO] 🔊 Sound detected!")
             # winsound.Beep(1000, 500)
 
         # -----------------------------
         # Trigger alert if both hand in restricted area AND sound detected
+        # (once per cooldown, not on every frame of the same incident)
         # -----------------------------
-        if hand_in_restricted_area and sound_detected:
+        claimed = result["hand_in_restricted_area"] and sound_detected and any(
+            zone_monitor.claim_alert(track, zone, ts) for track, zone in result["zones_active"])
+        if claimed:
             print("[ALERT] 🚨 Intrusion with sound detected!")
-            alert_path = f"captures/alert_{int(time.time())}.jpg"
-            cv2.imwrite(alert_path, frame)
-            send_telegram_alert(alert_path, "🚨 Intruder detected with sound!")
-            log_event(face=None, objects=[obj["class"] for obj in objects], alerts=True, capture_path=alert_path)
+            ALERTS.inc()
+            # Only enqueues: snapshot write and notifications happen on the dispatcher threads
+            with timer.stage("alert"):
+                clip_path = recorder.trigger("alert", ts)
+                alert_path = dispatcher.submit("🚨 Intruder detected with sound!", frame,
+                                               meta={"objects": [obj["class"] for obj in objects], "clip": clip_path})
+                log_event(face=None, objects=[obj["class"] for obj in objects], alerts=True,
+                          capture_path=alert_path or "")
 
         # -----------------------------
         # Log detections every 3 sec
         # -----------------------------
         if time.time() - last_log_time >= 3:
             if persons:
-                print(f"[INFO] 🧍 Persons detected: {len(persons)}, Faces recognized: {len(face_results)}")
+                print(f"[INFO] 🧍 Persons detected: {len(persons)}, Faces recognized: {len(result['face_results'])}")
             elif objects:
                 detected_classes = [obj["class"] for obj in objects]
                 print(f"[INFO] 🔎 No person, but detected: {', '.join(detected_classes)}")
             else:
                 print("[INFO] ❌ No objects detected.")
+            if MOTION_MODE != "off":
+                print(motion_detector.stats())
+            print(zone_monitor.stats())
+            print(timer.report())
+            if dispatcher.pending() or dispatcher.dropped:
+                print(dispatcher.stats())
             last_log_time = time.time()
 
-        # -----------------------------
-        # Draw face results
-        # -----------------------------
-        for name, loc in face_results:
-            if loc is None or len(loc)!=4:
-                continue
-            top,right,bottom,left = loc
-            label = name if name else "Unknown"
-            color = (0,255,0) if label!="Unknown" else (0,0,255)
-            cv2.rectangle(frame, (left,top),(right,bottom),color,2)
-            y_label = max(top-10,10)
-            (text_w,text_h),_ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX,0.8,2)
-            cv2.rectangle(frame,(left,y_label-text_h-2),(left+text_w,y_label+2),color,-1)
-            cv2.putText(frame,label,(left,y_label),cv2.FONT_HERSHEY_SIMPLEX,0.8,(255,255,255),2)
-
         # -----------------------------
         # Show live video
         # -----------------------------
+        if headless:
+            return True
         cv2.imshow("IoT Theft Detection + Pose + Mic", frame)
         if cv2.waitKey(1) & 0xFF == ord('q'):
             print("[INFO] 👋 Exiting program...")
-            break
+            return False
+        return True
+
+    # Models and the face index load on background threads while the camera connects;
+    # the first detect() call waits for whatever is not ready yet
+    with startup.phase("warm-up start"):
+        warm_known_faces()
+        engine.warmup()
+    with startup.phase("serial"):
+        sound_listener.start()
+    pipeline = Pipeline(LatestFrameReader(source), detect, render, workers=workers)
+    register_pipeline_metrics(pipeline)
+    metrics_server = None
+    if metrics_port is None and headless:
+        metrics_port = METRICS_PORT
+    if metrics_port:
+        metrics_server = metrics.serve(metrics_port)
+    try:
+        pipeline.run()
+    except KeyboardInterrupt:
+        print("[INFO] 👋 Exiting program...")
 
-    cap.release()
-    cv2.destroyAllWindows()
+    sound_listener.stop()
+    recorder.close()
+    frame_bus.close()
+    dispatcher.close()
+    if metrics_server is not None:
+        metrics_server.shutdown()
+    if not headless:
+        cv2.destroyAllWindows()
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="IoT Theft Detection")
+    parser.add_argument("--source", default="0", help="camera index, video file or stream URL")
+    parser.add_argument("--headless", action="store_true", help="run without a display window")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="inference worker threads (models are shared, keep 1 unless they are thread-safe)")
+    parser.add_argument("--serial", default=SERIAL_PORT, help="sound sensor port (COM5, /dev/ttyUSB0, file:<path>)")
+    parser.add_argument("--sound-window", type=int, default=SOUND_WINDOW_MS,
+                        help="ms around a frame's capture time in which a SOUND counts")
+    parser.add_argument("--motion", choices=["skip", "crop", "off"], default=MOTION_MODE,
+                        help="motion gating of inference")
+    parser.add_argument("--motion-threshold", type=int, default=motion_detector.threshold,
+                        help="per-pixel change counted as motion (lower = more sensitive)")
+    parser.add_argument("--motion-hold", type=int, default=motion_detector.hold_frames,
+                        help="frames to keep running inference after motion stops")
+    parser.add_argument("--object-every", type=int, default=OBJECT_EVERY,
+                        help="run the object model every Nth frame (0 = never on a schedule)")
+    parser.add_argument("--infer-size", type=int, default=INFER_SIZE or 0,
+                        help="long side in px the models see (0 = full frame)")
+    parser.add_argument("--backend", choices=["torch", "onnx", "openvino"], default=BACKEND,
+                        help="inference backend for the YOLO models")
+    parser.add_argument("--threads", type=int, default=BACKEND_THREADS, help="backend intra-op threads")
+    parser.add_argument("--int8", action="store_true", default=BACKEND_INT8, help="INT8-quantized ONNX weights")
+    parser.add_argument("--no-timing", action="store_true", help="turn the per-stage timing hook into a no-op")
+    parser.add_argument("--no-live-video", action="store_true", help="do not publish frames for the dashboard")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help=f"serve /metrics on 127.0.0.1:<port> (default {METRICS_PORT} when --headless, 0 = off)")
+    args = parser.parse_args()
+    if (args.backend, args.threads, args.int8) != (BACKEND, BACKEND_THREADS, BACKEND_INT8):
+        engine = DetectionEngine(MODEL_PATH, POSE_MODEL_PATH, conf=0.5, timer=timer, backend=args.backend,
+                                 threads=args.threads, int8=args.int8)
+    engine.object_every = args.object_every
+    engine.scaler = FrameScaler(args.infer_size)
+    timer.setting = args.infer_size or "full"
+    if args.no_timing:
+        timer.enabled = False
+    LIVE_VIDEO = not args.no_live_video
+    MOTION_MODE = args.motion
+    SOUND_WINDOW_MS = args.sound_window
+    sound_listener.port = args.serial
+    motion_detector.threshold = args.motion_threshold
+    motion_detector.hold_frames = args.motion_hold
+    source = int(args.source) if args.source.isdigit() else args.source
+    main(source=source, headless=args.headless, workers=args.workers, metrics_port=args.metrics_port)
@@ -0,0 +1,139 @@
+# multicam.py - Theft detection for many cameras with one shared, batched set of models
+#
+#   python multicam.py --config cameras.json [--replicas 2] [--batch 8] [--headless]
+
+import argparse
+import functools
+import queue
+import time
+from datetime import datetime
+
+import cv2
+
+from alerts.dispatcher import AlertDispatcher
+from alerts.telegram import TelegramSink
+from detection.engine import DetectionEngine
+from detection.inference_server import InferenceServer, load_cameras
+from utils import event_store
+from utils.event_bus import publish
+from utils.helpers import draw_pose
+from utils.logger import log_event
+from utils.serial_listener import SerialListener
+from utils.storage import SnapshotStore
+
+REPORT_EVERY = 3.0
+SOUND_WINDOW_MS = 500
+SNAP_DIR = "theft_snaps"        # item-event snapshots, shared with tftcam.py
+
+
+def record_item_event(store, events_db, frame, cam, event):
+    """Snapshot + theft_events.db row + dashboard event, like tftcam.py does for its one camera."""
+    now = datetime.now()
+    name = f"event_{now:%Y%m%d_%H%M%S}_{cam.name}_{event['hand']}_{event['item_name']}"
+    filename = store.save(frame.copy(), "event", name=name, when=now) or ""
+    row = {"ts": now.timestamp(), "img_path": filename, "score": event["score"], "dist_px": event["dist_px"],
+           "vel": event["vel"], "hand": event["hand"], "item_name": event["item_name"]}
+    events_db.add(row)
+    publish("item_event", dict(row, track=event["track"], camera=cam.name), source=cam.name)
+    print(f"[EVENT] {cam.name}: saved {filename} score={event['score']:.3f} item={event['item_name']} "
+          f"track={event['track']}")
+
+
+def annotate(frame, cam, result):
+    if cam.item_watcher is not None:
+        cam.item_watcher.draw(frame)
+    for person in result["persons"]:
+        draw_pose(frame, person["keypoints"])
+    for area in cam.restricted_areas:
+        cv2.polylines(frame, [area.reshape((-1,1,2))], isClosed=True, color=(0,0,255), thickness=2)
+    for obj in result["objects"]:
+        x1, y1, x2, y2 = obj["box"]
+        cv2.rectangle(frame, (x1,y1),(x2,y2),(255,0,0),2)
+        cv2.putText(frame, f"{obj['class']} {obj['confidence']:.2f}", (x1,y1-10),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255,0,0),2)
+    for hand_point, inside in result["hands"]:
+        cv2.circle(frame, hand_point, 12, (0,0,255) if inside else (0,255,255), -1)
+    for name, (top, right, bottom, left) in result["face_results"]:
+        color = (0,255,0) if name != "Unknown" else (0,0,255)
+        cv2.rectangle(frame, (left,top),(right,bottom),color,2)
+        cv2.putText(frame, name or "Unknown", (left, max(top-10,10)), cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2)
+    cv2.putText(frame, cam.name, (10,25), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255,255,255), 2)
+    return frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-camera IoT Theft Detection")
+    parser.add_argument("--config", default="cameras.json", help="camera list (see cameras.example.json)")
+    parser.add_argument("--replicas", type=int, default=1, help="model replicas (each uses its own threads)")
+    parser.add_argument("--batch", type=int, default=8, help="max frames per model call")
+    parser.add_argument("--object-every", type=int, default=5)
+    parser.add_argument("--infer-size", type=int, default=640,
+                        help="default model input long side (per camera: \"infer_size\" in the config; 0 = full frame)")
+    parser.add_argument("--backend", choices=["torch", "onnx", "openvino"], default="torch")
+    parser.add_argument("--threads", type=int, default=None, help="backend intra-op threads per replica")
+    parser.add_argument("--int8", action="store_true", help="INT8-quantized ONNX weights")
+    parser.add_argument("--serial", default=None, help="sound sensor port; when set, alerts also need a SOUND")
+    parser.add_argument("--headless", action="store_true")
+    args = parser.parse_args()
+
+    cameras = load_cameras(args.config, object_every=args.object_every, infer_size=args.infer_size or None)
+    if not cameras:
+        print(f"[ERROR] No cameras in {args.config}")
+        return
+    engine_factory = functools.partial(DetectionEngine, backend=args.backend, threads=args.threads, int8=args.int8)
+    server = InferenceServer(cameras, engine_factory, replicas=args.replicas, batch_max=args.batch)
+    dispatcher = AlertDispatcher([TelegramSink()], capture_dir="captures")
+    sound = SerialListener(args.serial).start() if args.serial else None
+    # Only opened when some camera watches items
+    store = events_db = None
+    if any(cam.item_watcher is not None for cam in cameras):
+        store = SnapshotStore(SNAP_DIR, kinds=("event",))
+        events_db = event_store.EventStore(event_store.DB_PATH)
+
+    print(f"[INFO] 🚀 Watching {len(cameras)} cameras with {args.replicas} model replica(s). Press 'q' to quit.")
+    server.start()
+    last_report = time.monotonic()
+    try:
+        while server.running:
+            idle = True
+            for cam in cameras:
+                try:
+                    frame_id, ts, frame, result = cam.results.get(timeout=0)
+                except queue.Empty:
+                    continue
+                idle = False
+                # Once per cooldown per person and zone, not on every frame of the same incident
+                if (result["hand_in_restricted_area"] and (sound is None or sound.sound_near(ts, SOUND_WINDOW_MS))
+                        and cam.claim_alert(result, ts)):
+                    classes = [obj["class"] for obj in result["objects"]]
+                    path = dispatcher.submit(f"🚨 Restricted area breach on {cam.name}", frame,
+                                             meta={"camera": cam.name, "objects": classes})
+                    log_event(face=None, objects=classes, alerts=True, capture_path=path or "")
+                if result.get("item_event") is not None:
+                    record_item_event(store, events_db, frame, cam, result["item_event"])
+                if not args.headless:
+                    cv2.imshow(f"Theft Detection - {cam.name}", annotate(frame, cam, result))
+            if not args.headless and cv2.waitKey(1) & 0xFF == ord('q'):
+                break
+            if idle:
+                time.sleep(0.005)
+            if time.monotonic() - last_report >= REPORT_EVERY:
+                server.report()
+                last_report = time.monotonic()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print("[INFO] 👋 Exiting program...")
+        server.stop()
+        dispatcher.close()
+        if events_db is not None:
+            store.close()
+            events_db.close()
+        if sound is not None:
+            sound.stop()
+        if not args.headless:
+            cv2.destroyAllWindows()
+
+
+if __name__ == "__main__":
+    main()
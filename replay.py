@@ -0,0 +1,349 @@
+# replay.py - Offline replay of recorded video through the detectors, faster than real time
+#
+#   python replay.py recordings/shop_0900.mp4 --mode yolo --procs 8 --stride 2
+#   python replay.py recordings/*.mp4 --mode items --items items.json --no-store
+#
+# Each video is cut into segments that are processed by a pool of worker
+# processes. Inside a worker a decoder thread reads (and strides through) the
+# segment while the models consume frames in batches. Every segment starts a
+# little early (warm-up) so trackers, consecutive-frame counters and cooldowns
+# are in the same state they would be in a live run; events from the warm-up
+# are dropped because the previous segment already reported them.
+
+import argparse
+import glob
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from multiprocessing import get_context
+
+import cv2
+
+SEGMENT_SECONDS = 60        # video per task; smaller = better load balance, more warm-up overhead
+WARMUP_SECONDS = 10         # must cover the zone alert cooldown and the item-watch cooldown
+RESTRICTED_AREA = [(100, 200), (500, 200), (500, 400), (100, 400)]   # same default as main.py
+REPLAY_CAPTURE_DIR = "captures/replay"
+REPLAY_SNAP_DIR = "theft_snaps"
+
+# Per-process state, set by _init_worker
+_opts = None
+_engine = None
+
+
+# -----------------------------
+# Planning
+# -----------------------------
+def probe(path):
+    """(frame_count, fps) of a video file; frame_count is 0 if the container does not say."""
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise IOError(f"cannot open {path}")
+    frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+    cap.release()
+    return max(frames, 0), (fps if fps > 0 else 25.0)
+
+
+def plan_segments(path, frames, fps, segment_seconds=SEGMENT_SECONDS, warmup_seconds=WARMUP_SECONDS):
+    """[{path, fps, start, end, warmup_start}] covering [0, frames); one open-ended segment if frames is unknown."""
+    if frames <= 0:
+        return [{"path": path, "fps": fps, "start": 0, "end": None, "warmup_start": 0}]
+    seg = max(1, int(segment_seconds * fps))
+    warm = int(warmup_seconds * fps)
+    return [{"path": path, "fps": fps, "start": s, "end": min(s + seg, frames), "warmup_start": max(0, s - warm)}
+            for s in range(0, frames, seg)]
+
+
+def video_start_time(path, frames, fps):
+    """Wall-clock time of the first frame: file mtime is taken as the end of the recording."""
+    return datetime.fromtimestamp(os.path.getmtime(path)) - timedelta(seconds=frames / fps if frames else 0)
+
+
+# -----------------------------
+# Worker side
+# -----------------------------
+def _init_worker(opts):
+    global _opts, _engine
+    _opts = opts
+    # Many processes x many threads each only thrash the cores
+    cv2.setNumThreads(1)
+    try:
+        import torch
+        torch.set_num_threads(opts["threads"])
+    except ImportError:
+        pass
+    from detection.engine import DetectionEngine
+    # items mode only uses the pose model
+    _engine = DetectionEngine(object_every=opts["object_every"] if opts["mode"] == "yolo" else 0, conf=opts["conf"],
+                              infer_size=opts["infer_size"], backend=opts["backend"], threads=opts["threads"],
+                              int8=opts["int8"])
+
+
+def _decode(seg, stride, out_q, stop):
+    """Decoder thread: pushes (frame_idx, frame) for every ``stride``-th frame, then None."""
+    cap = cv2.VideoCapture(seg["path"])
+    idx = seg["warmup_start"]
+    if idx:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
+    try:
+        while not stop.is_set() and (seg["end"] is None or idx < seg["end"]):
+            if idx % stride:
+                # grab() skips the colour conversion and copy of frames we do not use
+                if not cap.grab():
+                    break
+            else:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                out_q.put((idx, frame))
+            idx += 1
+    finally:
+        cap.release()
+        out_q.put(None)
+
+
+def _batches(seg, batch_size, stride):
+    """Yields lists of up to ``batch_size`` (frame_idx, frame) decoded in a background thread."""
+    out_q = queue.Queue(maxsize=batch_size * 4)
+    stop = threading.Event()
+    t = threading.Thread(target=_decode, args=(seg, stride, out_q, stop), daemon=True)
+    t.start()
+    batch = []
+    try:
+        while True:
+            item = out_q.get()
+            if item is None:
+                break
+            batch.append(item)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    finally:
+        stop.set()
+        while t.is_alive():
+            try:
+                out_q.get_nowait()
+            except queue.Empty:
+                t.join(timeout=0.05)
+
+
+def _infer_yolo(cam, batch, fps):
+    """Motion gate + one batched pose call (+ batched object call when due) -> [(idx, frame, result)]."""
+    plan = []
+    have_result = cam.last_result is not None
+    for idx, frame in batch:
+        skip = False
+        due = False
+        if cam.motion is not None:
+            cam.motion.update(frame)
+            skip = not cam.motion.active and have_result
+        if not skip:
+            due = ((cam.motion is not None and cam.motion.started)
+                   or (cam.object_every > 0 and cam.frame_idx % cam.object_every == 0))
+            cam.frame_idx += 1
+            have_result = True
+        plan.append((idx, frame, skip, due))
+
+    active = [(idx, frame) for idx, frame, skip, _ in plan if not skip]
+    persons = iter(_engine.detect_people_batch([f for _, f in active]) if active else [])
+    due_frames = [frame for _, frame, skip, due in plan if not skip and due]
+    objects = iter(_engine.detect_objects_batch(due_frames) if due_frames else [])
+
+    out = []
+    for idx, frame, skip, due in plan:
+        if not skip:
+            if due:
+                cam.objects = next(objects)
+            # Video time, so zone debouncing and cooldowns do not depend on the replay speed
+            cam.last_result = cam.postprocess(frame, next(persons), idx / fps)
+        out.append((idx, frame, cam.last_result))
+    return out
+
+
+def _segment_yolo(seg):
+    from detection.inference_server import CameraContext
+    stem = os.path.splitext(os.path.basename(seg["path"]))[0]
+    cam = CameraContext(stem, None, restricted_areas=_opts["zones"], object_every=_opts["object_every"],
+                        motion_gate=_opts["motion_gate"])
+    fps = seg["fps"]
+    events, processed = [], 0
+    for batch in _batches(seg, _opts["batch"], _opts["stride"]):
+        for idx, frame, result in _infer_yolo(cam, batch, fps):
+            processed += 1
+            t = idx / fps
+            # Same gating as the live loop: once per cooldown per person and zone
+            if not result["hand_in_restricted_area"] or not cam.claim_alert(result, t):
+                continue
+            if idx < seg["start"]:
+                continue   # warm-up: the previous segment owns this event
+            classes = [obj["class"] for obj in result["objects"]]
+            path = ""
+            if _opts["snapshots"]:
+                path = f"{REPLAY_CAPTURE_DIR}/{stem}_{idx:08d}.jpg"
+                cv2.imwrite(path, frame)
+            events.append({"t": t, "objects": classes, "capture_path": path,
+                           "faces": [name for name, _ in result["face_results"]]})
+    return events, processed
+
+
+def _segment_items(seg):
+    from detection.item_watch import ItemWatcher, yolo_wrists
+    from detection.motion import MotionDetector
+    from detection.tracker import IoUTracker
+
+    stem = os.path.splitext(os.path.basename(seg["path"]))[0]
+    watcher = ItemWatcher(_opts["items_data"])
+    motion = MotionDetector() if _opts["motion_gate"] else None
+    tracker = IoUTracker()
+    fps = seg["fps"]
+    events, processed = [], 0
+    for batch in _batches(seg, _opts["batch"], _opts["stride"]):
+        # Frames the motion gate lets through share one batched pose call
+        active = []
+        for idx, frame in batch:
+            if motion is not None:
+                motion.update(frame)
+            active.append(motion is None or motion.active)
+        moving = [frame for (_, frame), on in zip(batch, active) if on]
+        persons = iter(_engine.detect_people_batch(moving) if moving else [])
+        for (idx, frame), on in zip(batch, active):
+            processed += 1
+            fh, fw = frame.shape[:2]
+            found = next(persons) if on else []
+            tracks = tracker.update([p["box"] for p in found], idx / fps)
+            people = [(t.id, yolo_wrists(p)) for t, p in zip(tracks, found)]
+            event = watcher.update_people((fw, fh), people, idx / fps)
+            if event is None or idx < seg["start"]:
+                continue
+            event["t"] = idx / fps
+            event["img_path"] = ""
+            if _opts["snapshots"]:
+                event["img_path"] = f"{REPLAY_SNAP_DIR}/replay_{stem}_{idx:08d}_{event['hand']}_{event['item_name']}.jpg"
+                cv2.imwrite(event["img_path"], frame)
+            events.append(event)
+    return events, processed
+
+
+def run_segment(seg):
+    """Worker entry point -> (segment, events, frames processed)."""
+    if _opts["mode"] == "yolo":
+        events, processed = _segment_yolo(seg)
+    else:
+        events, processed = _segment_items(seg)
+    return seg, events, processed
+
+
+# -----------------------------
+# Parent side: event store
+# -----------------------------
+def store_events(mode, events, start_time):
+    """Writes replayed events with their video-time timestamps to the normal event store."""
+    if mode == "yolo":
+        from utils.logger import log_event
+        for e in events:
+            log_event(face=None, objects=e["objects"], alerts=True, capture_path=e["capture_path"],
+                      timestamp=start_time + timedelta(seconds=e["t"]))
+    else:
+        from utils import event_store
+        rows = [dict(e, ts=(start_time + timedelta(seconds=e["t"])).timestamp()) for e in events]
+        conn = event_store.connect()
+        event_store.insert_events(conn, rows)
+        conn.close()
+
+
+def replay(paths, opts, procs):
+    """Replays every video in ``paths``; returns {path: [events]} in video-time order."""
+    jobs, videos = [], {}
+    for path in paths:
+        frames, fps = probe(path)
+        videos[path] = {"frames": frames, "fps": fps, "start_time": video_start_time(path, frames, fps)}
+        jobs.extend(plan_segments(path, frames, fps))
+    total_video = sum(v["frames"] / v["fps"] for v in videos.values())
+    print(f"[REPLAY] {len(paths)} video(s), {total_video / 60:.1f} min, {len(jobs)} segments on {procs} processes")
+
+    if opts["backend"] != "torch":
+        # Export once here; otherwise every worker would race to write the same cache files
+        from detection.backends import export_onnx
+        from detection.engine import OBJECT_MODEL_PATH, POSE_MODEL_PATH
+        for weights in (POSE_MODEL_PATH, OBJECT_MODEL_PATH) if opts["mode"] == "yolo" else (POSE_MODEL_PATH,):
+            export_onnx(weights, int8=opts["int8"])
+
+    results = {path: [] for path in paths}
+    done = processed = 0
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=procs, mp_context=get_context("spawn"),
+                             initializer=_init_worker, initargs=(opts,)) as pool:
+        futures = [pool.submit(run_segment, seg) for seg in jobs]
+        for fut in as_completed(futures):
+            seg, events, n = fut.result()
+            results[seg["path"]].extend(events)
+            done += 1
+            processed += n
+            elapsed = time.perf_counter() - t0
+            print(f"[REPLAY] {done}/{len(jobs)} segments, {processed / elapsed:.0f} frames/s, "
+                  f"{os.path.basename(seg['path'])} @{seg['start'] / seg['fps']:.0f}s: {len(events)} event(s)")
+
+    elapsed = time.perf_counter() - t0
+    speed = total_video / elapsed if elapsed > 0 else 0.0
+    print(f"[REPLAY] done in {elapsed:.1f}s ({speed:.1f}x real time), {processed} frames processed")
+    for path in paths:
+        results[path].sort(key=lambda e: e["t"])
+    return results, videos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded video through the theft detectors")
+    parser.add_argument("videos", nargs="+", help="video files or glob patterns")
+    parser.add_argument("--mode", choices=["yolo", "items"], default="yolo",
+                        help="yolo: main.py pipeline (pose + objects + faces + restricted area); items: tftcam.py item watch")
+    parser.add_argument("--procs", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--threads", type=int, default=1, help="model threads per worker process")
+    parser.add_argument("--batch", type=int, default=8, help="frames per model call")
+    parser.add_argument("--stride", type=int, default=1, help="process every Nth frame")
+    parser.add_argument("--object-every", type=int, default=5)
+    parser.add_argument("--conf", type=float, default=0.5)
+    parser.add_argument("--backend", choices=["torch", "onnx", "openvino"], default="torch")
+    parser.add_argument("--int8", action="store_true", help="INT8-quantized ONNX weights")
+    parser.add_argument("--infer-size", type=int, default=640, help="long side the models see (0 = full frame)")
+    parser.add_argument("--zones", default=None, help="JSON list of restricted-area polygons (yolo mode)")
+    parser.add_argument("--items", default="items.json", help="annotated items (items mode)")
+    parser.add_argument("--no-motion", action="store_true", help="run the models on every frame")
+    parser.add_argument("--no-snapshots", action="store_true")
+    parser.add_argument("--no-store", action="store_true", help="only print events (threshold experiments)")
+    args = parser.parse_args()
+
+    paths = sorted({p for pattern in args.videos for p in (glob.glob(pattern) or [pattern])})
+    zones = [RESTRICTED_AREA]
+    if args.zones:
+        with open(args.zones, "r") as f:
+            zones = json.load(f)
+    items_data = None
+    if args.mode == "items":
+        with open(args.items, "r") as f:
+            items_data = json.load(f)
+    opts = {"mode": args.mode, "batch": max(1, args.batch), "stride": max(1, args.stride),
+            "object_every": args.object_every, "conf": args.conf, "infer_size": args.infer_size or None,
+            "backend": args.backend, "int8": args.int8, "zones": zones, "items_data": items_data,
+            "motion_gate": not args.no_motion, "snapshots": not args.no_snapshots, "threads": max(1, args.threads)}
+    os.makedirs(REPLAY_CAPTURE_DIR if args.mode == "yolo" else REPLAY_SNAP_DIR, exist_ok=True)
+
+    results, videos = replay(paths, opts, max(1, args.procs))
+    for path, events in results.items():
+        start_time = videos[path]["start_time"]
+        for e in events:
+            print(f"[EVENT] {os.path.basename(path)} +{e['t']:.1f}s "
+                  f"({(start_time + timedelta(seconds=e['t'])):%Y-%m-%d %H:%M:%S}) "
+                  + (f"item={e['item_name']} score={e['score']:.2f}" if args.mode == "items"
+                     else f"objects={e['objects']} faces={e['faces']}"))
+        if not args.no_store and events:
+            store_events(args.mode, events, start_time)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,179 +1,185 @@
 # theft_skeleton_watch_items.py
+from utils import startup
 import cv2
-import mediapipe as mp
-import numpy as np
 import time
-import sqlite3
 import os
 import json
 from datetime import datetime
 
+from detection.engine import DetectionEngine
+from detection.item_watch import (COOLDOWN_SECONDS, CONSECUTIVE_FRAMES_REQ, DIST_THRESH_PX, EXIT_FRAMES_REQ,
+                                  EXIT_SCORE_THRESHOLD, SCORE_EMA_ALPHA, SCORE_THRESHOLD, ItemWatcher, yolo_wrists)
+from camera.recorder import ClipRecorder
+from detection.motion import MotionDetector
+from detection.tracker import IoUTracker
+from utils import event_store, metrics
+from utils.event_bus import publish
+from utils.frame_bus import FramePublisher
+from utils.storage import SnapshotStore
+from utils.timing import TIMING_ENABLED, StageTimer
+startup.mark("imports")
+
 # ---------- CONFIG ----------
 ITEM_JSON = "items.json"        # Annotated items from annotator
-DIST_THRESH_PX = 120
-VEL_SCALE = 200.0
-W_D, W_V, W_C = 0.6, 0.3, 0.1
-SCORE_THRESHOLD = 0.6
-CONSECUTIVE_FRAMES_REQ = 6
-COOLDOWN_SECONDS = 8
 SNAP_DIR = "theft_snaps"
-DB_PATH = "theft_events.db"
+DB_PATH = event_store.DB_PATH
 CAM_INDEX = 0
+MOTION_GATE = True              # skip pose estimation on static frames
+MOTION_THRESHOLD = 25           # per-pixel change counted as motion (lower = more sensitive)
+MOTION_HOLD_FRAMES = 15         # keep running pose this many frames after motion stops
+INFER_SIZE = 640                # long side the pose model sees (None = full frame); keypoints come back in frame pixels
+POSE_BACKEND = "torch"          # "torch", "onnx" or "openvino" (see detection/backends.py)
+POSE_CONF = 0.5
+TIMING = TIMING_ENABLED         # per-stage latency hook; False (or THEFT_TIMING=0) makes it a no-op
+TIMING_REPORT_SECONDS = 5       # print per-stage latency this often
+CLIP_PRE_SECONDS = 5            # raw video kept before an event
+CLIP_POST_SECONDS = 5
+SNAP_FORMAT = "jpg"             # or "webp"
+SNAP_QUALITY = 85
+SNAP_QUOTA_GB = 1               # oldest snapshots and clips are evicted beyond this
+METRICS_PORT = 9102             # /metrics on 127.0.0.1 (None = off); main.py uses 9101
+LIVE_VIDEO = True               # annotated frames for the dashboard (/api/video/tftcam/mjpeg)
+# Scoring weights and thresholds live in detection/item_watch.py
 # -----------------------------
 
-os.makedirs(SNAP_DIR, exist_ok=True)
-
-# ---------------------- DB SETUP ----------------------
-conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-c = conn.cursor()
-c.execute('''
-CREATE TABLE IF NOT EXISTS events (
-  id INTEGER PRIMARY KEY AUTOINCREMENT,
-  ts TEXT,
-  img_path TEXT,
-  score REAL,
-  dist_px REAL,
-  vel REAL,
-  hand TEXT,
-  item_name TEXT
-)
-''')
-conn.commit()
-
-# ---------------------- LOAD ANNOTATED ITEMS ----------------------
-if not os.path.exists(ITEM_JSON):
-    print(f"Missing {ITEM_JSON}. Run annotate_items.py first.")
-    exit(1)
-
-with open(ITEM_JSON, "r") as f:
-    items_data = json.load(f)
-
-ref_w = items_data.get("ref_size", {}).get("w", 1)
-ref_h = items_data.get("ref_size", {}).get("h", 1)
-items = items_data.get("items", [])
-
-def scale_poly(poly, scale_x, scale_y):
-    return [(int(x*scale_x), int(y*scale_y)) for (x,y) in poly]
-
-# ---------------------- MEDIAPIPE SETUP ----------------------
-mp_pose = mp.solutions.pose
-pose = mp_pose.Pose(min_detection_confidence=0.5, min_tracking_confidence=0.5)
-
-cap = cv2.VideoCapture(CAM_INDEX)
-prev_hand_pos = {'R': None, 'L': None}
-prev_time = None
-consec_counter = 0
-last_trigger_time = 0
+FRAMES = metrics.counter("theft_frames_total", "Frames through the detection loop", ("source",)).labels("tftcam")
+SKIPPED = metrics.counter("theft_frames_skipped_total", "Frames whose inference the motion gate skipped",
+                          ("source",)).labels("tftcam")
+ALERTS = metrics.counter("theft_alerts_total", "Alerts raised", ("source",)).labels("tftcam")
 
 # ---------------------- HELPERS ----------------------
-def point_to_roi_signed_dist(point, contour):
-    return cv2.pointPolygonTest(contour, (float(point[0]), float(point[1])), True)
-
-def save_event_snapshot(frame, score, dist_px, vel, hand_side, item_name):
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{SNAP_DIR}/event_{ts}_{hand_side}_{item_name}.jpg"
-    cv2.imwrite(filename, frame)
-    c.execute("INSERT INTO events (ts, img_path, score, dist_px, vel, hand, item_name) VALUES (?, ?, ?, ?, ?, ?, ?)",
-              (ts, filename, float(score), float(dist_px), float(vel), hand_side, item_name))
-    conn.commit()
-    print(f"[EVENT] saved {filename} score={score:.3f} item={item_name} dist={dist_px:.1f} vel={vel:.1f}")
+def save_event_snapshot(store, events_db, frame, score, dist_px, vel, hand_side, item_name, track=None):
+    now = datetime.now()
+    ts = now.strftime("%Y%m%d_%H%M%S")
+    # The loop keeps drawing on this frame, so the writer gets its own copy
+    filename = store.save(frame.copy(), "event", name=f"event_{ts}_{hand_side}_{item_name}", when=now) or ""
+    event = {"ts": now.timestamp(), "img_path": filename, "score": float(score), "dist_px": float(dist_px),
+             "vel": float(vel), "hand": hand_side, "item_name": item_name}
+    events_db.add(event)
+    publish("item_event", dict(event, track=track), source="tftcam")
+    print(f"[EVENT] saved {filename} score={score:.3f} item={item_name} track={track} "
+          f"dist={dist_px:.1f} vel={vel:.1f}")
+
 
 # ---------------------- MAIN LOOP ----------------------
-while True:
-    ret, frame = cap.read()
-    if not ret:
-        break
-    fh, fw = frame.shape[:2]
-    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-    results = pose.process(rgb)
-    now = time.time()
-    if prev_time is None:
-        prev_time = now
-
-    # Scale item polygons for current frame
-    scale_x = fw / ref_w
-    scale_y = fh / ref_h
-    contours = []
-    for it in items:
-        scaled = scale_poly(it["poly"], scale_x, scale_y)
-        cnt = np.array(scaled, dtype=np.int32).reshape((-1,1,2))
-        contours.append({"name": it["name"], "poly": scaled, "cnt": cnt})
-
-    # Draw item ROIs
-    for it in contours:
-        cv2.polylines(frame, [it["cnt"]], True, (0,0,255), 2)
-        cx = int(sum([p[0] for p in it["poly"]]) / len(it["poly"]))
-        cy = int(sum([p[1] for p in it["poly"]]) / len(it["poly"]))
-        cv2.putText(frame, it["name"], (cx+5, cy), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0,255,255), 2)
-
-    max_score_frame = 0.0
-    best_details = None
-    best_item_for_best_score = None
-
-    if results.pose_landmarks:
-        lm = results.pose_landmarks.landmark
-        for side, lm_idx in (('R', mp_pose.PoseLandmark.RIGHT_WRIST),
-                             ('L', mp_pose.PoseLandmark.LEFT_WRIST)):
-            wk = lm[lm_idx]
-            if wk.visibility < 0.3:
-                continue
-            x_px = int(wk.x * fw)
-            y_px = int(wk.y * fh)
-            hand_pt = (x_px, y_px)
-            cv2.circle(frame, hand_pt, 6, (0,255,0), -1)
-
-            # compute score for each item polygon
-            for it in contours:
-                dist_px = point_to_roi_signed_dist(hand_pt, it["cnt"])
-                prev = prev_hand_pos.get(side)
-                vel = 0.0
-                vel_signed = 0.0
-                if prev is not None:
-                    dx = hand_pt[0] - prev[0]
-                    dy = hand_pt[1] - prev[1]
-                    dt = now - prev_time if (now - prev_time) > 1e-6 else 1e-6
-                    vel = np.sqrt(dx*dx + dy*dy) / dt
-                    prev_dist = point_to_roi_signed_dist(prev, it["cnt"])
-                    vel_signed = (dist_px - prev_dist) / dt
-                approach_vel = -vel_signed
-
-                d_comp = max(0.0, (DIST_THRESH_PX - dist_px) / DIST_THRESH_PX)
-                v_comp = max(0.0, min(1.0, approach_vel / VEL_SCALE))
-                c_comp = wk.visibility
-
-                score = W_D * d_comp + W_V * v_comp + W_C * c_comp
-
-                # Only consider scores if hand is inside or very close to polygon
-                if dist_px >= 0 and score > max_score_frame:
-                    max_score_frame = score
-                    best_details = (side, score, dist_px, approach_vel)
-                    best_item_for_best_score = it["name"]
-
-            prev_hand_pos[side] = hand_pt
-
-    # consecutive frame check for trigger
-    if max_score_frame > SCORE_THRESHOLD:
-        consec_counter += 1
-    else:
-        consec_counter = 0
-
-    # Trigger only when hand is inside or approaching object
-    if consec_counter >= CONSECUTIVE_FRAMES_REQ and (time.time() - last_trigger_time) > COOLDOWN_SECONDS and best_details is not None:
-        side, sc, dist_px, approach_vel = best_details
-        item_name = best_item_for_best_score or "unknown"
-        save_event_snapshot(frame, sc, dist_px, approach_vel, side, item_name)
-        last_trigger_time = time.time()
-        consec_counter = 0
-
-    cv2.putText(frame, f"max_score:{max_score_frame:.2f} consec:{consec_counter}", (10,30),
-                cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0,255,255), 2)
-
-    cv2.imshow("Theft Skeleton Watch (items)", frame)
-    prev_time = now
-    key = cv2.waitKey(1) & 0xFF
-    if key == 27:  # ESC to exit
-        break
-
-cap.release()
-cv2.destroyAllWindows()
-conn.close()
+def main():
+    # ---------------------- LOAD ANNOTATED ITEMS ----------------------
+    if not os.path.exists(ITEM_JSON):
+        print(f"Missing {ITEM_JSON}. Run annotate_items.py first.")
+        return 1
+
+    with open(ITEM_JSON, "r") as f:
+        items_data = json.load(f)
+
+    watcher = ItemWatcher(items_data, dist_thresh=DIST_THRESH_PX, score_threshold=SCORE_THRESHOLD,
+                          exit_threshold=EXIT_SCORE_THRESHOLD, consecutive=CONSECUTIVE_FRAMES_REQ,
+                          exit_frames=EXIT_FRAMES_REQ, ema_alpha=SCORE_EMA_ALPHA, cooldown=COOLDOWN_SECONDS)
+
+    # Snapshots are encoded and written by a small worker pool, sharded by date
+    # The quota covers the event snapshots and the clips next to them
+    clip_dir = os.path.join(SNAP_DIR, "clips")
+    store = SnapshotStore(SNAP_DIR, fmt=SNAP_FORMAT, quality=SNAP_QUALITY, quota_bytes=int(SNAP_QUOTA_GB * 1024 ** 3),
+                          kinds=("event",), clip_dir=clip_dir)
+
+    # ---------------------- DB SETUP ----------------------
+    # Inserts are batched into transactions on a writer thread (WAL, indexed epoch ts)
+    with startup.phase("event store"):
+        events_db = event_store.EventStore(DB_PATH)
+
+    # ---------------------- POSE SETUP ----------------------
+    # YOLOv8-pose sees every person in the frame; the tracker keeps their IDs stable across frames
+    engine = DetectionEngine(object_every=0, conf=POSE_CONF, infer_size=INFER_SIZE, backend=POSE_BACKEND)
+    with startup.phase("pose model"):
+        engine.warmup(background=False)
+    tracker = IoUTracker()
+
+    with startup.phase("camera"):
+        cap = cv2.VideoCapture(CAM_INDEX)
+    motion_detector = MotionDetector(threshold=MOTION_THRESHOLD, hold_frames=MOTION_HOLD_FRAMES)
+    timer = StageTimer("tftcam", setting=INFER_SIZE or "full", enabled=TIMING)
+    last_timing_report = time.time()
+    recorder = ClipRecorder(CLIP_PRE_SECONDS, CLIP_POST_SECONDS, out_dir=clip_dir, on_saved=store.add)
+    metrics_server = metrics.serve(METRICS_PORT) if METRICS_PORT else None
+    frame_bus = FramePublisher("tftcam") if LIVE_VIDEO else None
+    metrics.gauge_callback("theft_snapshot_queue_depth", "Snapshots waiting for the writer pool", store.pending)
+    first_frame = True
+
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        recorder.push(frame)
+        FRAMES.inc()
+        fh, fw = frame.shape[:2]
+        persons = []
+        if MOTION_GATE:
+            with timer.stage("motion"):
+                motion_detector.update(frame)
+        if not MOTION_GATE or motion_detector.active:
+            with timer.stage("pose"):
+                persons = engine.detect_people(frame)
+        else:
+            SKIPPED.inc()
+        now = time.time()
+
+        # Draw item ROIs (scaled once per frame size, then cached)
+        watcher.draw(frame)
+
+        tracks = tracker.update([p["box"] for p in persons], now)
+        people = [(t.id, yolo_wrists(p)) for t, p in zip(tracks, persons)]
+        for track_id, hands in people:
+            for _, hand_pt, _ in hands:
+                cv2.circle(frame, hand_pt, 6, (0,255,0), -1)
+            if hands:
+                cv2.putText(frame, f"#{track_id}", (hands[0][1][0] + 8, hands[0][1][1] - 8),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0,255,0), 1)
+
+        # Trigger only when hand is inside or approaching object for enough consecutive frames
+        with timer.stage("score"):
+            event = watcher.update_people((fw, fh), people, now)
+        if event is not None:
+            ALERTS.inc()
+            with timer.stage("event"):
+                save_event_snapshot(store, events_db, frame, event["score"], event["dist_px"], event["vel"],
+                                    event["hand"], event["item_name"], track=event["track"])
+                recorder.trigger(f"event_{event['hand']}_{event['item_name']}")
+
+        cv2.putText(frame, f"max_score:{watcher.max_score:.2f} consec:{watcher.consec_counter}", (10,30),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0,255,255), 2)
+        if MOTION_GATE:
+            cv2.putText(frame, f"skipped:{motion_detector.skipped_ratio * 100:.0f}%", (10,60),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0,255,255), 2)
+
+        if first_frame:
+            startup.mark("first frame")
+            print(startup.report())
+            first_frame = False
+        if TIMING and now - last_timing_report >= TIMING_REPORT_SECONDS:
+            print(timer.report())
+            last_timing_report = now
+
+        if frame_bus is not None:
+            frame_bus.publish(frame)
+        cv2.imshow("Theft Skeleton Watch (items)", frame)
+        key = cv2.waitKey(1) & 0xFF
+        if key == 27:  # ESC to exit
+            break
+
+    cap.release()
+    recorder.close()
+    store.close()
+    if frame_bus is not None:
+        frame_bus.close()
+    cv2.destroyAllWindows()
+    events_db.close()
+    if metrics_server is not None:
+        metrics_server.shutdown()
+    if MOTION_GATE:
+        print(motion_detector.stats())
+    print(watcher.states.stats())
+    print(timer.report())
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -3,9 +3,15 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import HTMLResponse
 from pathlib import Path
+import sys
+
+# Shared detector modules (utils/) live in the repo root, next to trendsage_dashboard/
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
 
 # Import your router
-from Backend.routers import logs
+from Backend.routers import logs, live, metrics, stats
+from Backend.services.live import start_listener, stop_listener
+from Backend.services.rollups import start_refresher, stop_refresher
 
 app = FastAPI(title="TrendSage API")
 
@@ -18,6 +24,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request counts / latency for /metrics
+app.middleware("http")(metrics.record_request)
+
 # Define base directory (parent of Backend folder)
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -26,19 +35,35 @@ app.mount("/utils", StaticFiles(directory=BASE_DIR / "utils"), name="utils")
 app.mount("/data", StaticFiles(directory=BASE_DIR / "data"), name="data")
 app.mount("/components", StaticFiles(directory=BASE_DIR / "components"), name="components")
 
-# Mount captures folders
-CAPTURES_KNOWN_DIR = BASE_DIR.parent / "captures" / "known"
-CAPTURES_UNKNOWN_DIR = BASE_DIR.parent / "captures" / "unknown"
+# Mount the captures folder (known/, unknown/ and the date-sharded alert/ snapshots + thumbnails)
+CAPTURES_DIR = BASE_DIR.parent / "captures"
+CAPTURES_KNOWN_DIR = CAPTURES_DIR / "known"
+CAPTURES_UNKNOWN_DIR = CAPTURES_DIR / "unknown"
 
 # Ensure the directories exist
 CAPTURES_KNOWN_DIR.mkdir(parents=True, exist_ok=True)
 CAPTURES_UNKNOWN_DIR.mkdir(parents=True, exist_ok=True)
 
-app.mount("/captures/known", StaticFiles(directory=CAPTURES_KNOWN_DIR), name="captures_known")
-app.mount("/captures/unknown", StaticFiles(directory=CAPTURES_UNKNOWN_DIR), name="captures_unknown")
+app.mount("/captures", StaticFiles(directory=CAPTURES_DIR), name="captures")
 
 # Include your API router
 app.include_router(logs.router, prefix="/api", tags=["logs"])
+app.include_router(live.router, prefix="/api", tags=["live"])
+app.include_router(stats.router, prefix="/api", tags=["stats"])
+# Prometheus scrape endpoint (no /api prefix, where scrapers expect it)
+app.include_router(metrics.router, tags=["metrics"])
+
+# Receive detector events for the live stream
+@app.on_event("startup")
+async def start_event_listener():
+    await start_listener()
+    # Keep the /api/stats rollups current in the background
+    start_refresher()
+
+@app.on_event("shutdown")
+def stop_event_listener():
+    stop_listener()
+    stop_refresher()
 
 print("BASE_DIR:", BASE_DIR)
 print("utils folder exists?", (BASE_DIR / "utils").exists())
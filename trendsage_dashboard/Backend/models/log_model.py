@@ -2,8 +2,13 @@ from pydantic import BaseModel
 from typing import List, Optional
 
 class LogEntry(BaseModel):
+    id: Optional[int] = None
     timestamp: str
     face_name: Optional[str] = None
     objects_detected: List[str]
     alert: bool
     capture_path: Optional[str] = None
+
+class LogPage(BaseModel):
+    items: List[LogEntry]
+    next_cursor: Optional[str] = None
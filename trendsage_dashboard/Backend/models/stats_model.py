@@ -0,0 +1,31 @@
+from pydantic import BaseModel
+from typing import Dict, List, Optional
+
+class StatsPoint(BaseModel):
+    bucket: str
+    events: int
+    alerts: int
+    alert_rate: float
+    score_max: Optional[float] = None
+
+class StatsSeries(BaseModel):
+    dim: str
+    key: str
+    grain: str
+    points: List[StatsPoint]
+
+class StatsKey(BaseModel):
+    key: str
+    events: int
+    alerts: int
+    alert_rate: float
+
+class StatsTotals(BaseModel):
+    events: int
+    alerts: int
+    alert_rate: float
+
+class StatsSummary(BaseModel):
+    log: StatsTotals
+    item: StatsTotals
+    top: Dict[str, List[StatsKey]]
@@ -0,0 +1,121 @@
+import asyncio
+import json
+import re
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Path, WebSocket, WebSocketDisconnect
+from fastapi.responses import Response, StreamingResponse
+
+from Backend.services.live import hub
+from Backend.services.video import get_stream
+
+router = APIRouter()
+
+KEEPALIVE_SECONDS = 15
+MJPEG_BOUNDARY = "frame"
+# Detector frame buses (utils/frame_bus.py): main.py publishes "main", tftcam.py "tftcam"
+SOURCE_PATTERN = "^[A-Za-z0-9_-]{1,32}$"
+
+
+async def _next_messages(queue, since):
+    """Replays buffered events after ``since``, then yields live ones until the client lags."""
+    last = since if since is not None else 0
+    backlog = hub.replay(since)
+    if backlog is None:
+        # Offset is older than the replay buffer; tell the client to reload
+        yield {"type": "reset", "offset": hub.offset}
+    else:
+        for message in backlog:
+            last = message["offset"]
+            yield message
+    while True:
+        if queue.lagging and queue.empty():
+            return
+        try:
+            message = await asyncio.wait_for(queue.get(), timeout=KEEPALIVE_SECONDS)
+        except asyncio.TimeoutError:
+            yield None
+            continue
+        # Already sent during replay
+        if message["offset"] <= last:
+            continue
+        last = message["offset"]
+        yield message
+
+
+@router.get("/events/stream")
+async def stream_events(since: Optional[int] = None, last_event_id: Optional[str] = Header(None)):
+    """Server-Sent Events; reconnecting browsers resume from Last-Event-ID."""
+    if since is None and last_event_id and last_event_id.isdigit():
+        since = int(last_event_id)
+    queue = hub.subscribe()
+
+    async def body():
+        try:
+            async for message in _next_messages(queue, since):
+                if message is None:
+                    yield ": keepalive\n\n"
+                    continue
+                event_id = f"id: {message['offset']}\n" if "offset" in message else ""
+                yield f"{event_id}event: {message['type']}\ndata: {json.dumps(message)}\n\n"
+        finally:
+            hub.unsubscribe(queue)
+
+    return StreamingResponse(body(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@router.websocket("/events/ws")
+async def websocket_events(websocket: WebSocket, since: Optional[int] = None):
+    await websocket.accept()
+    queue = hub.subscribe()
+    try:
+        async for message in _next_messages(queue, since):
+            if message is None:
+                await websocket.send_json({"type": "keepalive", "offset": hub.offset})
+            else:
+                await websocket.send_json(message)
+        await websocket.close(code=1013)  # lagging: try again
+    except WebSocketDisconnect:
+        pass
+    finally:
+        hub.unsubscribe(queue)
+
+
+# -----------------------------
+# Live video: each frame is JPEG-encoded once and shared by every viewer
+# -----------------------------
+@router.get("/video/{source}.jpg")
+def video_snapshot(source: str = Path(..., pattern=SOURCE_PATTERN)):
+    jpeg = get_stream(source).snapshot()
+    if jpeg is None:
+        raise HTTPException(status_code=404, detail=f"No live frames from {source}")
+    return Response(jpeg, media_type="image/jpeg", headers={"Cache-Control": "no-store"})
+
+
+@router.get("/video/{source}/mjpeg")
+async def video_mjpeg(source: str = Path(..., pattern=SOURCE_PATTERN)):
+    """multipart/x-mixed-replace stream, usable directly as an <img> src."""
+    stream = get_stream(source)
+
+    async def body():
+        async for jpeg in stream.frames():
+            yield (f"--{MJPEG_BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                   f"Content-Length: {len(jpeg)}\r\n\r\n").encode() + jpeg + b"\r\n"
+
+    return StreamingResponse(body(), media_type=f"multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY}",
+                             headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"})
+
+
+@router.websocket("/video/{source}/ws")
+async def video_websocket(websocket: WebSocket, source: str):
+    """One binary message (a JPEG) per frame."""
+    if not re.match(SOURCE_PATTERN, source):
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+    try:
+        async for jpeg in get_stream(source).frames():
+            await websocket.send_bytes(jpeg)
+    except WebSocketDisconnect:
+        pass
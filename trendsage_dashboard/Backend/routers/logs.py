@@ -1,19 +1,62 @@
-from fastapi import APIRouter
-import json
-from pathlib import Path
+from fastapi import APIRouter, Query, Request, Response
+from typing import List, Optional
+
+from Backend.models.log_model import LogEntry, LogPage
+from Backend.services.log_index import get_index
 
 router = APIRouter()
 
-# Use raw strings for Windows paths
-KNOWN_LOGS = Path(r"E:\iot_theft_detection\logs\known.json")
-UNKNOWN_LOGS = Path(r"E:\iot_theft_detection\logs\unknown.json")
+MAX_PAGE = 500
+
+
+def _not_modified(request: Request, response: Response, etag: str):
+    response.headers["ETag"] = etag
+    # Let browsers keep the page but revalidate it on every poll
+    response.headers["Cache-Control"] = "no-cache"
+    return request.headers.get("if-none-match") == etag
+
+
+@router.get("/logs", response_model=LogPage)
+def get_logs(
+    request: Request,
+    response: Response,
+    kind: Optional[str] = Query(None, pattern="^(known|unknown)$"),
+    face: Optional[str] = None,
+    object: Optional[str] = Query(None, description="object class, e.g. person"),
+    alert: Optional[bool] = None,
+    since: Optional[str] = Query(None, description="YYYY-MM-DD[ HH:MM:SS]"),
+    until: Optional[str] = Query(None, description="YYYY-MM-DD[ HH:MM:SS]"),
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=MAX_PAGE),
+):
+    index = get_index()
+    index.sync()
+    # A bare date as upper bound means "through the end of that day"
+    if until and len(until) == 10:
+        until += " 23:59:59"
+    etag = index.etag(kind, face, object, alert, since, until, cursor, limit)
+    if _not_modified(request, response, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    entries, next_cursor = index.query(kind=kind, face=face, object_class=object, alert=alert,
+                                       since=since, until=until, cursor=cursor, limit=limit)
+    return LogPage(items=entries, next_cursor=next_cursor)
+
+
+# Legacy full-list endpoints (oldest first), served from the same index
+@router.get("/logs/known", response_model=List[LogEntry])
+def get_known_logs(request: Request, response: Response):
+    return _all_logs("known", request, response)
+
+@router.get("/logs/unknown", response_model=List[LogEntry])
+def get_unknown_logs(request: Request, response: Response):
+    return _all_logs("unknown", request, response)
 
-@router.get("/logs/known")
-def get_known_logs():
-    with open(KNOWN_LOGS, "r") as f:
-        return json.load(f)
 
-@router.get("/logs/unknown")
-def get_unknown_logs():
-    with open(UNKNOWN_LOGS, "r") as f:
-        return json.load(f)
+def _all_logs(kind, request, response):
+    index = get_index()
+    index.sync()
+    etag = index.etag("all", kind)
+    if _not_modified(request, response, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    entries, _ = index.query(kind=kind, limit=None, ascending=True)
+    return entries
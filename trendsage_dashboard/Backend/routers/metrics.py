@@ -0,0 +1,43 @@
+import time
+
+from fastapi import APIRouter, Request
+from fastapi.responses import Response
+
+from utils import metrics
+from Backend.services.live import hub
+from Backend.services.video import viewer_counts
+
+router = APIRouter()
+
+REQUESTS = metrics.counter("dashboard_requests_total", "HTTP requests served", ("route", "status"))
+REQUEST_SECONDS = metrics.histogram("dashboard_request_seconds", "HTTP request latency", ("route",))
+
+metrics.gauge_callback("dashboard_live_clients", "Connected SSE / WebSocket clients", lambda: len(hub.clients))
+metrics.counter_callback("dashboard_live_events_total", "Detector events relayed to the live stream",
+                         lambda: hub.offset)
+metrics.gauge_callback("dashboard_video_viewers", "Clients watching a live video stream", viewer_counts,
+                       ("source",))
+
+
+async def record_request(request: Request, call_next):
+    """HTTP middleware; labels by route so /captures/... and unknown paths do not explode the series count."""
+    t0 = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        if route is not None:
+            # Included routers only know their path without the prefix; use the template when it has parameters
+            path = route.path if request.scope.get("path_params") else request.url.path
+        else:
+            path = "/captures" if request.url.path.startswith("/captures/") else "other"
+        REQUESTS.labels(path, status).inc()
+        REQUEST_SECONDS.labels(path).observe(time.perf_counter() - t0)
+
+
+@router.get("/metrics")
+def get_metrics():
+    return Response(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
@@ -0,0 +1,43 @@
+from fastapi import APIRouter, Query
+from typing import List, Optional
+
+from Backend.models.stats_model import StatsKey, StatsSeries, StatsSummary
+from Backend.services.rollups import ALL, get_rollups
+
+router = APIRouter()
+
+DIM_PATTERN = "^(log|kind|face|object|item)$"
+DATE_HELP = "YYYY-MM-DD[ HH:MM] (local time)"
+
+# Served from the hourly/daily rollups (Backend/services/rollups.py), never from raw events
+
+
+@router.get("/stats/series", response_model=StatsSeries)
+def get_series(
+    dim: str = Query("log", pattern=DIM_PATTERN, description="log = all detection log events"),
+    key: str = Query(ALL, description="face name, object class, item name, known/unknown; * = all"),
+    grain: str = Query("hour", pattern="^(hour|day)$"),
+    since: Optional[str] = Query(None, description=DATE_HELP),
+    until: Optional[str] = Query(None, description=DATE_HELP),
+):
+    points = get_rollups().series(dim, key, grain, since, until)
+    return StatsSeries(dim=dim, key=key, grain=grain, points=points)
+
+
+@router.get("/stats/top", response_model=List[StatsKey])
+def get_top(
+    dim: str = Query("face", pattern="^(kind|face|object|item)$"),
+    since: Optional[str] = Query(None, description=DATE_HELP),
+    until: Optional[str] = Query(None, description=DATE_HELP),
+    limit: int = Query(10, ge=1, le=100),
+):
+    return get_rollups().top(dim, since, until, limit)
+
+
+@router.get("/stats", response_model=StatsSummary)
+def get_summary(
+    since: Optional[str] = Query(None, description=DATE_HELP),
+    until: Optional[str] = Query(None, description=DATE_HELP),
+    limit: int = Query(5, ge=1, le=50),
+):
+    return get_rollups().summary(since, until, limit)
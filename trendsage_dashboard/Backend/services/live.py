@@ -0,0 +1,89 @@
+import asyncio
+from collections import deque
+
+from utils.event_bus import BUS_HOST, BUS_PORT, decode
+
+REPLAY_SIZE = 1000       # events kept for replay-from-offset
+CLIENT_QUEUE = 256       # per-client backlog before it is dropped
+
+
+class EventHub:
+    """
+    Fans detector events out to connected dashboards.
+
+    Every event gets a monotonically increasing offset and is kept in a
+    bounded replay buffer. Each client has its own bounded queue; a client
+    that falls behind is disconnected instead of slowing everyone else down,
+    and resumes from its last offset on reconnect.
+    """
+
+    def __init__(self, replay_size=REPLAY_SIZE):
+        self.offset = 0
+        self.buffer = deque(maxlen=replay_size)
+        self.clients = set()
+
+    def publish(self, message):
+        self.offset += 1
+        message = dict(message, offset=self.offset)
+        self.buffer.append(message)
+        for queue in list(self.clients):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Slow consumer: cut it loose once it drains, it will replay from its offset
+                self.clients.discard(queue)
+                queue.lagging = True
+        return message
+
+    def replay(self, since):
+        """Buffered events after ``since``; None if that offset fell out of the buffer."""
+        if since is None:
+            return []
+        if since > self.offset:
+            # Client saw a previous run of the server
+            return None
+        if self.buffer and since < self.buffer[0]["offset"] - 1:
+            return None
+        return [m for m in self.buffer if m["offset"] > since]
+
+    def subscribe(self):
+        queue = asyncio.Queue(maxsize=CLIENT_QUEUE)
+        queue.lagging = False
+        self.clients.add(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        self.clients.discard(queue)
+
+
+class _BusProtocol(asyncio.DatagramProtocol):
+    def __init__(self, hub):
+        self.hub = hub
+
+    def datagram_received(self, data, addr):
+        message = decode(data)
+        if message is not None:
+            self.hub.publish(message)
+
+
+hub = EventHub()
+_transport = None
+
+async def start_listener(host=BUS_HOST, port=BUS_PORT):
+    """Binds the detector event port on the running loop (call from app startup)."""
+    global _transport
+    if _transport is not None:
+        return
+    loop = asyncio.get_running_loop()
+    try:
+        _transport, _ = await loop.create_datagram_endpoint(
+            lambda: _BusProtocol(hub), local_addr=(host, port))
+        print(f"[LIVE] Listening for detector events on udp://{host}:{port}")
+    except OSError as e:
+        print("[LIVE] Could not bind event port:", e)
+
+def stop_listener():
+    global _transport
+    if _transport is not None:
+        _transport.close()
+        _transport = None
@@ -0,0 +1,261 @@
+import glob
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+# Repo root (parent of trendsage_dashboard/)
+ROOT_DIR = Path(__file__).resolve().parent.parent.parent.parent
+LOG_DIR = Path(os.environ.get("THEFT_LOG_DIR", ROOT_DIR / "logs"))
+INDEX_DB = LOG_DIR / "events_index.db"
+
+# Log files written by utils/logger.py (JSON Lines, rotated as <name>-<stamp>.jsonl)
+LOG_FILES = {
+    "known": LOG_DIR / "known.jsonl",
+    "unknown": LOG_DIR / "unknown.jsonl",
+}
+# Before JSON Lines each log was one JSON array (<name>.json). utils/logger.py
+# only converts it the first time a detector writes, so until then it is read here.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS log_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    ts TEXT NOT NULL,
+    face_name TEXT,
+    alert INTEGER NOT NULL,
+    capture_path TEXT,
+    objects TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS log_objects (
+    event_id INTEGER NOT NULL,
+    cls TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS ingest_state (
+    segment_sig TEXT PRIMARY KEY,
+    offset INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_log_events_ts ON log_events(ts);
+CREATE INDEX IF NOT EXISTS idx_log_events_kind_ts ON log_events(kind, ts);
+CREATE INDEX IF NOT EXISTS idx_log_events_face_ts ON log_events(face_name, ts);
+CREATE INDEX IF NOT EXISTS idx_log_events_alert_ts ON log_events(alert, ts);
+CREATE INDEX IF NOT EXISTS idx_log_objects_cls ON log_objects(cls, event_id);
+"""
+
+
+def _segments(path):
+    base, ext = os.path.splitext(str(path))
+    segments = sorted(glob.glob(f"{base}-*{ext}"))
+    if os.path.exists(path):
+        segments.append(str(path))
+    return segments
+
+
+def _line_sig(kind, first):
+    if not first.endswith(b"\n"):
+        return None
+    return hashlib.sha1(kind.encode() + b"|" + first).hexdigest()
+
+
+def _segment_sig(kind, path):
+    """Identifies a segment by its first line, so a rotated (renamed) file keeps its offset."""
+    with open(path, "rb") as f:
+        return _line_sig(kind, f.readline())
+
+
+def _legacy_path(path):
+    return os.path.splitext(str(path))[0] + ".json"
+
+
+def _legacy_lines(path):
+    """
+    A legacy JSON array log as the JSON Lines bytes utils/logger.py migrates
+    it to. The migrated file starts with these same lines, so it gets the same
+    signature and resumes after them instead of indexing them twice.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            entries = json.load(f)
+    except (OSError, ValueError):
+        return b""
+    if not isinstance(entries, list):
+        return b""
+    return b"".join(json.dumps(entry).encode() + b"\n" for entry in entries)
+
+
+class LogIndex:
+    """
+    SQLite index over the append-only JSON Lines event logs.
+    Only bytes appended since the last sync are parsed, so keeping the
+    index current costs a stat() per segment when nothing changed.
+    """
+
+    def __init__(self, db_path=INDEX_DB, log_files=None):
+        self.db_path = str(db_path)
+        self.log_files = log_files or LOG_FILES
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._sizes = {}
+        self.version = self._max_id()
+
+    def _max_id(self):
+        row = self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM log_events").fetchone()
+        return row[0]
+
+    # -----------------------------
+    # Ingest
+    # -----------------------------
+    def sync(self):
+        """Indexes new lines from every log segment. Returns the index version (max id)."""
+        with self._lock:
+            for kind, path in self.log_files.items():
+                # The legacy array holds the oldest events, so it goes first
+                for segment in [_legacy_path(path)] + _segments(path):
+                    try:
+                        size = os.path.getsize(segment)
+                    except OSError:
+                        continue
+                    if self._sizes.get(segment) == size:
+                        continue
+                    if segment.endswith(".json"):
+                        self._ingest_legacy(kind, segment)
+                    else:
+                        self._ingest(kind, segment)
+                    self._sizes[segment] = size
+            self.version = self._max_id()
+            return self.version
+
+    def _offset(self, sig):
+        row = self._conn.execute("SELECT offset FROM ingest_state WHERE segment_sig = ?", (sig,)).fetchone()
+        return row[0] if row else 0
+
+    def _ingest(self, kind, segment):
+        sig = _segment_sig(kind, segment)
+        if sig is None:
+            return
+        offset = self._offset(sig)
+        with open(segment, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+        self._ingest_lines(kind, sig, offset, data)
+
+    def _ingest_legacy(self, kind, path):
+        data = _legacy_lines(path)
+        sig = _line_sig(kind, data[:data.find(b"\n") + 1])
+        if sig is None:
+            return
+        offset = self._offset(sig)
+        self._ingest_lines(kind, sig, offset, data[offset:])
+
+    def _ingest_lines(self, kind, sig, offset, data):
+        # Migrating a legacy log prepends it to an existing known.jsonl; the
+        # part after it is a segment indexed under its own signature, so skip what it already covered
+        while data:
+            other = _line_sig(kind, data[:data.find(b"\n") + 1])
+            known = self._offset(other) if other and other != sig else 0
+            if known <= 0:
+                break
+            data = data[known:]
+            offset += known
+        # Only complete lines; a torn tail is picked up on the next sync
+        end = data.rfind(b"\n") + 1
+        if end == 0:
+            return
+        cur = self._conn.cursor()
+        for line in data[:end].splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            objects = entry.get("objects_detected") or []
+            cur.execute(
+                "INSERT INTO log_events (kind, ts, face_name, alert, capture_path, objects) VALUES (?, ?, ?, ?, ?, ?)",
+                (kind, entry.get("timestamp", ""), entry.get("face_name"), int(bool(entry.get("alert"))),
+                 entry.get("capture_path") or None, json.dumps(objects)))
+            event_id = cur.lastrowid
+            cur.executemany("INSERT INTO log_objects (event_id, cls) VALUES (?, ?)",
+                            [(event_id, cls) for cls in set(objects)])
+        cur.execute("INSERT OR REPLACE INTO ingest_state (segment_sig, offset) VALUES (?, ?)",
+                    (sig, offset + end))
+        self._conn.commit()
+
+    # -----------------------------
+    # Query
+    # -----------------------------
+    def query(self, kind=None, face=None, object_class=None, alert=None,
+              since=None, until=None, cursor=None, limit=50, ascending=False):
+        """
+        Newest-first (by timestamp) page of events matching the filters.
+        ``cursor`` is the opaque "<timestamp>|<id>" of the last row of the
+        previous page. Returns (rows, next_cursor).
+        """
+        where, args = [], []
+        if kind:
+            where.append("e.kind = ?")
+            args.append(kind)
+        if face:
+            where.append("e.face_name = ?")
+            args.append(face)
+        if alert is not None:
+            where.append("e.alert = ?")
+            args.append(int(alert))
+        if since:
+            where.append("e.ts >= ?")
+            args.append(since)
+        if until:
+            where.append("e.ts <= ?")
+            args.append(until)
+        if object_class:
+            where.append("e.id IN (SELECT event_id FROM log_objects WHERE cls = ?)")
+            args.append(object_class)
+        if cursor:
+            cur_ts, _, cur_id = str(cursor).rpartition("|")
+            op = ">" if ascending else "<"
+            where.append(f"(e.ts {op} ? OR (e.ts = ? AND e.id {op} ?))")
+            args += [cur_ts, cur_ts, int(cur_id or 0)]
+        sql = "SELECT e.id, e.ts, e.face_name, e.objects, e.alert, e.capture_path FROM log_events e"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        order = "ASC" if ascending else "DESC"
+        sql += f" ORDER BY e.ts {order}, e.id {order}"
+        if limit:
+            sql += " LIMIT ?"
+            args.append(int(limit) + 1)
+        with self._lock:
+            rows = self._conn.execute(sql, args).fetchall()
+        next_cursor = None
+        if limit and len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = f"{rows[-1][1]}|{rows[-1][0]}"
+        entries = [{
+            "id": r[0],
+            "timestamp": r[1],
+            "face_name": r[2],
+            "objects_detected": json.loads(r[3]),
+            "alert": bool(r[4]),
+            "capture_path": r[5],
+        } for r in rows]
+        return entries, next_cursor
+
+    def etag(self, *parts):
+        """Weak validator: changes whenever the index grows or the query changes."""
+        key = "|".join(str(p) for p in parts) + f"|v{self.version}"
+        return 'W/"' + hashlib.sha1(key.encode()).hexdigest()[:16] + '"'
+
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_index():
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = LogIndex()
+    return _index
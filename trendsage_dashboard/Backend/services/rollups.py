@@ -0,0 +1,315 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+
+from Backend.services.log_index import INDEX_DB, ROOT_DIR, get_index
+from utils.event_store import to_epoch
+
+# Item-watch events written by tftcam.py / replay.py (utils/event_store.py)
+EVENTS_DB = ROOT_DIR / "theft_events.db"
+
+CACHE_SIZE = 256          # distinct stats queries kept in memory
+CACHE_TTL = 5.0           # seconds before a cached answer is recomputed (and new events rolled up)
+ITEM_BATCH = 5000         # item events read per round trip while catching up
+REFRESH_SECONDS = 10      # background roll-up interval, so a query rarely has new events to aggregate
+
+GRAINS = ("hour", "day")
+# Dims: log, kind (known/unknown), face, object (class) from the detection logs; item from theft_events.db.
+# The log and item totals per bucket are stored under this key
+ALL = "*"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollup_counts (
+    grain TEXT NOT NULL,
+    dim TEXT NOT NULL,
+    key TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    events INTEGER NOT NULL,
+    alerts INTEGER NOT NULL,
+    score_sum REAL NOT NULL DEFAULT 0,
+    score_max REAL,
+    PRIMARY KEY (grain, dim, key, bucket)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollup_state (
+    source TEXT PRIMARY KEY,
+    last_id INTEGER NOT NULL
+);
+"""
+
+# Bucket labels are local time, like the log timestamps: "YYYY-MM-DD HH:00" and "YYYY-MM-DD"
+_BUCKET_SQL = {"hour": "substr(e.ts, 1, 13) || ':00'", "day": "substr(e.ts, 1, 10)"}
+_BUCKET_FMT = {"hour": "%Y-%m-%d %H:00", "day": "%Y-%m-%d"}
+
+# (dim, key expression, FROM) over the new log_events rows
+_LOG_DIMS = (
+    ("log", f"'{ALL}'", "log_events e"),
+    ("kind", "e.kind", "log_events e"),
+    ("face", "COALESCE(e.face_name, 'Unknown')", "log_events e"),
+    ("object", "o.cls", "log_events e JOIN log_objects o ON o.event_id = e.id"),
+)
+
+_UPSERT = """
+ON CONFLICT (grain, dim, key, bucket) DO UPDATE SET
+    events = events + excluded.events,
+    alerts = alerts + excluded.alerts,
+    score_sum = score_sum + excluded.score_sum,
+    score_max = MAX(COALESCE(score_max, excluded.score_max), COALESCE(excluded.score_max, score_max))
+"""
+
+
+class TTLCache:
+    """Small LRU cache whose entries also expire after ``ttl`` seconds."""
+
+    def __init__(self, maxsize=CACHE_SIZE, ttl=CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class Rollups:
+    """
+    Hourly and daily counts per face, object class, log kind and item,
+    kept next to the log index and updated incrementally.
+
+    Each source remembers the last event id it rolled up, so a refresh only
+    aggregates events that arrived since the previous one; chart queries
+    then read at most one row per bucket instead of scanning raw events.
+    """
+
+    def __init__(self, db_path=INDEX_DB, events_db=EVENTS_DB, index=None):
+        self.db_path = str(db_path)
+        self.events_db = str(events_db)
+        self.index = index
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self.cache = TTLCache()
+
+    # -----------------------------
+    # Ingest
+    # -----------------------------
+    def _last_id(self, source):
+        row = self._conn.execute("SELECT last_id FROM rollup_state WHERE source = ?", (source,)).fetchone()
+        return row[0] if row else 0
+
+    def _set_last_id(self, source, last_id):
+        self._conn.execute("INSERT OR REPLACE INTO rollup_state (source, last_id) VALUES (?, ?)", (source, last_id))
+
+    def refresh(self):
+        """Rolls up log and item events added since the last refresh. Returns the number of new events."""
+        index = self.index or get_index()
+        index.sync()
+        with self._lock:
+            return self._roll_logs() + self._roll_items()
+
+    def _roll_logs(self):
+        last = self._last_id("logs")
+        top = self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM log_events").fetchone()[0]
+        if top <= last:
+            return 0
+        with self._conn:
+            for grain in GRAINS:
+                bucket = _BUCKET_SQL[grain]
+                for dim, key, source in _LOG_DIMS:
+                    self._conn.execute(f"""
+                        INSERT INTO rollup_counts (grain, dim, key, bucket, events, alerts)
+                        SELECT ?, ?, {key}, {bucket}, COUNT(*), SUM(e.alert)
+                        FROM {source} WHERE e.id > ? AND e.id <= ?
+                        GROUP BY 3, 4
+                        {_UPSERT}""", (grain, dim, last, top))
+            self._set_last_id("logs", top)
+        return top - last
+
+    def _roll_items(self):
+        if not os.path.exists(self.events_db):
+            return 0
+        last = self._last_id("items")
+        total = 0
+        # Read-only, so the dashboard never creates or locks the detector's database
+        src = sqlite3.connect(f"file:{self.events_db}?mode=ro", uri=True, timeout=10)
+        try:
+            while True:
+                rows = src.execute("SELECT id, ts, score, item_name FROM events WHERE id > ? ORDER BY id LIMIT ?",
+                                   (last, ITEM_BATCH)).fetchall()
+                if not rows:
+                    break
+                last = rows[-1][0]
+                self._add_items(rows, last)
+                total += len(rows)
+        except sqlite3.Error as e:
+            print(f"[STATS] Could not read {self.events_db}: {e}")
+        finally:
+            src.close()
+        return total
+
+    def _add_items(self, rows, last_id):
+        # (grain, key, bucket) -> [events, score_sum, score_max]
+        acc = defaultdict(lambda: [0, 0.0, None])
+        for _, ts, score, item_name in rows:
+            try:
+                # Epoch seconds, or the legacy text stamps of a database no detector has migrated yet
+                when = datetime.fromtimestamp(to_epoch(ts))
+            except (ValueError, OverflowError, OSError):
+                continue
+            score = float(score or 0.0)
+            for grain in GRAINS:
+                bucket = when.strftime(_BUCKET_FMT[grain])
+                for key in (ALL, item_name or "unknown"):
+                    a = acc[(grain, key, bucket)]
+                    a[0] += 1
+                    a[1] += score
+                    a[2] = score if a[2] is None else max(a[2], score)
+        with self._conn:
+            # Every item event is an alert
+            self._conn.executemany(f"""
+                INSERT INTO rollup_counts (grain, dim, key, bucket, events, alerts, score_sum, score_max)
+                VALUES (?, 'item', ?, ?, ?, ?, ?, ?)
+                {_UPSERT}""", [(g, k, b, n, n, s, m) for (g, k, b), (n, s, m) in acc.items()])
+            # Same transaction as the counts, so a crash cannot roll a batch up twice
+            self._set_last_id("items", last_id)
+
+    # -----------------------------
+    # Query
+    # -----------------------------
+    def _cached(self, key, compute):
+        value = self.cache.get(key)
+        if value is None:
+            self.refresh()
+            value = compute()
+            self.cache.put(key, value)
+        return value
+
+    def series(self, dim="log", key=ALL, grain="hour", since=None, until=None):
+        """[{bucket, events, alerts, alert_rate, score_max}] oldest first, one entry per non-empty bucket."""
+        return self._cached(("series", dim, key, grain, since, until),
+                            lambda: self._series(dim, key, grain, since, until))
+
+    def _series(self, dim, key, grain, since, until):
+        sql = ("SELECT bucket, events, alerts, score_max FROM rollup_counts "
+               "WHERE grain = ? AND dim = ? AND key = ?")
+        args = [grain, dim, key]
+        sql, args = _bucket_range(sql, args, grain, since, until)
+        with self._lock:
+            rows = self._conn.execute(sql + " ORDER BY bucket", args).fetchall()
+        return [{"bucket": b, "events": n, "alerts": a, "alert_rate": a / n if n else 0.0, "score_max": m}
+                for b, n, a, m in rows]
+
+    def top(self, dim, since=None, until=None, limit=10):
+        """[{key, events, alerts, alert_rate}] for the busiest keys of a dim, from the daily rollup."""
+        return self._cached(("top", dim, since, until, limit), lambda: self._top(dim, since, until, limit))
+
+    def _top(self, dim, since, until, limit):
+        sql = ("SELECT key, SUM(events) AS n, SUM(alerts) FROM rollup_counts "
+               "WHERE grain = 'day' AND dim = ? AND key != ?")
+        args = [dim, ALL]
+        sql, args = _bucket_range(sql, args, "day", since, until)
+        sql += " GROUP BY key ORDER BY n DESC, key LIMIT ?"
+        args.append(int(limit))
+        with self._lock:
+            rows = self._conn.execute(sql, args).fetchall()
+        return [{"key": k, "events": n, "alerts": a, "alert_rate": a / n if n else 0.0} for k, n, a in rows]
+
+    def summary(self, since=None, until=None, limit=5):
+        """Totals and alert rate for the log and item events, plus the top faces, objects and items."""
+        def compute():
+            out = {}
+            for dim in ("log", "item"):
+                points = self._series(dim, ALL, "day", since, until)
+                events = sum(p["events"] for p in points)
+                alerts = sum(p["alerts"] for p in points)
+                out[dim] = {"events": events, "alerts": alerts, "alert_rate": alerts / events if events else 0.0}
+            out["top"] = {dim: self._top(dim, since, until, limit) for dim in ("face", "object", "item")}
+            return out
+        return self._cached(("summary", since, until, limit), compute)
+
+    def rebuild(self):
+        """Drops the rollups and recomputes them from scratch (e.g. after the log index was rebuilt)."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM rollup_counts")
+            self._conn.execute("DELETE FROM rollup_state")
+        self.cache.clear()
+        return self.refresh()
+
+
+def _bucket_range(sql, args, grain, since, until):
+    """Adds since/until ("YYYY-MM-DD[ HH:MM]") as bucket bounds; a bare until date covers that whole day."""
+    if since:
+        sql += " AND bucket >= ?"
+        args.append(since[:10] if grain == "day" else since[:13] + (":00" if len(since) > 10 else ""))
+    if until:
+        if len(until) == 10 and grain == "hour":
+            until += " 23:59"
+        sql += " AND bucket <= ?"
+        args.append(until[:10] if grain == "day" else until)
+    return sql, args
+
+
+_rollups = None
+_rollups_lock = threading.Lock()
+
+def get_rollups():
+    global _rollups
+    if _rollups is None:
+        with _rollups_lock:
+            if _rollups is None:
+                _rollups = Rollups()
+    return _rollups
+
+
+_refresher = None
+_refresher_stop = threading.Event()
+
+def start_refresher(interval=REFRESH_SECONDS):
+    """Rolls up new events on a daemon thread (call from app startup)."""
+    global _refresher
+    if _refresher is not None:
+        return
+
+    def run():
+        while True:
+            try:
+                get_rollups().refresh()
+            except Exception as e:
+                print(f"[STATS] Rollup refresh failed: {e}")
+            if _refresher_stop.wait(interval):
+                break
+
+    _refresher_stop.clear()
+    _refresher = threading.Thread(target=run, name="stats-rollups", daemon=True)
+    _refresher.start()
+
+def stop_refresher():
+    global _refresher
+    if _refresher is not None:
+        _refresher_stop.set()
+        _refresher = None
@@ -0,0 +1,120 @@
+import asyncio
+import threading
+import time
+
+import cv2
+
+from utils.frame_bus import FrameReader
+
+STREAM_FPS = 15          # max frames per second encoded and sent to viewers
+JPEG_QUALITY = 75
+IDLE_SECONDS = 5.0       # encoder thread stops this long after the last viewer left
+
+
+class LiveVideo:
+    """
+    JPEG stream of one detector's frame bus (utils/frame_bus.py).
+
+    A single encoder thread turns each new frame into a JPEG once and keeps
+    the newest one; every viewer reads that same byte string, so adding a
+    viewer costs a send, not an encode. The thread only runs while someone
+    is watching, and a viewer that cannot keep up skips to the newest frame
+    instead of queueing.
+    """
+
+    def __init__(self, source="main", fps=STREAM_FPS, quality=JPEG_QUALITY):
+        self.source = source
+        self.fps = fps
+        self.quality = quality
+        self.reader = FrameReader(source)
+        self.current = (0, None, None)      # (seq, ts, jpeg bytes), replaced as a whole
+        self.viewers = 0
+        self.encoded = 0
+        self._last_viewer = 0.0
+        self._thread = None
+        self._lock = threading.Lock()
+        self._encode_lock = threading.Lock()
+
+    def _encode_latest(self):
+        with self._encode_lock:
+            latest = self.reader.latest()
+            if latest is None or latest[0] == self.current[0]:
+                return False
+            seq, ts, view = latest
+            ok, buf = cv2.imencode(".jpg", view, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+            del view, latest
+            # Encoded straight from shared memory; drop it if the slot was rewritten meanwhile
+            if not ok or not self.reader.valid(seq):
+                return False
+            self.current = (seq, ts, buf.tobytes())
+            self.encoded += 1
+            return True
+
+    def _run(self):
+        period = 1.0 / self.fps
+        while True:
+            t0 = time.monotonic()
+            with self._lock:
+                if self.viewers == 0 and t0 - self._last_viewer > IDLE_SECONDS:
+                    with self._encode_lock:
+                        self.reader.detach()
+                    self._thread = None
+                    break
+            try:
+                self._encode_latest()
+            except Exception as e:
+                print(f"[LIVE] Frame encode failed ({self.source}): {e}")
+            time.sleep(max(0.0, period - (time.monotonic() - t0)))
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f"live-video-{self.source}", daemon=True)
+            self._thread.start()
+
+    def open(self):
+        with self._lock:
+            self.viewers += 1
+            self._start()
+
+    def close(self):
+        with self._lock:
+            self.viewers -= 1
+            self._last_viewer = time.monotonic()
+
+    def snapshot(self):
+        """Newest JPEG (encoding one now if nobody is streaming), or None without a publisher."""
+        with self._lock:
+            self._last_viewer = time.monotonic()
+            running = self._thread is not None
+        if not running:
+            self._encode_latest()
+        return self.current[2]
+
+    async def frames(self):
+        """Yields each new JPEG for one viewer, at most fps per second."""
+        self.open()
+        try:
+            sent = 0
+            while True:
+                seq, _, jpeg = self.current
+                if seq != sent and jpeg is not None:
+                    sent = seq
+                    yield jpeg
+                await asyncio.sleep(1.0 / self.fps)
+        finally:
+            self.close()
+
+
+_streams = {}
+_streams_lock = threading.Lock()
+
+def get_stream(source="main"):
+    with _streams_lock:
+        stream = _streams.get(source)
+        if stream is None:
+            stream = _streams[source] = LiveVideo(source)
+        return stream
+
+def viewer_counts():
+    with _streams_lock:
+        return {source: s.viewers for source, s in _streams.items()}
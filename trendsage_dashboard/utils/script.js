@@ -1,5 +1,9 @@
 let knownLogsData = [];
 let unknownLogsData = [];
+// Cursor of the next (older) page per log, null when everything is shown
+const nextCursors = { known: null, unknown: null };
+// Bumped on every reload, so a "load more" answer for the previous filters is ignored
+let logsGeneration = 0;
 
 // Fetch logs from API
 async function fetchLogs(url) {
@@ -12,33 +16,91 @@ async function fetchLogs(url) {
   }
 }
 
-// Render logs in a table
-function renderTable(logs, tableId) {
-  const table = document.getElementById(tableId);
-  table.innerHTML = "";
+// Snapshots are stored next to a small "<name>.thumb.<ext>" made by utils/storage.py
+function captureUrl(path) {
+  return /^(https?:)?\//.test(path) ? path : `/${path}`;
+}
+
+function thumbUrl(path) {
+  return captureUrl(path).replace(/(\.[a-z0-9]+)$/i, ".thumb$1");
+}
+
+// Grid shows the thumbnail only; the full image loads when clicked.
+// Older captures have no thumbnail, so fall back to the full image once.
+function captureCell(path) {
+  if (!path) return "—";
+  const full = captureUrl(path);
+  return `<a href="${full}" target="_blank"><img src="${thumbUrl(path)}" loading="lazy" class="capture-img"
+    onerror="this.onerror=null;this.src='${full}'"></a>`;
+}
 
-  logs.forEach(log => {
-    const row = `
+function logRow(log) {
+  return `
       <tr>
         <td>${log.timestamp}</td>
         <td>${log.face_name || "N/A"}</td>
         <td>${log.objects_detected.join(", ")}</td>
         <td>${log.alert ? "⚠️ ALERT" : "✅ Safe"}</td>
-        <td>${log.capture_path ? `<img src="${log.capture_path}" class="capture-img">` : "—"}</td>
+        <td>${captureCell(log.capture_path)}</td>
       </tr>
     `;
-    table.innerHTML += row;
-  });
 }
 
-// Filter logs by date & time
-function filterLogs(logs, dateInput, timeInput) {
-  return logs.filter(log => {
-    const [logDate, logTime] = log.timestamp.split(" ");
-    const dateMatch = dateInput ? logDate === dateInput : true;
-    const timeMatch = timeInput ? logTime.startsWith(timeInput) : true;
-    return dateMatch && timeMatch;
-  });
+// Render logs in a table
+function renderTable(logs, tableId) {
+  document.getElementById(tableId).innerHTML = logs.map(logRow).join("");
+}
+
+// Add an older page below the rows already shown
+function appendRows(logs, tableId) {
+  document.getElementById(tableId).insertAdjacentHTML("beforeend", logs.map(logRow).join(""));
+}
+
+const API_BASE = "http://127.0.0.1:8000/api";
+const PAGE_SIZE = 100;
+
+// Build a paginated /api/logs query; filters run server-side on the index
+function logsUrl(kind, date, time, cursor) {
+  const params = new URLSearchParams({ kind, limit: PAGE_SIZE });
+  if (date) {
+    params.set("since", time ? `${date} ${time}` : date);
+    params.set("until", time ? `${date} ${time}:59` : date);
+  }
+  if (cursor) params.set("cursor", cursor);
+  return `${API_BASE}/logs?${params}`;
+}
+
+async function fetchLogPage(kind, date, time, cursor) {
+  const page = await fetchLogs(logsUrl(kind, date, time, cursor));
+  return { items: page.items || [], nextCursor: page.next_cursor || null };
+}
+
+function updateLoadMore(kind) {
+  document.getElementById(`${kind}LoadMore`).hidden = !nextCursors[kind];
+}
+
+// Fetch the next page of one log with the current filters and append it
+async function loadMoreLogs(kind) {
+  const cursor = nextCursors[kind];
+  if (!cursor) return;
+  const button = document.getElementById(`${kind}LoadMore`);
+  const generation = logsGeneration;
+  const date = document.getElementById("dateFilter").value;
+  const time = document.getElementById("timeFilter").value;
+
+  button.disabled = true;
+  const page = await fetchLogPage(kind, date, time, cursor);
+  button.disabled = false;
+  if (generation !== logsGeneration) return;
+
+  if (kind === "unknown") {
+    unknownLogsData = unknownLogsData.concat(page.items);
+  } else {
+    knownLogsData = knownLogsData.concat(page.items);
+  }
+  appendRows(page.items, `${kind}LogsTable`);
+  nextCursors[kind] = page.nextCursor;
+  updateLoadMore(kind);
 }
 
 // Add listener for common filters
@@ -46,32 +108,59 @@ function addCommonSearchListeners() {
   const dateEl = document.getElementById("dateFilter");
   const timeEl = document.getElementById("timeFilter");
 
-  function applyFilter() {
-    const date = dateEl.value;
-    const time = timeEl.value;
-
-    renderTable(filterLogs(knownLogsData, date, time), "knownLogsTable");
-    renderTable(filterLogs(unknownLogsData, date, time), "unknownLogsTable");
-  }
+  dateEl.addEventListener("change", loadAllLogs);
+  timeEl.addEventListener("change", loadAllLogs);
 
-  dateEl.addEventListener("change", applyFilter);
-  timeEl.addEventListener("change", applyFilter);
+  document.getElementById("knownLoadMore").addEventListener("click", () => loadMoreLogs("known"));
+  document.getElementById("unknownLoadMore").addEventListener("click", () => loadMoreLogs("unknown"));
 }
 
-// Load logs from API and initialize dashboard
+// Load the newest page of each log (already sorted latest first by the API);
+// older pages come from the "load more" buttons
 async function loadAllLogs() {
-  knownLogsData = await fetchLogs("http://127.0.0.1:8000/api/logs/known");
-  unknownLogsData = await fetchLogs("http://127.0.0.1:8000/api/logs/unknown");
+  const generation = ++logsGeneration;
+  const date = document.getElementById("dateFilter").value;
+  const time = document.getElementById("timeFilter").value;
 
-  // Sort latest first
-  knownLogsData.sort((a, b) => new Date(b.timestamp) - new Date(a.timestamp));
-  unknownLogsData.sort((a, b) => new Date(b.timestamp) - new Date(a.timestamp));
+  const [known, unknown] = await Promise.all([
+    fetchLogPage("known", date, time),
+    fetchLogPage("unknown", date, time),
+  ]);
+  if (generation !== logsGeneration) return;
+  knownLogsData = known.items;
+  unknownLogsData = unknown.items;
+  nextCursors.known = known.nextCursor;
+  nextCursors.unknown = unknown.nextCursor;
 
   renderTable(knownLogsData, "knownLogsTable");
   renderTable(unknownLogsData, "unknownLogsTable");
+  updateLoadMore("known");
+  updateLoadMore("unknown");
+}
+
+// Live updates pushed by the detectors (Server-Sent Events)
+function subscribeLiveEvents() {
+  const source = new EventSource(`${API_BASE}/events/stream`);
+
+  source.addEventListener("log", (e) => {
+    const entry = JSON.parse(e.data).data;
+    // Filtered views are reloaded by the user; only the live view is patched
+    if (document.getElementById("dateFilter").value || document.getElementById("timeFilter").value) return;
+    // Prepended without trimming, so pages loaded with "load more" stay in place
+    if (entry.kind === "unknown") {
+      unknownLogsData = [entry, ...unknownLogsData];
+      document.getElementById("unknownLogsTable").insertAdjacentHTML("afterbegin", logRow(entry));
+    } else {
+      knownLogsData = [entry, ...knownLogsData];
+      document.getElementById("knownLogsTable").insertAdjacentHTML("afterbegin", logRow(entry));
+    }
+  });
 
-  addCommonSearchListeners();
+  // Our offset fell out of the server's replay buffer: refetch the pages
+  source.addEventListener("reset", loadAllLogs);
 }
 
 // Initialize
+addCommonSearchListeners();
 loadAllLogs();
+subscribeLiveEvents();
@@ -0,0 +1,53 @@
+# artifacts.py — part of utils
+# utils/artifacts.py
+"""
+Cache of derived artifacts (exported ONNX models, face encodings, ...)
+keyed by a hash of the file they were derived from.
+
+    path = artifact_path("onnx", "models/yolov8n-pose.pt", ".onnx", "640", "int8")
+    # models/cache/onnx/yolov8n-pose-3f9a1c0d2b7e4a61-640-int8.onnx
+
+A key only changes when the source *content* changes: touching, copying or
+renaming a file does not invalidate what was built from it, and replacing
+the weights never silently reuses a stale export.
+"""
+import hashlib
+import os
+import threading
+
+CACHE_DIR = os.path.join("models", "cache")
+HASH_CHARS = 16
+_CHUNK = 1 << 20
+
+# (path, mtime_ns, size) -> digest, so a file is hashed at most once per process while unchanged
+_memo = {}
+_memo_lock = threading.Lock()
+
+
+def file_hash(path):
+    """SHA-256 hex digest of a file's content."""
+    st = os.stat(path)
+    key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+    with _memo_lock:
+        digest = _memo.get(key)
+    if digest is not None:
+        return digest
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK), b""):
+            h.update(chunk)
+    digest = h.hexdigest()
+    with _memo_lock:
+        _memo[key] = digest
+    return digest
+
+
+def artifact_path(kind, source, suffix, *tags, cache_dir=CACHE_DIR):
+    """
+    :param kind: sub-directory of the cache ("onnx", ...)
+    :param source: file the artifact is derived from (its hash goes into the name)
+    :param tags: build settings that also change the artifact (size, "int8", ...)
+    """
+    stem = os.path.splitext(os.path.basename(source))[0]
+    parts = [stem, file_hash(source)[:HASH_CHARS]] + [str(t) for t in tags if t not in (None, "")]
+    return os.path.join(cache_dir, kind, "-".join(parts) + suffix)
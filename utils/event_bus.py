@@ -0,0 +1,59 @@
+# event_bus.py — part of utils
+# utils/event_bus.py
+"""
+Local detector -> dashboard event channel.
+
+Detectors fire JSON datagrams at a UDP port on localhost. Sending never
+blocks and never fails the caller: if the dashboard is not running the
+datagram is simply dropped. The dashboard (trendsage_dashboard/Backend)
+listens on the same port and fans events out to browsers.
+"""
+import json
+import os
+import socket
+import threading
+import time
+
+BUS_HOST = os.environ.get("THEFT_BUS_HOST", "127.0.0.1")
+BUS_PORT = int(os.environ.get("THEFT_BUS_PORT", "8765"))
+MAX_DATAGRAM = 60000
+
+_sock = None
+_sock_lock = threading.Lock()
+
+def _socket():
+    global _sock
+    if _sock is None:
+        with _sock_lock:
+            if _sock is None:
+                s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                s.setblocking(False)
+                _sock = s
+    return _sock
+
+def publish(event_type, data, source=None):
+    """Sends one event to the dashboard; returns False if it could not be sent."""
+    message = {
+        "type": event_type,
+        "ts": time.time(),
+        "source": source or "detector",
+        "data": data,
+    }
+    try:
+        payload = json.dumps(message, default=str).encode("utf-8")
+        if len(payload) > MAX_DATAGRAM:
+            return False
+        _socket().sendto(payload, (BUS_HOST, BUS_PORT))
+        return True
+    except (OSError, TypeError, ValueError):
+        return False
+
+def decode(payload):
+    """Parses a datagram from publish(); returns None if it is not a bus message."""
+    try:
+        message = json.loads(payload.decode("utf-8"))
+    except (UnicodeDecodeError, ValueError):
+        return None
+    if not isinstance(message, dict) or "type" not in message:
+        return None
+    return message
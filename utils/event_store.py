@@ -0,0 +1,230 @@
+# event_store.py — part of utils
+# utils/event_store.py
+"""
+SQLite store for item-watch events (theft_events.db), shared by tftcam.py
+and replay.py.
+
+    frame loop --add()--> [queue] --> writer thread (one transaction per batch)
+
+The database runs in WAL mode, so readers such as the dashboard never block
+the writer. ``ts`` is stored as epoch seconds (REAL) and indexed, together
+with (item_name, ts), for time-range and per-item queries. Databases with the
+old ``%Y%m%d_%H%M%S`` TEXT timestamps are migrated on first open.
+"""
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from utils import metrics
+
+DB_PATH = "theft_events.db"
+SCHEMA_VERSION = 1
+LEGACY_TS_FORMAT = "%Y%m%d_%H%M%S"
+
+EVENTS_WRITTEN = metrics.counter("theft_events_written_total", "Item events committed to SQLite")
+EVENTS_DROPPED = metrics.counter("theft_events_dropped_total", "Item events dropped because the write queue was full")
+EVENT_WRITE_SECONDS = metrics.histogram("theft_event_write_seconds", "Time to commit one batch of item events")
+
+COLUMNS = ("ts", "img_path", "score", "dist_px", "vel", "hand", "item_name")
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS events (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  ts REAL NOT NULL,
+  img_path TEXT,
+  score REAL,
+  dist_px REAL,
+  vel REAL,
+  hand TEXT,
+  item_name TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_events_ts ON events (ts);
+CREATE INDEX IF NOT EXISTS idx_events_item_ts ON events (item_name, ts);
+'''
+
+
+def to_epoch(ts):
+    """Epoch seconds from a float, a datetime or a legacy '%Y%m%d_%H%M%S' string (local time)."""
+    if ts is None:
+        return time.time()
+    if isinstance(ts, (int, float)):
+        return float(ts)
+    if isinstance(ts, datetime):
+        return ts.timestamp()
+    return datetime.strptime(str(ts), LEGACY_TS_FORMAT).timestamp()
+
+
+# '20251024_190027' (local time) -> epoch seconds, in SQL so the migration is one transaction
+_LEGACY_TS_SQL = ("CAST(strftime('%s', substr(ts, 1, 4) || '-' || substr(ts, 5, 2) || '-' || substr(ts, 7, 2) || ' ' || "
+                  "substr(ts, 10, 2) || ':' || substr(ts, 12, 2) || ':' || substr(ts, 14, 2), 'utc') AS REAL)")
+
+
+def _migrate(conn):
+    """TEXT ts -> epoch REAL, done once in a single transaction."""
+    cols = {r[1]: (r[2] or "").upper() for r in conn.execute("PRAGMA table_info(events)")}
+    if cols.get("ts") != "TEXT":
+        return
+    legacy = "ts GLOB '[0-9][0-9][0-9][0-9][0-9][0-9][0-9][0-9]_[0-9][0-9][0-9][0-9][0-9][0-9]'"
+    total, good = conn.execute(f"SELECT COUNT(*), SUM({legacy}) FROM events").fetchone()
+    skipped = total - (good or 0)
+    print(f"[EVENTS] Migrating {total} events to epoch timestamps...")
+    # Rows whose ts cannot be parsed stay behind in events_legacy instead of being lost
+    cleanup = f"DELETE FROM events_legacy WHERE {legacy};" if skipped else "DROP TABLE events_legacy;"
+    conn.executescript(f"""
+    BEGIN;
+    ALTER TABLE events RENAME TO events_legacy;
+    {_SCHEMA}
+    INSERT INTO events (id, ts, img_path, score, dist_px, vel, hand, item_name)
+      SELECT id, {_LEGACY_TS_SQL}, img_path, score, dist_px, vel, hand, item_name
+      FROM events_legacy WHERE {legacy};
+    {cleanup}
+    PRAGMA user_version={SCHEMA_VERSION};
+    COMMIT;
+    """)
+    if skipped:
+        print(f"[EVENTS] {skipped} events with unreadable ts were kept in table events_legacy")
+
+
+def connect(db_path=DB_PATH):
+    conn = sqlite3.connect(db_path, check_same_thread=False, timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL")
+    # WAL keeps committed data safe with NORMAL; only the last transaction can be lost on power cut
+    conn.execute("PRAGMA synchronous=NORMAL")
+    if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+        exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='events'").fetchone()
+        if exists:
+            _migrate(conn)
+        conn.executescript(_SCHEMA)
+        conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+        conn.commit()
+    return conn
+
+
+def _row(e):
+    return (to_epoch(e.get("ts")), e.get("img_path"), float(e["score"]), float(e["dist_px"]), float(e["vel"]),
+            e.get("hand"), e.get("item_name"))
+
+
+def insert_events(conn, events):
+    """
+    Inserts events in one transaction.
+    :param events: iterable of dicts with ts (epoch/datetime/legacy string), img_path, score,
+                   dist_px, vel, hand, item_name
+    """
+    with conn:
+        conn.executemany(f"INSERT INTO events ({', '.join(COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                         [_row(e) for e in events])
+
+
+class EventStore:
+    """
+    Owns the connection in a writer thread; add() only enqueues.
+    :param batch_size: max events per transaction
+    :param flush_interval: max seconds an event waits before its batch is committed
+    """
+
+    def __init__(self, db_path=DB_PATH, batch_size=64, flush_interval=0.5, queue_size=10000):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        # Opened here so a schema migration happens before the first frame
+        self._conn = connect(db_path)
+        metrics.gauge_callback("theft_event_queue_depth", "Item events waiting for the writer thread", self.queue.qsize)
+        self._thread = threading.Thread(target=self._run, name="event-store", daemon=True)
+        self._thread.start()
+
+    def add(self, event):
+        """Queues one event dict (see insert_events) without blocking."""
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+            EVENTS_DROPPED.inc()
+            return False
+        return True
+
+    def _run(self):
+        stop = False
+        while not stop:
+            item = self.queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            try:
+                t0 = time.perf_counter()
+                insert_events(self._conn, batch)
+                EVENT_WRITE_SECONDS.observe(time.perf_counter() - t0)
+                EVENTS_WRITTEN.inc(len(batch))
+                self.written += len(batch)
+                self.batches += 1
+            except sqlite3.Error as e:
+                print(f"[ERROR] Event store write failed ({len(batch)} events lost): {e}")
+        self._conn.close()
+
+    def close(self, timeout=5.0):
+        self.queue.put(None)
+        self._thread.join(timeout=timeout)
+
+    def stats(self):
+        return f"[EVENTS] written={self.written} batches={self.batches} queued={self.queue.qsize()} dropped={self.dropped}"
+
+
+# -----------------------------
+# Queries (any connection; readers do not block the writer under WAL)
+# -----------------------------
+def recent_events(conn, limit=100, item_name=None, since=None, until=None):
+    sql = f"SELECT id, {', '.join(COLUMNS)} FROM events WHERE 1=1"
+    args = []
+    if item_name is not None:
+        sql += " AND item_name = ?"
+        args.append(item_name)
+    if since is not None:
+        sql += " AND ts >= ?"
+        args.append(to_epoch(since))
+    if until is not None:
+        sql += " AND ts < ?"
+        args.append(to_epoch(until))
+    sql += " ORDER BY ts DESC LIMIT ?"
+    args.append(int(limit))
+    keys = ("id",) + COLUMNS
+    return [dict(zip(keys, r)) for r in conn.execute(sql, args)]
+
+
+def events_per_item_per_hour(conn, since=None, until=None, item_name=None):
+    """
+    [(hour_start_epoch, item_name, count, max_score)], oldest hour first.
+    Hours are aligned to UTC epoch hours (local time for whole-hour timezones).
+    """
+    sql = ("SELECT CAST(ts / 3600 AS INTEGER) * 3600 AS hour, item_name, COUNT(*), MAX(score) "
+           "FROM events WHERE 1=1")
+    args = []
+    if item_name is not None:
+        sql += " AND item_name = ?"
+        args.append(item_name)
+    if since is not None:
+        sql += " AND ts >= ?"
+        args.append(to_epoch(since))
+    if until is not None:
+        sql += " AND ts < ?"
+        args.append(to_epoch(until))
+    sql += " GROUP BY hour, item_name ORDER BY hour, item_name"
+    return [(int(h), name, n, s) for h, name, n, s in conn.execute(sql, args)]
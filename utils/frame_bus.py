@@ -0,0 +1,229 @@
+# frame_bus.py — part of utils
+# utils/frame_bus.py
+"""
+Latest annotated frames, shared between processes without copying per reader.
+
+    detector --publish(frame)--> [shared ring: header | seq | ts | frames] <--latest()-- dashboard
+
+The detector copies each published frame into one slot of a small ring in
+shared memory (one memcpy, no encoding, no socket). Readers attach to the
+block by name and get NumPy views straight into it; a slot's sequence
+number is set to -1 while it is being rewritten, so a reader can tell a
+torn frame from a good one and simply retry. The detector never waits on
+readers and does not know how many there are.
+
+    bus = FramePublisher("main")            # detector
+    bus.publish(frame)
+    reader = FrameReader("main")            # any other process
+    seq, ts, view = reader.latest()         # view is only valid until reader.valid(seq)
+"""
+import os
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+FRAME_BUS_PREFIX = os.environ.get("THEFT_FRAME_BUS", "theft-frames")
+RING_SLOTS = 3              # the newest frame is never the one being written
+PUBLISH_FPS = 15            # frames per second copied into the ring; faster publishes are thinned out
+STALE_SECONDS = 2.0         # reader re-attaches when nothing new arrived for this long (publisher restarted?)
+HEADER_BYTES = 64
+MAGIC = 0x54465242          # "TFRB"
+# int64 header fields
+_MAGIC, _CAPACITY, _H, _W, _C, _HEAD, _CLOSED = range(7)
+
+
+def bus_name(source):
+    return f"{FRAME_BUS_PREFIX}-{source}"
+
+
+def _ring_bytes(capacity, shape):
+    return HEADER_BYTES + 16 * capacity + capacity * int(np.prod(shape))
+
+
+def _ring_views(buf, capacity, shape):
+    """numpy views over the shared block: header, per-slot seq, per-slot ts, frames."""
+    header = np.ndarray((HEADER_BYTES // 8,), np.int64, buf, 0)
+    seqs = np.ndarray((capacity,), np.int64, buf, HEADER_BYTES)
+    stamps = np.ndarray((capacity,), np.float64, buf, HEADER_BYTES + 8 * capacity)
+    frames = np.ndarray((capacity,) + tuple(shape), np.uint8, buf, HEADER_BYTES + 16 * capacity)
+    return header, seqs, stamps, frames
+
+
+class FramePublisher:
+    """
+    :param source: bus name suffix, e.g. "main" or "tftcam" (one publisher per name)
+    :param fps: max frames per second copied into the ring
+    The block is created on the first publish and re-created when the frame size changes.
+    """
+
+    def __init__(self, source="main", capacity=RING_SLOTS, fps=PUBLISH_FPS):
+        self.name = bus_name(source)
+        self.capacity = capacity
+        self.fps = fps
+        self.shape = None
+        self.published = 0
+        self.thinned = 0
+        self._shm = None
+        self._views = None
+        self._seq = 0
+        self._last_ts = None
+
+    def _open(self, shape):
+        self._close_ring()
+        self.shape = tuple(shape)
+        size = _ring_bytes(self.capacity, self.shape)
+        try:
+            self._shm = shared_memory.SharedMemory(name=self.name, create=True, size=size)
+        except FileExistsError:
+            # Left behind by a detector that crashed (or the previous frame size): replace it
+            stale = shared_memory.SharedMemory(name=self.name)
+            if stale.size >= HEADER_BYTES:
+                # Readers still mapped to it re-attach right away instead of after STALE_SECONDS
+                header = np.ndarray((HEADER_BYTES // 8,), np.int64, stale.buf, 0)
+                header[_CLOSED] = 1
+                del header
+            stale.close()
+            stale.unlink()
+            self._shm = shared_memory.SharedMemory(name=self.name, create=True, size=size)
+        self._views = _ring_views(self._shm.buf, self.capacity, self.shape)
+        header, seqs, _, _ = self._views
+        seqs[:] = -1
+        header[_CAPACITY] = self.capacity
+        header[_H], header[_W], header[_C] = self.shape
+        header[_HEAD] = 0
+        header[_CLOSED] = 0
+        # Written last: readers ignore the block until the header is complete
+        header[_MAGIC] = MAGIC
+        self._seq = 0
+
+    def publish(self, frame, ts=None):
+        """Copies one (annotated) BGR frame into the ring. ``ts`` is time.time() by default."""
+        ts = time.time() if ts is None else ts
+        if self._last_ts is not None and ts - self._last_ts < 1.0 / self.fps:
+            self.thinned += 1
+            return False
+        shape = frame.shape if frame.ndim == 3 else frame.shape + (1,)
+        if self._shm is None or shape != self.shape:
+            self._open(shape)
+        header, seqs, stamps, frames = self._views
+        self._seq += 1
+        slot = self._seq % self.capacity
+        seqs[slot] = -1
+        np.copyto(frames[slot], frame.reshape(shape))
+        stamps[slot] = ts
+        seqs[slot] = self._seq
+        header[_HEAD] = self._seq
+        self._last_ts = ts
+        self.published += 1
+        return True
+
+    def _close_ring(self):
+        if self._shm is not None:
+            self._views[0][_CLOSED] = 1
+            self._views = None
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def close(self):
+        self._close_ring()
+
+    def stats(self):
+        return f"[FRAMES] {self.name} published={self.published} thinned={self.thinned}"
+
+
+class FrameReader:
+    """
+    Attaches to a publisher's ring (lazily, and again after the publisher
+    restarted or changed frame size).
+    """
+
+    def __init__(self, source="main"):
+        self.name = bus_name(source)
+        self._shm = None
+        self._views = None
+        self._last_head = 0
+        self._last_change = 0.0
+        self.torn = 0
+
+    def _attach(self):
+        try:
+            shm = shared_memory.SharedMemory(name=self.name)
+        except (FileNotFoundError, ValueError):
+            return False
+        if os.name == "posix":
+            # The publisher owns the block; stop this process's tracker from unlinking it at exit
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, "shared_memory")
+        header = np.ndarray((HEADER_BYTES // 8,), np.int64, shm.buf, 0)
+        if shm.size < HEADER_BYTES or header[_MAGIC] != MAGIC:
+            del header
+            shm.close()
+            return False
+        capacity, shape = int(header[_CAPACITY]), (int(header[_H]), int(header[_W]), int(header[_C]))
+        del header
+        if shm.size < _ring_bytes(capacity, shape):
+            shm.close()
+            return False
+        self._shm = shm
+        self._views = _ring_views(shm.buf, capacity, shape)
+        self._last_change = time.monotonic()
+        return True
+
+    def detach(self):
+        if self._shm is not None:
+            self._views = None
+            try:
+                self._shm.close()
+            except BufferError:
+                # A caller still holds a frame view; the mapping goes away with it
+                pass
+            self._shm = None
+
+    def _stale(self):
+        header = self._views[0]
+        if header[_CLOSED]:
+            # Publisher stopped or re-created the ring
+            return True
+        head, now = int(header[_HEAD]), time.monotonic()
+        if head != self._last_head:
+            self._last_head, self._last_change = head, now
+            return False
+        # A crashed publisher never sets CLOSED; a restarted one lives in a new block under the same name
+        return now - self._last_change > STALE_SECONDS
+
+    def latest(self):
+        """
+        (seq, ts, frame view) of the newest complete frame, or None if there
+        is no publisher yet. The view points into shared memory: use it, then
+        confirm with valid(seq) that it was not overwritten meanwhile.
+        """
+        if self._views is None and not self._attach():
+            return None
+        if self._stale():
+            self.detach()
+            if not self._attach():
+                return None
+        header, seqs, stamps, frames = self._views
+        head = int(header[_HEAD])
+        if head <= 0:
+            return None
+        slot = head % len(seqs)
+        if int(seqs[slot]) != head:
+            self.torn += 1
+            return None
+        return head, float(stamps[slot]), frames[slot]
+
+    def valid(self, seq):
+        """True if frame ``seq`` is still intact in the ring."""
+        if self._views is None:
+            return False
+        seqs = self._views[1]
+        return int(seqs[seq % len(seqs)]) == seq
+
+    def head(self):
+        """Sequence number of the newest published frame (0 = none)."""
+        if self._views is None and not self._attach():
+            return 0
+        return int(self._views[0][_HEAD])
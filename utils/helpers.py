@@ -1 +1,22 @@
-# helpers.py  part of utils
+# helpers.py — part of utils
+# utils/helpers.py
+import cv2
+
+# COCO-17 skeleton (pairs of keypoint indices)
+POSE_SKELETON = [
+    (5, 7), (7, 9), (6, 8), (8, 10), (5, 6), (5, 11), (6, 12),
+    (11, 12), (11, 13), (13, 15), (12, 14), (14, 16),
+    (0, 1), (0, 2), (1, 3), (2, 4),
+]
+
+def draw_pose(frame, keypoints, min_conf=0.3, color=(0,255,0)):
+    """Draws a COCO-17 skeleton from a (17, 3) keypoint array."""
+    for a, b in POSE_SKELETON:
+        if keypoints[a][2] > min_conf and keypoints[b][2] > min_conf:
+            pa = (int(keypoints[a][0]), int(keypoints[a][1]))
+            pb = (int(keypoints[b][0]), int(keypoints[b][1]))
+            cv2.line(frame, pa, pb, color, 2)
+    for x, y, conf in keypoints:
+        if conf > min_conf:
+            cv2.circle(frame, (int(x), int(y)), 3, (0,0,255), -1)
+    return frame
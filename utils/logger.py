@@ -2,21 +2,40 @@
 
 import os
 import json
+import glob
+import queue
+import atexit
+import threading
+import time
 from datetime import datetime
 
+from utils import metrics
+from utils.event_bus import publish
+
 # Ensure logs directory exists
-LOG_DIR = "logs"
+LOG_DIR = os.environ.get("THEFT_LOG_DIR", "logs")
 os.makedirs(LOG_DIR, exist_ok=True)
 
-# File paths
-KNOWN_LOG_FILE = os.path.join(LOG_DIR, "known.json")
-UNKNOWN_LOG_FILE = os.path.join(LOG_DIR, "unknown.json")
+# File paths (JSON Lines: one event per line, append-only)
+KNOWN_LOG_FILE = os.path.join(LOG_DIR, "known.jsonl")
+UNKNOWN_LOG_FILE = os.path.join(LOG_DIR, "unknown.jsonl")
+
+# Old read-modify-write JSON arrays, migrated once on first use
+LEGACY_LOG_FILES = {
+    KNOWN_LOG_FILE: os.path.join(LOG_DIR, "known.json"),
+    UNKNOWN_LOG_FILE: os.path.join(LOG_DIR, "unknown.json"),
+}
+
+# Rotation: start a new segment past this size or when the day changes
+MAX_BYTES = 10 * 1024 * 1024
+ROTATE_DAILY = True
 
-# Initialize JSON files if not exists
-for file_path in [KNOWN_LOG_FILE, UNKNOWN_LOG_FILE]:
-    if not os.path.exists(file_path):
-        with open(file_path, "w") as f:
-            json.dump([], f)  # Start with empty list
+# Background writer batching
+FLUSH_INTERVAL = 0.5   # seconds
+BATCH_SIZE = 256
+
+LOG_EVENTS = metrics.counter("theft_log_events_total", "Detection log entries queued", ("kind",))
+LOG_WRITE_SECONDS = metrics.histogram("theft_log_write_seconds", "Time to append and fsync one log batch")
 
 def load_json_file(file_path):
     """Safely load JSON file, return empty list if file is empty or invalid."""
@@ -26,18 +45,150 @@ def load_json_file(file_path):
             if not content:
                 return []
             return json.loads(content)
-    except json.JSONDecodeError:
+    except (OSError, json.JSONDecodeError):
         return []
 
-def log_event(face, objects, alerts=False, capture_path=""):
+def migrate_legacy_logs():
+    """Converts known.json / unknown.json arrays into JSON Lines (one time)."""
+    for jsonl_path, legacy_path in LEGACY_LOG_FILES.items():
+        if not os.path.exists(legacy_path):
+            continue
+        entries = load_json_file(legacy_path)
+        if entries:
+            # Legacy entries go first so the log stays in time order
+            existing = ""
+            if os.path.exists(jsonl_path):
+                with open(jsonl_path, "r", encoding="utf-8") as f:
+                    existing = f.read()
+            tmp_path = jsonl_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for entry in entries:
+                    f.write(json.dumps(entry) + "\n")
+                f.write(existing)
+            os.replace(tmp_path, jsonl_path)
+        os.replace(legacy_path, legacy_path + ".migrated")
+        print(f"[LOG] Migrated {len(entries)} entries {legacy_path} -> {jsonl_path}")
+
+def log_segments(file_path):
+    """All segments of one log, oldest first (rotated ones, then the active file)."""
+    base, ext = os.path.splitext(file_path)
+    segments = sorted(glob.glob(f"{base}-*{ext}"))
+    if os.path.exists(file_path):
+        segments.append(file_path)
+    return segments
+
+def read_events(file_path):
+    """Yields every event of a log across its segments, skipping torn lines."""
+    for segment in log_segments(file_path):
+        with open(segment, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+
+class EventWriter:
+    """Appends queued log lines from a background thread in batches."""
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._days = {}
+
+    def submit(self, file_path, entry):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    migrate_legacy_logs()
+                    self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+                    self._thread.start()
+        self._queue.put((file_path, json.dumps(entry) + "\n"))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + FLUSH_INTERVAL
+            stop = False
+            while len(batch) < BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    nxt = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    stop = True
+                    break
+                batch.append(nxt)
+            self._write(batch)
+            if stop:
+                return
+
+    def _write(self, batch):
+        t0 = time.perf_counter()
+        lines = {}
+        for file_path, line in batch:
+            lines.setdefault(file_path, []).append(line)
+        for file_path, chunk in lines.items():
+            try:
+                self._maybe_rotate(file_path)
+                with open(file_path, "a", encoding="utf-8") as f:
+                    f.write("".join(chunk))
+                    f.flush()
+                    os.fsync(f.fileno())
+            except OSError as e:
+                print("[ERROR] Log write failed:", e)
+        LOG_WRITE_SECONDS.observe(time.perf_counter() - t0)
+
+    def _maybe_rotate(self, file_path):
+        today = datetime.now().strftime("%Y%m%d")
+        if not os.path.exists(file_path):
+            self._days[file_path] = today
+            return
+        if file_path not in self._days:
+            self._days[file_path] = datetime.fromtimestamp(os.path.getmtime(file_path)).strftime("%Y%m%d")
+        last_day = self._days[file_path]
+        too_big = os.path.getsize(file_path) >= MAX_BYTES
+        new_day = ROTATE_DAILY and last_day != today
+        if too_big or new_day:
+            base, ext = os.path.splitext(file_path)
+            stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            target, n = f"{base}-{stamp}{ext}", 1
+            while os.path.exists(target):
+                target, n = f"{base}-{stamp}_{n}{ext}", n + 1
+            os.replace(file_path, target)
+            self._days[file_path] = today
+
+    def close(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+_writer = EventWriter()
+atexit.register(_writer.close)
+metrics.gauge_callback("theft_log_queue_depth", "Log entries waiting for the writer thread", _writer._queue.qsize)
+
+def log_event(face, objects, alerts=False, capture_path="", timestamp=None):
     """
-    Logs detection events to known.json or unknown.json
+    Logs detection events to known.jsonl or unknown.jsonl
     :param face: Name of face recognized ("Unknown" if intruder)
     :param objects: List of detected objects
     :param alerts: True if alert triggered
     :param capture_path: Path to saved image if any
+    :param timestamp: datetime of the event (default now; replay passes video time)
     """
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    timestamp = (timestamp or datetime.now()).strftime("%Y-%m-%d %H:%M:%S")
     log_entry = {
         "timestamp": timestamp,
         "face_name": face,
@@ -49,14 +200,10 @@ def log_event(face, objects, alerts=False, capture_path=""):
     # Choose file based on known/unknown
     file_path = UNKNOWN_LOG_FILE if face == "Unknown" else KNOWN_LOG_FILE
 
-    # Load existing data safely
-    data = load_json_file(file_path)
-
-    # Append new log entry
-    data.append(log_entry)
-
-    # Write back to JSON
-    with open(file_path, "w") as f:
-        json.dump(data, f, indent=4)
+    # Queued; the writer thread appends it with the next batch
+    _writer.submit(file_path, log_entry)
+    LOG_EVENTS.labels("unknown" if face == "Unknown" else "known").inc()
+    # Live push to the dashboard (fire-and-forget)
+    publish("log", dict(log_entry, kind="unknown" if face == "Unknown" else "known"))
 
     print(f"[LOG] Event logged -> {file_path}: {face}, alert={alerts}")
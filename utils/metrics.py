@@ -0,0 +1,296 @@
+# metrics.py — part of utils
+# utils/metrics.py
+"""
+In-process metrics in the Prometheus text format.
+
+    FRAMES = metrics.counter("theft_frames_total", "Frames processed", ("source",))
+    FRAMES.labels(source="main").inc()
+    LATENCY = metrics.histogram("theft_stage_seconds", "Stage latency", ("timer", "stage"))
+    metrics.gauge_callback("theft_alert_queue_depth", "Queued alerts", dispatcher.pending)
+    metrics.serve(9101)                 # http://127.0.0.1:9101/metrics
+
+Updates are lock-free: every thread adds into its own cells and a scrape
+sums them, so the frame loop never waits on another thread. Locks are only
+taken when a label set or a thread is seen for the first time, and on scrape.
+Histograms use fixed buckets (seconds by default).
+"""
+import bisect
+import math
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRICS_PORT = 9101
+
+
+class _Cells:
+    """Per-thread float arrays; only the owning thread writes its array."""
+
+    def __init__(self, size):
+        self.size = size
+        self._local = threading.local()
+        self._all = []
+        self._lock = threading.Lock()
+
+    def mine(self):
+        cells = getattr(self._local, "cells", None)
+        if cells is None:
+            cells = [0.0] * self.size
+            with self._lock:
+                self._all.append(cells)
+            self._local.cells = cells
+        return cells
+
+    def totals(self):
+        with self._lock:
+            arrays = list(self._all)
+        return [sum(a[i] for a in arrays) for i in range(self.size)]
+
+
+class _CounterChild:
+    __slots__ = ("_cells",)
+
+    def __init__(self):
+        self._cells = _Cells(1)
+
+    def inc(self, amount=1.0):
+        self._cells.mine()[0] += amount
+
+    def value(self):
+        return self._cells.totals()[0]
+
+
+class _GaugeChild:
+    __slots__ = ("_value", "_lock")
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def set(self, value):
+        # A single attribute store: last writer wins, no lock needed
+        self._value = float(value)
+
+    def inc(self, amount=1.0):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount=1.0):
+        self.inc(-amount)
+
+    def value(self):
+        return self._value
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "_cells")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # one cell per bucket + the +Inf bucket, then sum and count
+        self._cells = _Cells(len(buckets) + 3)
+
+    def observe(self, value):
+        cells = self._cells.mine()
+        cells[bisect.bisect_left(self.buckets, value)] += 1
+        cells[-2] += value
+        cells[-1] += 1
+
+    def value(self):
+        totals = self._cells.totals()
+        n = len(self.buckets) + 1
+        cumulative, running = [], 0.0
+        for c in totals[:n]:
+            running += c
+            cumulative.append(running)
+        return cumulative, totals[-2], totals[-1]
+
+
+class Metric:
+    """A metric family; children are created per label set with labels(...)."""
+
+    def __init__(self, kind, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.kind = kind
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self):
+        if self.kind == "counter":
+            return _CounterChild()
+        if self.kind == "gauge":
+            return _GaugeChild()
+        return _HistogramChild(self.buckets)
+
+    def labels(self, *values, **kv):
+        key = tuple(str(v) for v in values) if values else tuple(str(kv[n]) for n in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    # Unlabelled shortcuts
+    def inc(self, amount=1.0):
+        self.labels().inc(amount)
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def samples(self):
+        with self._lock:
+            children = list(self._children.items())
+        for key, child in children:
+            labels = dict(zip(self.labelnames, key))
+            if self.kind == "histogram":
+                cumulative, total, count = child.value()
+                for le, c in zip(self.buckets + (math.inf,), cumulative):
+                    yield f"{self.name}_bucket", dict(labels, le=_fmt(le)), c
+                yield f"{self.name}_sum", labels, total
+                yield f"{self.name}_count", labels, count
+            else:
+                yield self.name, labels, child.value()
+
+
+class CallbackMetric:
+    """Value read at scrape time, e.g. a queue length. fn() -> number or {label tuple: number}."""
+
+    def __init__(self, kind, name, help_text, fn, labelnames=()):
+        self.kind = kind
+        self.name = name
+        self.help = help_text
+        self.fn = fn
+        self.labelnames = tuple(labelnames)
+
+    def samples(self):
+        try:
+            value = self.fn()
+        except Exception:
+            return
+        if isinstance(value, dict):
+            for key, v in value.items():
+                key = key if isinstance(key, tuple) else (key,)
+                yield self.name, dict(zip(self.labelnames, (str(k) for k in key))), v
+        elif value is not None:
+            yield self.name, {}, value
+
+
+def _fmt(v):
+    if math.isinf(v):
+        return "+Inf" if v > 0 else "-Inf"
+    if float(v).is_integer() and abs(v) < 1e15:
+        return str(int(v))
+    return repr(float(v))
+
+
+def _escape(v):
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, name, factory, kind):
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(name)
+                if metric is None:
+                    metric = self._metrics[name] = factory()
+        if metric.kind != kind:
+            raise ValueError(f"{name} is already registered as a {metric.kind}")
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._get(name, lambda: Metric("counter", name, help_text, labelnames), "counter")
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._get(name, lambda: Metric("gauge", name, help_text, labelnames), "gauge")
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get(name, lambda: Metric("histogram", name, help_text, labelnames, buckets), "histogram")
+
+    def callback(self, kind, name, help_text, fn, labelnames=()):
+        """Registers (or replaces) a metric whose value comes from fn() at scrape time."""
+        with self._lock:
+            self._metrics[name] = CallbackMetric(kind, name, help_text, fn, labelnames)
+        return self._metrics[name]
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines = []
+        for m in metrics:
+            lines.append(f"# HELP {m.name} {m.help}")
+            lines.append(f"# TYPE {m.name} {m.kind}")
+            for name, labels, value in m.samples():
+                label_str = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+                lines.append(f"{name}{{{label_str}}} {_fmt(float(value))}" if label_str
+                             else f"{name} {_fmt(float(value))}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name, help_text, labelnames=()):
+    return REGISTRY.counter(name, help_text, labelnames)
+
+
+def gauge(name, help_text, labelnames=()):
+    return REGISTRY.gauge(name, help_text, labelnames)
+
+
+def histogram(name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return REGISTRY.histogram(name, help_text, labelnames, buckets)
+
+
+def gauge_callback(name, help_text, fn, labelnames=()):
+    return REGISTRY.callback("gauge", name, help_text, fn, labelnames)
+
+
+def counter_callback(name, help_text, fn, labelnames=()):
+    return REGISTRY.callback("counter", name, help_text, fn, labelnames)
+
+
+# -----------------------------
+# Local scrape endpoint for headless detectors
+# -----------------------------
+class _Handler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(port=METRICS_PORT, host="127.0.0.1", registry=REGISTRY):
+    """Serves /metrics on a daemon thread; returns the server (call shutdown() to stop)."""
+    handler = type("MetricsHandler", (_Handler,), {"registry": registry})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    print(f"[METRICS] Serving http://{host}:{server.server_address[1]}/metrics")
+    return server
@@ -0,0 +1,166 @@
+# pipeline.py — part of utils
+# utils/pipeline.py
+"""
+Staged capture -> inference -> render pipeline.
+
+    capture thread --(latest frame)--> inference workers --(queue)--> render/alert (caller thread)
+
+Queues are bounded and drop the oldest item when full, so a slow stage
+never builds up latency; it just sees fewer frames.
+"""
+import queue
+import threading
+import time
+from collections import deque
+
+
+class DropQueue:
+    """Bounded queue that evicts the oldest item instead of blocking the producer."""
+
+    def __init__(self, maxsize=2):
+        self._q = queue.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def put(self, item):
+        while True:
+            try:
+                self._q.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self._q.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout=None):
+        return self._q.get(timeout=timeout)
+
+    def qsize(self):
+        return self._q.qsize()
+
+
+class StageStats:
+    """Rolling frames-per-second counter for one pipeline stage."""
+
+    def __init__(self, name, window=2.0):
+        self.name = name
+        self.window = window
+        self.count = 0
+        self._stamps = deque()
+
+    def tick(self):
+        now = time.monotonic()
+        self.count += 1
+        self._stamps.append(now)
+        while self._stamps and now - self._stamps[0] > self.window:
+            self._stamps.popleft()
+
+    def fps(self):
+        now = time.monotonic()
+        while self._stamps and now - self._stamps[0] > self.window:
+            self._stamps.popleft()
+        if len(self._stamps) < 2:
+            return 0.0
+        span = self._stamps[-1] - self._stamps[0]
+        return (len(self._stamps) - 1) / span if span > 0 else 0.0
+
+
+class Pipeline:
+    """
+    :param reader: object with start(), stop(), running and read(last_id, timeout)
+                   (see camera.capture.LatestFrameReader)
+    :param infer: fn(frame) -> result, run on the worker threads.
+                  Must be thread-safe when workers > 1.
+    :param render: fn(frame, result, ts) -> bool, run on the calling thread
+                   (so cv2.imshow works); return False to stop.
+    """
+
+    def __init__(self, reader, infer, render, workers=1, queue_size=2, report_every=3.0):
+        self.reader = reader
+        self.infer = infer
+        self.render = render
+        self.workers = workers
+        self.report_every = report_every
+        self.in_q = DropQueue(queue_size)
+        self.out_q = DropQueue(queue_size)
+        self.stats = {
+            "capture": StageStats("capture"),
+            "infer": StageStats("infer"),
+            "render": StageStats("render"),
+        }
+        self._running = False
+        self._threads = []
+        self._last_rendered = 0
+
+    # -----------------------------
+    # Stages
+    # -----------------------------
+    def _feed(self):
+        last_id = 0
+        while self._running and self.reader.running:
+            item = self.reader.read(last_id, timeout=0.5)
+            if item is None:
+                continue
+            last_id = item[0]
+            self.stats["capture"].tick()
+            self.in_q.put(item)
+        self._running = False
+
+    def _work(self):
+        while self._running:
+            try:
+                frame_id, ts, frame = self.in_q.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                result = self.infer(frame)
+            except Exception as e:
+                print("[ERROR] Inference failed:", e)
+                continue
+            self.stats["infer"].tick()
+            self.out_q.put((frame_id, ts, frame, result))
+
+    def report(self):
+        s = self.stats
+        print(f"[PIPE] capture {s['capture'].fps():.1f} fps | "
+              f"infer {s['infer'].fps():.1f} fps (q={self.in_q.qsize()}, dropped={self.in_q.dropped}) | "
+              f"render {s['render'].fps():.1f} fps (q={self.out_q.qsize()}, dropped={self.out_q.dropped})")
+
+    # -----------------------------
+    # Lifecycle
+    # -----------------------------
+    def run(self):
+        self._running = True
+        self.reader.start()
+        self._threads = [threading.Thread(target=self._feed, name="feed", daemon=True)]
+        self._threads += [threading.Thread(target=self._work, name=f"infer-{i}", daemon=True)
+                          for i in range(self.workers)]
+        for t in self._threads:
+            t.start()
+
+        last_report = time.monotonic()
+        try:
+            while self._running:
+                try:
+                    frame_id, ts, frame, result = self.out_q.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                # Workers may finish out of order; never show an older frame
+                if frame_id <= self._last_rendered:
+                    continue
+                self._last_rendered = frame_id
+                if self.render(frame, result, ts) is False:
+                    break
+                self.stats["render"].tick()
+                if time.monotonic() - last_report >= self.report_every:
+                    self.report()
+                    last_report = time.monotonic()
+        finally:
+            self.stop()
+
+    def stop(self):
+        self._running = False
+        self.reader.stop()
+        for t in self._threads:
+            t.join(timeout=2)
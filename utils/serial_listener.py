@@ -0,0 +1,148 @@
+# serial_listener.py — part of utils
+# utils/serial_listener.py
+"""
+Background reader for the Arduino/NodeMCU sound sensor.
+
+Every line is stamped with time.monotonic() when it arrives and kept in a
+ring buffer, so the frame loop can ask "was there a SOUND within +-N ms of
+this frame's capture time?" instead of polling the port once per frame.
+
+``port`` may be anything pyserial's serial_for_url() accepts (COM5,
+/dev/ttyUSB0, a pseudo-terminal such as /dev/pts/3, loop://, socket://...)
+or ``file:<path>`` to follow a text file as a stand-in for tests.
+"""
+import bisect
+import os
+import threading
+import time
+from collections import deque
+
+import serial
+
+SOUND_EVENT = "SOUND"
+
+
+class _FileStandIn:
+    """Follows a text file like `tail -f`, mimicking the bits of Serial we use."""
+
+    def __init__(self, path, timeout=0.5):
+        self._f = open(path, "rb")
+        self._f.seek(0, os.SEEK_END)
+        self.timeout = timeout
+        self._partial = b""        # start of a line whose end has not been written yet
+
+    def readline(self):
+        """One complete line, or b"" on timeout; a half-written line waits for the next call."""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            chunk = self._f.readline()
+            self._partial += chunk
+            if self._partial.endswith(b"\n"):
+                line, self._partial = self._partial, b""
+                return line
+            if time.monotonic() >= deadline:
+                return b""
+            if not chunk:
+                time.sleep(0.01)
+
+    def close(self):
+        self._f.close()
+
+
+class SerialListener:
+    def __init__(self, port, baudrate=9600, buffer_size=512, reconnect_delay=2.0, read_timeout=0.5,
+                 verbose=True):
+        self.port = port
+        self.baudrate = baudrate
+        self.reconnect_delay = reconnect_delay
+        self.read_timeout = read_timeout
+        self.verbose = verbose
+        self._events = deque(maxlen=buffer_size)   # (monotonic ts, line), in arrival order
+        self._lock = threading.Lock()
+        self._conn = None
+        self._running = False
+        self._thread = None
+        self.connected = False
+        self.reconnects = 0
+
+    # -----------------------------
+    # Lifecycle
+    # -----------------------------
+    def start(self):
+        if self._thread is None:
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="serial", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+        self._close()
+
+    def _open(self):
+        if str(self.port).startswith("file:"):
+            return _FileStandIn(self.port[len("file:"):], timeout=self.read_timeout)
+        return serial.serial_for_url(self.port, self.baudrate, timeout=self.read_timeout)
+
+    def _close(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+        self._conn = None
+        self.connected = False
+
+    def _run(self):
+        while self._running:
+            if self._conn is None:
+                try:
+                    self._conn = self._open()
+                    self.connected = True
+                    if self.verbose:
+                        print(f"[Serial] Connected to {self.port}")
+                except (serial.SerialException, OSError) as e:
+                    if self.verbose:
+                        print(f"[Serial] {self.port} unavailable ({e}); retrying in {self.reconnect_delay}s")
+                    time.sleep(self.reconnect_delay)
+                    continue
+            try:
+                raw = self._conn.readline()
+            except (serial.SerialException, OSError) as e:
+                print("[ERROR] Serial read failed:", e)
+                self._close()
+                self.reconnects += 1
+                time.sleep(self.reconnect_delay)
+                continue
+            if not raw:
+                continue
+            self.feed(raw.decode("utf-8", errors="ignore").strip())
+
+    # -----------------------------
+    # Buffer
+    # -----------------------------
+    def feed(self, line, ts=None):
+        """Records one sensor line (also used to inject events in tests)."""
+        if not line:
+            return
+        ts = time.monotonic() if ts is None else ts
+        with self._lock:
+            self._events.append((ts, line))
+        if self.verbose:
+            print(f"[Serial] {line}")
+
+    def events_between(self, t0, t1, kind=SOUND_EVENT):
+        with self._lock:
+            events = list(self._events)
+        stamps = [e[0] for e in events]
+        lo = bisect.bisect_left(stamps, t0)
+        hi = bisect.bisect_right(stamps, t1)
+        return [e for e in events[lo:hi] if kind is None or e[1] == kind]
+
+    def sound_near(self, ts, window_ms=500):
+        """True if a SOUND line arrived within +-window_ms of monotonic time ``ts``."""
+        w = window_ms / 1000.0
+        return bool(self.events_between(ts - w, ts + w))
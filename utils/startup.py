@@ -0,0 +1,110 @@
+# startup.py — part of utils
+# utils/startup.py
+"""
+Startup-time report: how long imports, setup and the first frame took.
+
+    from utils import startup            # import this first in the entry point
+    ...imports...
+    startup.mark("imports")
+    with startup.phase("serial"):
+        ...
+    startup.mark("first frame")
+    print(startup.report())  # [STARTUP] 2.41s to first frame | imports 0.62s | serial 0.00s | ...
+
+Per-module import cost comes from the interpreter itself:
+
+    python -X importtime main.py 2> importtime.log
+    python -m utils.startup main         # runs that for "import main" and lists the slowest modules
+"""
+import re
+import subprocess
+import sys
+import threading
+import time
+
+_T0 = time.perf_counter()
+_last = _T0
+_phases = []        # (name, seconds) in the order they finished
+_lock = threading.Lock()
+
+
+def mark(name):
+    """Records the time since the previous mark (or since this module was imported) as a phase."""
+    global _last
+    now = time.perf_counter()
+    with _lock:
+        _phases.append((name, now - _last))
+        _last = now
+
+
+class phase:
+    """Context manager recording the duration of its block as a phase."""
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        global _last
+        now = time.perf_counter()
+        with _lock:
+            _phases.append((self.name, now - self.t0))
+            _last = now
+        return False
+
+
+def elapsed():
+    return time.perf_counter() - _T0
+
+
+def report():
+    with _lock:
+        parts = [f"{name} {sec:.2f}s" for name, sec in _phases]
+    return f"[STARTUP] {elapsed():.2f}s since start | " + (" | ".join(parts) if parts else "no phases")
+
+
+# -----------------------------
+# python -X importtime, summarized
+# -----------------------------
+_IMPORTTIME = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def import_times(module, python=sys.executable):
+    """[(cumulative_ms, self_ms, depth, module)] for ``import module`` in a fresh interpreter."""
+    proc = subprocess.run([python, "-X", "importtime", "-c", f"import {module}"],
+                          capture_output=True, text=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = _IMPORTTIME.match(line)
+        if m:
+            depth = (len(m.group(3)) - 1) // 2
+            rows.append((int(m.group(2)) / 1000, int(m.group(1)) / 1000, depth, m.group(4)))
+            if depth == 0 and m.group(4) == "site":
+                rows = []           # interpreter startup, not caused by the import
+    if proc.returncode != 0:
+        lines = proc.stderr.strip().splitlines()
+        print(f"[WARN] import {module} failed: {lines[-1] if lines else proc.returncode}")
+    return rows
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Import-time report for an entry module")
+    parser.add_argument("module", nargs="?", default="main")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+    rows = import_times(args.module)
+    if not rows:
+        return
+    total = next((r[0] for r in rows if r[3] == args.module), sum(r[1] for r in rows))
+    print(f"import {args.module}: {total:.0f}ms, {len(rows)} modules")
+    print(f"{'cumulative':>11} {'self':>9}  module")
+    for cum, own, _, name in sorted(rows, key=lambda r: -r[0])[:args.top]:
+        print(f"{cum:>9.1f}ms {own:>7.1f}ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,270 @@
-# storage.py  part of utils
+# storage.py — part of utils
+# utils/storage.py
+"""
+Snapshot storage.
+
+    frame loop --save()--> [bounded queue] --> writer pool (encode image + thumbnail)
+                                                    --> <root>/<kind>/YYYY/MM/DD/<name>.<ext>
+                                                        <root>/<kind>/YYYY/MM/DD/<name>.thumb.<ext>
+
+save() returns the planned path immediately and never blocks; when the queue
+is full the snapshot is dropped and counted. Files are written atomically
+(temp file + rename), and a disk quota evicts the oldest snapshots first.
+The quota only covers the store's own kind folders, plus the pre-event clips
+when a clip folder is given (finished clips are reported through add()).
+"""
+import itertools
+import os
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import cv2
+
+THUMB_SUFFIX = ".thumb"
+THUMB_WIDTH = 160                 # dashboard grid shows 80px images; 2x for high-dpi screens
+QUOTA_BYTES = 2 * 1024 ** 3       # 2 GiB
+IMAGE_EXTS = (".jpg", ".jpeg", ".webp", ".png")
+CLIP_EXTS = (".mp4",)
+PART_SUFFIX = ".part"             # clip still being encoded (camera/recorder.py)
+
+
+def thumb_path(path):
+    """captures/x/y.jpg -> captures/x/y.thumb.jpg"""
+    root, ext = os.path.splitext(path)
+    return f"{root}{THUMB_SUFFIX}{ext}"
+
+
+def _encode_params(fmt, quality):
+    if fmt == "webp":
+        return [cv2.IMWRITE_WEBP_QUALITY, int(quality)]
+    return [cv2.IMWRITE_JPEG_QUALITY, int(quality)]
+
+
+class SnapshotStore:
+    """
+    :param root: base directory (e.g. "captures")
+    :param fmt: "jpg" or "webp"
+    :param quality: 0-100 for the full image; thumbnails use ``thumb_quality``
+    :param thumb_width: thumbnail width in px (0 = no thumbnails)
+    :param quota_bytes: total size allowed for the files below; oldest files go first (0 = unlimited)
+    :param kinds: the ``<root>/<kind>`` folders this store writes and may evict from (None = all of ``root``)
+    :param clip_dir: folder of MP4 clips that share the quota (None = clips are not counted)
+    """
+
+    def __init__(self, root="captures", fmt="jpg", quality=85, thumb_width=THUMB_WIDTH, thumb_quality=70,
+                 quota_bytes=QUOTA_BYTES, workers=2, queue_size=64, kinds=None, clip_dir=None):
+        self.root = root
+        self.kinds = tuple(kinds) if kinds else None
+        self.clip_dir = clip_dir
+        self.fmt = fmt.lower().lstrip(".").replace("jpeg", "jpg")
+        self.quality = quality
+        self.thumb_width = thumb_width
+        self.thumb_quality = thumb_quality
+        self.quota_bytes = quota_bytes
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self.evicted = 0
+        self.used_bytes = 0
+        self._files = deque()          # (mtime, path, bytes incl. thumbnail), oldest first
+        self._scanned = False
+        self._lock = threading.Lock()
+        self._seq = itertools.count(1)
+        self._threads = [threading.Thread(target=self._run, name=f"storage-{i}", daemon=True)
+                         for i in range(max(1, workers))]
+        self._started = False
+
+    def start(self):
+        with self._lock:
+            if not self._started:
+                os.makedirs(self.root, exist_ok=True)
+                for t in self._threads:
+                    t.start()
+                self._started = True
+        return self
+
+    # -----------------------------
+    # Paths
+    # -----------------------------
+    def plan(self, kind="snapshot", name=None, when=None):
+        """Path for a new snapshot: <root>/<kind>/YYYY/MM/DD/<name>.<ext>."""
+        when = when or datetime.now()
+        if name is None:
+            name = f"{kind}_{when:%H%M%S}_{next(self._seq)}"
+        # Forward slashes on every OS: the path doubles as the dashboard URL
+        return "/".join((self.root, kind, f"{when:%Y}", f"{when:%m}", f"{when:%d}", f"{name}.{self.fmt}"))
+
+    # -----------------------------
+    # Writing
+    # -----------------------------
+    def save(self, frame, kind="snapshot", name=None, when=None):
+        """
+        Queues a snapshot without blocking. Returns the planned path, or None
+        if it was dropped because the writers are behind. The frame is written
+        later, so pass a copy if the caller keeps drawing on it.
+        """
+        self.start()
+        path = self.plan(kind, name, when)
+        try:
+            self.queue.put_nowait((path, frame))
+        except queue.Full:
+            self.dropped += 1
+            return None
+        return path
+
+    def write(self, path, frame):
+        """Synchronous write of image + thumbnail (for callers already off the frame loop)."""
+        self._scan()
+        ext = os.path.splitext(path)[1].lower()
+        fmt = "webp" if ext == ".webp" else "jpg"
+        ok, buf = cv2.imencode(f".{fmt}", frame, _encode_params(fmt, self.quality))
+        if not ok:
+            self.failed += 1
+            print(f"[STORAGE] Could not encode {path}")
+            return False
+        size = self._atomic_write(path, buf)
+        if self.thumb_width and frame.shape[1] > self.thumb_width:
+            h = max(1, round(frame.shape[0] * self.thumb_width / frame.shape[1]))
+            small = cv2.resize(frame, (self.thumb_width, h), interpolation=cv2.INTER_AREA)
+            ok, tbuf = cv2.imencode(f".{fmt}", small, _encode_params(fmt, self.thumb_quality))
+            if ok:
+                size += self._atomic_write(thumb_path(path), tbuf)
+        with self._lock:
+            self._files.append((time.time(), path, size))
+            self.used_bytes += size
+            self.written += 1
+        self._enforce_quota()
+        return True
+
+    def add(self, path):
+        """Counts a file written elsewhere (e.g. a finished clip) against the quota."""
+        self._scan()
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return
+        with self._lock:
+            self._files.append((time.time(), path, size))
+            self.used_bytes += size
+        self._enforce_quota()
+
+    @staticmethod
+    def _atomic_write(path, buf):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(buf.tobytes())
+        os.replace(tmp, path)
+        return len(buf)
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            path, frame = item
+            try:
+                self.write(path, frame)
+            except OSError as e:
+                self.failed += 1
+                print(f"[STORAGE] Could not write {path}: {e}")
+
+    # -----------------------------
+    # Quota
+    # -----------------------------
+    def _quota_dirs(self):
+        """Folders whose files count toward the quota (never the other kinds under a shared root)."""
+        dirs = [os.path.join(self.root, k) for k in self.kinds] if self.kinds else [self.root]
+        if self.clip_dir:
+            dirs.append(self.clip_dir)
+        return dirs
+
+    def _scan(self):
+        """Indexes what is already on disk once, so the quota covers earlier runs too."""
+        with self._lock:
+            if self._scanned:
+                return
+            self._scanned = True
+            found = []
+            for dirpath, filenames in self._walk():
+                for fn in filenames:
+                    stem, ext = os.path.splitext(fn)
+                    if ext.lower() not in IMAGE_EXTS + CLIP_EXTS or stem.endswith((THUMB_SUFFIX, PART_SUFFIX)):
+                        continue
+                    path = os.path.join(dirpath, fn)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    size = st.st_size
+                    try:
+                        size += os.path.getsize(thumb_path(path))
+                    except OSError:
+                        pass
+                    found.append((st.st_mtime, path, size))
+            found.sort()
+            self._files.extendleft(reversed(found))
+            self.used_bytes += sum(f[2] for f in found)
+
+    def _walk(self):
+        seen = set()
+        for top in self._quota_dirs():
+            for dirpath, _, filenames in os.walk(top):
+                # clip_dir may sit inside a root that is walked as a whole
+                real = os.path.abspath(dirpath)
+                if real not in seen:
+                    seen.add(real)
+                    yield dirpath, filenames
+
+    def _enforce_quota(self):
+        if not self.quota_bytes:
+            return
+        # Evict down to 90% so a full disk does not mean one delete per new write
+        target = self.quota_bytes * 0.9
+        victims = []
+        with self._lock:
+            if self.used_bytes <= self.quota_bytes:
+                return
+            while self._files and self.used_bytes > target:
+                _, path, size = self._files.popleft()
+                self.used_bytes -= size
+                victims.append(path)
+        for path in victims:
+            for p in (path, thumb_path(path)):
+                try:
+                    os.remove(p)
+                except OSError:
+                    pass
+            self.evicted += 1
+            self._prune_dirs(os.path.dirname(path))
+
+    def _prune_dirs(self, folder):
+        """Removes empty date folders left behind by eviction, up to the kind (or clip) folder."""
+        tops = [os.path.abspath(d) for d in self._quota_dirs()]
+        folder = os.path.abspath(folder)
+        while folder not in tops and any(folder.startswith(top + os.sep) for top in tops):
+            try:
+                os.rmdir(folder)
+            except OSError:
+                return
+            folder = os.path.dirname(folder)
+
+    def pending(self):
+        return self.queue.qsize()
+
+    def close(self, timeout=5.0):
+        if not self._started:
+            return
+        for _ in self._threads:
+            self.queue.put(None)
+        for t in self._threads:
+            t.join(timeout=timeout)
+
+    def stats(self):
+        return (f"[STORAGE] written={self.written} dropped={self.dropped} failed={self.failed} "
+                f"evicted={self.evicted} used={self.used_bytes / 1024 ** 2:.1f}MB"
+                + (f"/{self.quota_bytes / 1024 ** 2:.0f}MB" if self.quota_bytes else ""))
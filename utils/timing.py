@@ -0,0 +1,114 @@
+# timing.py — part of utils
+# utils/timing.py
+"""
+Per-stage latency, for tuning inference size per camera.
+
+    timer = StageTimer("cam0", setting="640")
+    with timer.stage("pose"):
+        ...
+    print(timer.report())   # [TIMING] cam0 @640 | pose p50=18.2ms p95=25.1ms n=200 | ...
+
+Every sample is also observed into the theft_stage_seconds histogram of
+utils/metrics.py, so /metrics shows the same stages.
+
+The hook stays in the live loops. A disabled timer (enabled=False, or
+THEFT_TIMING=0 in the environment) hands out one shared no-op context
+manager, so a stage costs one attribute check and nothing is recorded.
+"""
+import math
+import os
+import threading
+import time
+from collections import deque
+
+from utils import metrics
+
+TIMING_ENABLED = os.environ.get("THEFT_TIMING", "1") != "0"
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list (q in 0..100)."""
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, math.ceil(q / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+STAGE_SECONDS = metrics.histogram("theft_stage_seconds", "Per-stage latency of the detection loops",
+                                  ("timer", "stage"))
+
+
+class _Stage:
+    __slots__ = ("timer", "name", "t0")
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.add(self.name, (time.perf_counter() - self.t0) * 1000.0)
+        return False
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class StageTimer:
+    """
+    :param name: what is being timed (camera name, entry point)
+    :param setting: free-form label of the configuration, e.g. the inference size
+    :param window: samples kept per stage
+    :param enabled: False turns stage()/add() into no-ops (default: THEFT_TIMING env)
+    """
+
+    def __init__(self, name, setting="", window=200, enabled=None):
+        self.name = name
+        self.setting = setting
+        self.window = window
+        self.enabled = TIMING_ENABLED if enabled is None else enabled
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def stage(self, name):
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def add(self, stage, ms):
+        if not self.enabled:
+            return
+        STAGE_SECONDS.labels(self.name, stage).observe(ms / 1000.0)
+        with self._lock:
+            samples = self._samples.get(stage)
+            if samples is None:
+                samples = self._samples[stage] = deque(maxlen=self.window)
+            samples.append(ms)
+
+    def summary(self):
+        """{stage: {"p50", "p95", "p99", "mean", "n"}} in ms, in first-seen stage order."""
+        with self._lock:
+            snapshot = {k: sorted(v) for k, v in self._samples.items()}
+        return {k: {"p50": percentile(v, 50), "p95": percentile(v, 95), "p99": percentile(v, 99),
+                    "mean": sum(v) / len(v) if v else 0.0, "n": len(v)}
+                for k, v in snapshot.items()}
+
+    def report(self):
+        if not self.enabled:
+            return f"[TIMING] {self.name} | disabled"
+        parts = [f"{k} p50={s['p50']:.1f}ms p95={s['p95']:.1f}ms n={s['n']}" for k, s in self.summary().items()]
+        label = f"{self.name} @{self.setting}" if self.setting != "" else self.name
+        return f"[TIMING] {label} | " + (" | ".join(parts) if parts else "no samples")